@@ -4,7 +4,9 @@ Application de Forensics et Data Mining
 Analyse de bases de données (SQL, Excel, CSV)
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for
+from flask import (Flask, Response, render_template, request, jsonify, send_file, flash, redirect, url_for,
+                   stream_with_context)
+from flask.json.provider import DefaultJSONProvider
 import pandas as pd
 import numpy as np
 import sqlite3
@@ -14,7 +16,7 @@ import base64
 import plotly.graph_objs as go
 import plotly.express as px
 import plotly
-import json
+import itertools
 from werkzeug.utils import secure_filename
 import hashlib
 import datetime
@@ -30,31 +32,66 @@ try:
     from core.forensic_analyzer import ForensicAnalyzer
     from analyzers.pattern_detector import PatternDetector
     from analyzers.anomaly_detector import AnomalyDetector
+    from analyzers.baseline import list_baselines
 except ImportError as e:
     print(f"Erreur d'import: {e}")
     # Créer des classes de base pour éviter les erreurs
     class DatabaseAnalyzer:
         def __init__(self, filepath): self.filepath = filepath
-        def analyze(self): return {"error": "Module non disponible"}
+        def analyze(self, **kwargs): return {"error": "Module non disponible"}
         def generate_visualizations(self): return {}
     
     class ForensicAnalyzer:
-        def __init__(self, filepath): self.filepath = filepath
-        def full_analysis(self): return {"error": "Module non disponible"}
+        def __init__(self, filepath, **kwargs): self.filepath = filepath
+        def full_analysis(self, **kwargs): return {"error": "Module non disponible"}
         def get_file_metadata(self): return {}
     
     class PatternDetector:
         def __init__(self, filepath): self.filepath = filepath
-        def detect_patterns(self): return {"error": "Module non disponible"}
+        def detect_patterns(self, **kwargs): return {"error": "Module non disponible"}
     
     class AnomalyDetector:
-        def __init__(self, filepath): self.filepath = filepath
-        def detect_anomalies(self): return {"error": "Module non disponible"}
+        def __init__(self, filepath, **kwargs): self.filepath = filepath
+        def detect_anomalies(self, **kwargs): return {"error": "Module non disponible"}
+        def register_baseline(self, name): return {"error": "Module non disponible"}
+        def score_against_baseline(self, key): return {"error": "Module non disponible"}
+    
+    def list_baselines(directory): return []
+
+from core.job_queue import JobQueue, QueueFullError
+from core.data_utils import dataset_hash
+from analyzers.model_store import ModelStore
+from core.result_cache import ResultCache, code_version
+from analyzers.sections import parse_sections
+from core.analysis_stream import (ANALYSIS_METHODS, STREAM_FORMATS, analysis_compute, create_analyzer, file_sections,
+                                  format_event, resolve_request, stream_analysis)
+from core import report_export, serialization
+from core.chunked_upload import ChunkedUploads, IncompleteUploadError
+from core.evidence_store import EvidenceStore
+
+class AnalysisJSONProvider(DefaultJSONProvider):
+    """jsonify avec conversion native des types NumPy / pandas (NaN et infinis en null)"""
+    
+    def dumps(self, obj, **kwargs):
+        return serialization.dumps(obj, pretty=bool(kwargs.get('indent'))).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return serialization.loads(s)
 
 app = Flask(__name__)
+app.json = AnalysisJSONProvider(app)
 app.config['SECRET_KEY'] = 'forensic_app_secret_key_2024'
 app.config['UPLOAD_FOLDER'] = 'app/static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
+app.config['MODEL_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'models')
+app.config['JOB_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'jobs')
+app.config['JOB_WORKERS'] = 2
+app.config['RESULT_CACHE_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'cache')
+app.config['RESULT_CACHE_BYTES'] = 512 * 1024 * 1024
+app.config['CHUNKED_UPLOAD_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'chunked')
+app.config['CHUNKED_UPLOAD_MAX_BYTES'] = 64 * 1024 ** 3
+app.config['EVIDENCE_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'evidence')
+app.config['EVIDENCE_MAX_BYTES'] = 50 * 1024 ** 3
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -66,6 +103,66 @@ ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls', 'sql', 'db', 'sqlite'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+_job_queue = None
+
+def get_job_queue():
+    """File de tâches créée à la première utilisation (configuration déjà chargée)"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(app.config['JOB_FOLDER'], max_workers=app.config['JOB_WORKERS'])
+    return _job_queue
+
+_result_cache = None
+
+def get_result_cache():
+    """Cache de résultats créé à la première utilisation"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(app.config['RESULT_CACHE_FOLDER'], max_bytes=app.config['RESULT_CACHE_BYTES'])
+    return _result_cache
+
+_chunked_uploads = None
+
+def get_chunked_uploads():
+    """Sessions d'upload par morceaux (état sur disque, partagé entre processus)"""
+    global _chunked_uploads
+    if _chunked_uploads is None:
+        _chunked_uploads = ChunkedUploads(app.config['CHUNKED_UPLOAD_FOLDER'],
+                                          max_bytes=app.config['CHUNKED_UPLOAD_MAX_BYTES'])
+    return _chunked_uploads
+
+_evidence_store = None
+
+def get_evidence_store():
+    """Preuves adressées par contenu ; un contenu évincé emporte ses résultats en cache"""
+    global _evidence_store
+    if _evidence_store is None:
+        _evidence_store = EvidenceStore(app.config['EVIDENCE_FOLDER'], app.config['UPLOAD_FOLDER'],
+                                        max_bytes=app.config['EVIDENCE_MAX_BYTES'],
+                                        on_evict=lambda sha256: get_result_cache().invalidate(sha256))
+    return _evidence_store
+
+def analysis_options():
+    """?sections=a,b&top_k=&max_examples= : sections calculées et bornes de travail"""
+    options = {
+        'sections': parse_sections(request.args.get('sections')),
+        'top_k': request.args.get('top_k', type=int),
+        'max_examples': request.args.get('max_examples', type=int)
+    }
+    for bound in ('top_k', 'max_examples'):
+        if options[bound] is not None and options[bound] < 1:
+            raise ValueError(f"{bound} doit être un entier positif")
+    return {name: value for name, value in options.items() if value is not None}
+
+def cached_analysis(filepath, analyzer, name, compute, params=None):
+    """JSON d'une analyse depuis le cache (fichier, analyseur, version du code, paramètres) ou calculé
+
+    Les sections propres au fichier (nom, chemin, dates) sont recalculées à chaque requête.
+    """
+    version = code_version(sys.modules[type(analyzer).__module__])
+    live = file_sections(name, analyzer, (params or {}).get('sections'))
+    return get_result_cache().cached_json(filepath, name, version, params or {}, compute, live)
+
 @app.route('/')
 def index():
     """Page d'accueil"""
@@ -86,24 +183,135 @@ def upload_file():
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
+        # Hash calculés pendant l'écriture ; un contenu déjà reçu n'est pas stocké une seconde fois
+        store = get_evidence_store()
         try:
-            # Analyse initiale du fichier
-            analyzer = DatabaseAnalyzer(filepath)
-            analysis_result = analyzer.analyze()
-            
-            return jsonify({
-                'success': True,
-                'filename': filename,
-                'analysis': analysis_result
-            })
+            staging, digests = store.write_stream(file.stream)
+            stored = store.ingest(staging, filename, digests, verified=True)
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse: {str(e)}")
-            return jsonify({'error': f'Erreur lors de l\'analyse: {str(e)}'}), 500
+            logger.error(f"Erreur lors de l'enregistrement: {str(e)}")
+            return jsonify({'error': f'Erreur lors de l\'enregistrement: {str(e)}'}), 500
+        return initial_analysis(filename, filepath, **evidence_info(stored))
     
     return jsonify({'error': 'Type de fichier non autorisé'}), 400
 
+def evidence_info(stored):
+    return {
+        'sha256': stored['sha256'],
+        'duplicate': stored['duplicate'],
+        'previous_filenames': stored['previous_filenames']
+    }
+
+def initial_analysis(filename, filepath, **extra):
+    """Analyse initiale d'un fichier reçu, mise en cache pour /api/basic_analysis et l'export"""
+    try:
+        analyzer = DatabaseAnalyzer(filepath)
+        analysis_json = cached_analysis(filepath, analyzer, 'basic', analyzer.analyze)
+        
+        return jsonify({
+            'success': True,
+            'filename': filename,
+            **extra,
+            'analysis': serialization.loads(analysis_json)
+        })
+    except Exception as e:
+        logger.error(f"Erreur lors de l'analyse: {str(e)}")
+        return jsonify({'error': f'Erreur lors de l\'analyse: {str(e)}'}), 500
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Début d'un upload par morceaux : {filename, size, chunk_size?, sha256?}"""
+    params = request.get_json(silent=True) or {}
+    filename = secure_filename(str(params.get('filename') or ''))
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Type de fichier non autorisé'}), 400
+    
+    if params.get('sha256'):
+        # Contenu déjà stocké : référence immédiate, aucun morceau à envoyer
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        reference = f"{timestamp}_{filename}"
+        stored = get_evidence_store().add_reference(str(params['sha256']).lower(), reference)
+        if stored is not None:
+            return initial_analysis(reference, os.path.join(app.config['UPLOAD_FOLDER'], reference),
+                                    **evidence_info(stored))
+    
+    try:
+        session = get_chunked_uploads().create(
+            filename,
+            int(params.get('size') or 0),
+            chunk_size=int(params['chunk_size']) if params.get('chunk_size') else None,
+            sha256=params.get('sha256')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(session), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """État d'un upload par morceaux : morceaux manquants à (re)envoyer pour reprendre"""
+    status = get_chunked_uploads().status(upload_id)
+    if status is None:
+        return jsonify({'error': 'Upload inconnu'}), 404
+    return jsonify(status)
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    """Morceau index (corps brut), somme SHA-256 dans l'en-tête X-Chunk-SHA256 ; ordre quelconque"""
+    try:
+        status = get_chunked_uploads().write_chunk(upload_id, index, request.stream,
+                                                   request.headers.get('X-Chunk-SHA256'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if status is None:
+        return jsonify({'error': 'Upload inconnu'}), 404
+    return jsonify({
+        'upload_id': upload_id,
+        'index': index,
+        'received_chunks': status['received_chunks'],
+        'chunks': status['chunks'],
+        'complete': status['complete']
+    })
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Assemblage terminé : fichier déplacé dans les uploads puis analyse initiale (comme /upload)"""
+    uploads = get_chunked_uploads()
+    status = uploads.status(upload_id)
+    if status is None:
+        return jsonify({'error': 'Upload inconnu'}), 404
+    
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{timestamp}_{status['filename']}"
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    store = get_evidence_store()
+    staging = store.staging_path()
+    try:
+        digests = uploads.finalize(upload_id, staging)
+        if digests is None:
+            # Session supprimée entre-temps (abandon, purge) : rien à enregistrer
+            os.remove(staging)
+            return jsonify({'error': 'Upload inconnu'}), 404
+        # Hash revérifiés morceau par morceau par la finalisation
+        stored = store.ingest(staging, filename, digests, verified=True)
+    except IncompleteUploadError as e:
+        os.remove(staging)
+        return jsonify({'error': str(e), 'missing': e.missing}), 409
+    except ValueError as e:
+        os.remove(staging)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        if os.path.exists(staging):
+            os.remove(staging)
+        logger.error(f"Erreur lors de l'enregistrement: {str(e)}")
+        return jsonify({'error': f'Erreur lors de l\'enregistrement: {str(e)}'}), 500
+    return initial_analysis(filename, filepath, **evidence_info(stored))
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    if not get_chunked_uploads().abort(upload_id):
+        return jsonify({'error': 'Upload inconnu'}), 404
+    return jsonify({'success': True})
+
 @app.route('/analyze/<filename>')
 def analyze_file(filename):
     """Page d'analyse détaillée"""
@@ -112,6 +320,10 @@ def analyze_file(filename):
         flash('Fichier non trouvé', 'error')
         return redirect(url_for('index'))
     
+    # Preuve consultée : dernière à être évincée
+    evidence = get_evidence_store().resolve(filename)
+    if evidence is not None:
+        get_evidence_store().touch(evidence['sha256'])
     return render_template('analyze.html', filename=filename)
 
 @app.route('/api/basic_analysis/<filename>')
@@ -120,9 +332,13 @@ def basic_analysis(filename):
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
     try:
+        options = analysis_options()
         analyzer = DatabaseAnalyzer(filepath)
-        analysis = analyzer.analyze()
-        return jsonify(analysis)
+        analysis_json = cached_analysis(filepath, analyzer, 'basic',
+                                        lambda: analyzer.analyze(**options), options)
+        return Response(analysis_json, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erreur analyse de base: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -133,40 +349,394 @@ def forensic_analysis(filename):
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
     try:
-        forensic = ForensicAnalyzer(filepath)
-        analysis = forensic.full_analysis()
-        return jsonify(analysis)
+        options = analysis_options()
+        forensic = ForensicAnalyzer(filepath, model_dir=app.config['MODEL_FOLDER'])
+        analysis_json = cached_analysis(filepath, forensic, 'forensic',
+                                        lambda: forensic.full_analysis(**options), options)
+        return Response(analysis_json, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erreur analyse forensique: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analysis_stream/<filename>')
+def analysis_stream(filename):
+    """Analyse combinée : un chargement, sections envoyées au fil de l'eau (NDJSON ou SSE)"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Fichier non trouvé'}), 404
+    
+    stream_format = request.args.get('format', 'ndjson')
+    try:
+        if stream_format not in STREAM_FORMATS:
+            raise ValueError(f"Format inconnu: {stream_format} (attendu: {', '.join(STREAM_FORMATS)})")
+        analyzers, sections = resolve_request(request.args.get('analyzers'), request.args.get('sections'))
+        bounds = analysis_options()
+        bounds.pop('sections', None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        events = stream_analysis(filepath, analyzers, sections, bounds, model_dir=app.config['MODEL_FOLDER'],
+                                 result_cache=get_result_cache())
+        try:
+            for event in events:
+                yield format_event(event, stream_format)
+        except Exception as e:
+            logger.error(f"Erreur analyse en flux: {str(e)}")
+            yield format_event({'event': 'error', 'error': str(e)}, stream_format)
+    
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    # Pas de mise en tampon par un proxy (nginx) : chaque section part dès qu'elle est prête
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+@app.route('/api/sessions/<filename>')
+def sessions(filename):
+    """API paginée des sessions reconstruites (tri par utilisateur et horodatage)"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    try:
+        forensic = ForensicAnalyzer(filepath, model_dir=app.config['MODEL_FOLDER'])
+        result = forensic.get_sessions(
+            page=request.args.get('page', 1, type=int),
+            per_page=min(request.args.get('per_page', 50, type=int), 500),
+            gap_minutes=request.args.get('gap_minutes', 30, type=float),
+            user=request.args.get('user'),
+            sort=request.args.get('sort', 'start'),
+            descending=request.args.get('order', 'asc').lower() == 'desc',
+            user_column=request.args.get('user_column'),
+            time_column=request.args.get('time_column')
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erreur reconstruction sessions: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/concurrent_access/<filename>')
+def concurrent_access(filename):
+    """API des fenêtres où un compte change d'IP (ou une IP de compte) en peu de temps"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    try:
+        forensic = ForensicAnalyzer(filepath, model_dir=app.config['MODEL_FOLDER'])
+        result = forensic.detect_concurrent_access(
+            window_minutes=request.args.get('window_minutes', 10, type=float),
+            min_distinct=request.args.get('min_distinct', 3, type=int),
+            max_examples=request.args.get('max_examples', 20, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Erreur détection accès concurrents: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/linked_accounts/<filename>')
+def linked_accounts(filename):
+    """API des groupes de comptes partageant IP, domaine e-mail ou appareil"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    try:
+        forensic = ForensicAnalyzer(filepath, model_dir=app.config['MODEL_FOLDER'])
+        result = forensic.link_accounts(
+            max_attribute_degree=request.args.get('max_attribute_degree', 50, type=int),
+            top_k=request.args.get('top_k', 20, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Erreur liaison des comptes: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/timeline/<filename>')
+def timeline(filename):
+    """API paginée par curseur de la timeline forensique (filtres since, until, type)"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    try:
+        forensic = ForensicAnalyzer(filepath, model_dir=app.config['MODEL_FOLDER'])
+        result = forensic.get_timeline(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 100, type=int),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            event_type=request.args.get('type')
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erreur timeline: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/pattern_analysis/<filename>')
 def pattern_analysis(filename):
     """API pour la détection de patterns"""
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
     try:
+        options = analysis_options()
         detector = PatternDetector(filepath)
-        patterns = detector.detect_patterns()
-        return jsonify(patterns)
+        patterns_json = cached_analysis(filepath, detector, 'patterns',
+                                        lambda: detector.detect_patterns(**options), options)
+        return Response(patterns_json, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erreur détection patterns: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/benford/<filename>')
+def benford_analysis(filename):
+    """API pour l'analyse de Benford d'une colonne (optionnellement par groupe)"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Fichier non trouvé'}), 404
+    
+    column = request.args.get('column')
+    if not column:
+        return jsonify({'error': 'Paramètre column requis'}), 400
+    
+    tests = request.args.get('tests')
+    
+    try:
+        detector = PatternDetector(filepath)
+        analysis = detector.analyze_benford(
+            column,
+            group_by=request.args.get('group_by'),
+            tests=tests.split(',') if tests else None,
+            top_k=request.args.get('top_k', 20, type=int)
+        )
+        return jsonify(analysis)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erreur analyse Benford: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/change_points/<filename>')
+def change_points(filename):
+    """API des ruptures de comportement des colonnes numériques dans le temps"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    columns = request.args.get('columns')
+    
+    try:
+        detector = PatternDetector(filepath)
+        result = detector.detect_change_points(
+            columns=columns.split(',') if columns else None,
+            max_points=request.args.get('max_points', 200000, type=int),
+            max_changes=request.args.get('max_changes', 20, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Erreur détection de ruptures: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/anomaly_detection/<filename>')
-def anomaly_detection(filename):
 def anomaly_detection(filename):
     """API pour la détection d'anomalies"""
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
     try:
-        detector = AnomalyDetector(filepath)
-        anomalies = detector.detect_anomalies()
-        return jsonify(anomalies)
+        options = analysis_options()
+        # ?hashed=1 : colonnes catégorielles et textuelles incluses via features hachées
+        hashed = request.args.get('hashed', '0').lower() in ('1', 'true', 'yes')
+        detector = AnomalyDetector(filepath, model_dir=app.config['MODEL_FOLDER'], hashed_features=hashed)
+        anomalies_json = cached_analysis(filepath, detector, 'anomalies',
+                                         lambda: detector.detect_anomalies(**options), {'hashed': hashed, **options})
+        return Response(anomalies_json, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erreur détection anomalies: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/entity_anomalies/<filename>')
+def entity_anomalies(filename):
+    """API des écarts par rapport à la baseline de chaque entité (ex: username × amount)"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    entities = request.args.get('entity')
+    values = request.args.get('values')
+    
+    try:
+        detector = AnomalyDetector(filepath, model_dir=app.config['MODEL_FOLDER'])
+        result = detector.detect_entity_anomalies(
+            entity_columns=entities.split(',') if entities else None,
+            value_columns=values.split(',') if values else None,
+            threshold=request.args.get('threshold', 3.5, type=float),
+            min_group_size=request.args.get('min_group_size', 5, type=int),
+            top_k=request.args.get('top_k', 20, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Erreur anomalies par entité: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/bursts/<filename>')
+def bursts(filename):
+    """API des rafales d'activité par minute, heure et jour"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    try:
+        detector = AnomalyDetector(filepath, model_dir=app.config['MODEL_FOLDER'])
+        result = detector.detect_bursts(
+            time_column=request.args.get('time_column'),
+            threshold=request.args.get('threshold', 3.0, type=float),
+            top_k=request.args.get('top_k', 10, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Erreur détection de rafales: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/baselines', methods=['GET'])
+def get_baselines():
+    """API listant les baselines enregistrées"""
+    return jsonify(list_baselines(os.path.join(app.config['MODEL_FOLDER'], 'baselines')))
+
+@app.route('/api/baselines/<filename>', methods=['POST'])
+def register_baseline(filename):
+    """API pour enregistrer un fichier de confiance comme baseline"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Fichier non trouvé'}), 404
+    
+    payload = request.get_json(silent=True) or {}
+    name = payload.get('name') or request.form.get('name') or filename
+    
+    try:
+        detector = AnomalyDetector(filepath, model_dir=app.config['MODEL_FOLDER'])
+        baseline = detector.register_baseline(name)
+        if 'error' in baseline:
+            return jsonify(baseline), 400
+        return jsonify(baseline), 201
+    except Exception as e:
+        logger.error(f"Erreur enregistrement baseline: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/baseline_scoring/<baseline_id>/<filename>')
+def baseline_scoring(baseline_id, filename):
+    """API pour scorer un fichier par rapport à une baseline"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Fichier non trouvé'}), 404
+    
+    key = secure_filename(baseline_id)
+    if not os.path.exists(ModelStore(os.path.join(app.config['MODEL_FOLDER'], 'baselines')).path(key)):
+        return jsonify({'error': f'Baseline inconnue: {key}'}), 404
+    
+    try:
+        detector = AnomalyDetector(filepath, model_dir=app.config['MODEL_FOLDER'])
+        scoring = detector.score_against_baseline(key)
+        if 'error' in scoring:
+            return jsonify(scoring), 400
+        return jsonify(scoring)
+    except Exception as e:
+        logger.error(f"Erreur scoring baseline: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Soumission d'une analyse en arrière-plan ; renvoie l'identifiant de la tâche"""
+    payload = request.get_json(silent=True) or {}
+    job_type = payload.get('type', 'forensic')
+    filename = secure_filename(payload.get('filename', ''))
+    if not filename:
+        return jsonify({'error': 'Nom de fichier manquant'}), 400
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    params = dict(payload.get('params') or {})
+    params['model_dir'] = app.config['MODEL_FOLDER']
+    try:
+        job = get_job_queue().submit(job_type, filepath, params)
+        job['status_url'] = url_for('job_status', job_id=job['job_id'])
+        job['result_url'] = url_for('job_result', job_id=job['job_id'])
+        return jsonify(job), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"Erreur soumission tâche: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Liste des tâches récentes"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(get_job_queue().list_jobs(limit))
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """État et avancement d'une tâche"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({'error': 'Tâche inconnue'}), 404
+    return jsonify(status)
+
+@app.route('/api/jobs/<job_id>/result')
+def job_result(job_id):
+    """Résultat d'une tâche terminée (fichier JSON renvoyé tel quel)"""
+    queue = get_job_queue()
+    status = queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Tâche inconnue'}), 404
+    if status.get('state') == 'failed':
+        return jsonify({'error': status.get('error'), 'state': 'failed'}), 500
+    result_path = queue.result_path(job_id)
+    if status.get('state') != 'done' or result_path is None:
+        return jsonify({'error': 'Tâche non terminée', 'state': status.get('state'),
+                        'progress': status.get('progress')}), 409
+    return send_file(os.path.abspath(result_path), mimetype='application/json')
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """Statistiques du cache de résultats"""
+    return jsonify(get_result_cache().stats())
+
+@app.route('/api/cache', methods=['DELETE'])
+def clear_cache():
+    """Vidage du cache de résultats (ou des seuls résultats d'un fichier avec ?filename=)"""
+    filename = request.args.get('filename')
+    data_hash = None
+    if filename:
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'Fichier non trouvé'}), 404
+        data_hash = dataset_hash(filepath)
+    return jsonify({'removed': get_result_cache().invalidate(data_hash)})
+
+@app.route('/api/evidence', methods=['GET'])
+def list_evidence():
+    """Preuves stockées (les plus récemment consultées d'abord) et occupation du quota"""
+    store = get_evidence_store()
+    return jsonify({'stats': store.stats(), 'evidence': store.list_evidence(request.args.get('limit', 100, type=int))})
+
+@app.route('/api/evidence/<sha256>/pin', methods=['POST'])
+def pin_evidence(sha256):
+    """Épinglage d'une preuve de dossier (?case_id= ou {case_id}) : jamais évincée"""
+    params = request.get_json(silent=True) or {}
+    case_id = params.get('case_id') or request.args.get('case_id')
+    if not get_evidence_store().pin(sha256.lower(), case_id):
+        return jsonify({'error': 'Preuve inconnue'}), 404
+    return jsonify({'success': True, 'sha256': sha256.lower(), 'case_id': case_id})
+
+@app.route('/api/evidence/<sha256>/pin', methods=['DELETE'])
+def unpin_evidence(sha256):
+    if not get_evidence_store().unpin(sha256.lower()):
+        return jsonify({'error': 'Preuve inconnue'}), 404
+    return jsonify({'success': True, 'sha256': sha256.lower()})
+
+@app.route('/api/evidence/<sha256>', methods=['DELETE'])
+def delete_evidence(sha256):
+    """Suppression d'une preuve, de tous ses noms et de ses résultats en cache"""
+    if not get_evidence_store().delete(sha256.lower()):
+        return jsonify({'error': 'Preuve inconnue'}), 404
+    return jsonify({'success': True})
+
 @app.route('/api/visualizations/<filename>')
 def get_visualizations(filename):
     """API pour générer les visualisations"""
@@ -174,42 +744,98 @@ def get_visualizations(filename):
     
     try:
         analyzer = DatabaseAnalyzer(filepath)
-        visualizations = analyzer.generate_visualizations()
-        return jsonify(visualizations)
+        # Même entrée de cache que l'analyse en flux et l'export (une section 'visualizations')
+        cached = cached_analysis(filepath, analyzer, 'visualizations',
+                                 analysis_compute('visualizations', analyzer))
+        return jsonify(serialization.loads(cached).get('visualizations', {}))
     except Exception as e:
         logger.error(f"Erreur génération visualisations: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/export_report/<filename>')
 def export_report(filename):
-    """Export du rapport d'analyse"""
+    """Export du rapport d'analyse en flux (JSON ou JSONL, compression gzip / zstd, lignes signalées en pièce jointe)"""
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Fichier non trouvé'}), 404
     
+    export_format = request.args.get('format', 'json')
+    compression = request.args.get('compression', 'none')
+    attachments = request.args.get('attachments', 'none')
     try:
-        # Génération du rapport complet
-        analyzer = DatabaseAnalyzer(filepath)
-        forensic = ForensicAnalyzer(filepath)
-        
-        report = {
-            'filename': filename,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'basic_analysis': analyzer.analyze(),
-            'forensic_analysis': forensic.full_analysis(),
-            'metadata': forensic.get_file_metadata()
-        }
-        
-        # Sauvegarde du rapport
-        report_filename = f"report_{filename}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        report_path = os.path.join(app.config['UPLOAD_FOLDER'], report_filename)
-        
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
-        
-        return send_file(report_path, as_attachment=True)
-        
+        report_export.check_options(export_format, compression, attachments)
+        analyzers = parse_sections(request.args.get('analyzers')) or ['basic', 'forensic']
+        unknown = [name for name in analyzers if name not in ANALYSIS_METHODS]
+        if unknown:
+            raise ValueError(f"Analyseur(s) inconnu(s): {', '.join(unknown)} (disponibles: {', '.join(ANALYSIS_METHODS)})")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    timestamp = datetime.datetime.now()
+    header = {'filename': filename, 'timestamp': timestamp.isoformat(), 'analyzers': analyzers}
+    chunks = None
+    try:
+        if 'forensic' in analyzers:
+            header['metadata'] = ForensicAnalyzer(filepath, model_dir=app.config['MODEL_FOLDER']).get_file_metadata()
+        if attachments != 'none':
+            # Source ouverte et premier morceau lu avant l'envoi des en-têtes : une erreur de lecture reste une réponse JSON
+            source = DatabaseAnalyzer(filepath).iter_chunks(report_export.ATTACHMENT_CHUNK_ROWS)
+            first = next(source, None)
+            chunks = itertools.chain([first], source) if first is not None else iter(())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erreur export rapport: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    flagged = {}
+    
+    def analyses():
+        # Un analyseur à la fois : son JSON (en cache ou calculé) est recopié tel quel dans le flux
+        for name in analyzers:
+            analyzer = create_analyzer(name, filepath, app.config['MODEL_FOLDER'])
+            raw = cached_analysis(filepath, analyzer, name, analysis_compute(name, analyzer),
+                                  {'hashed': False} if name == 'anomalies' else None)
+            if attachments != 'none':
+                report_export.collect_flagged_rows(name, serialization.loads(raw), flagged)
+            yield (f"{name}_analysis" if export_format == 'json' else name), raw
+    
+    def flagged_rows():
+        # Appelé une fois le rapport émis : toutes les lignes signalées sont connues
+        frames = report_export.iter_flagged_chunks(chunks, flagged)
+        if attachments == 'parquet':
+            yield from report_export.iter_parquet(frames)
+        else:
+            yield from report_export.compress(report_export.iter_csv(frames), compression)
+    
+    report = (report_export.iter_report_json if export_format == 'json' else report_export.iter_report_jsonl)
+    extension = report_export.FILE_EXTENSIONS[compression]
+    report_name = f"report_{filename}_{timestamp.strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    
+    if attachments == 'none':
+        body = report_export.compress(report(header, analyses()), compression)
+        download_name = report_name + extension
+        mimetype = {'none': 'application/json' if export_format == 'json' else 'application/x-ndjson',
+                    'gzip': 'application/gzip', 'zstd': 'application/zstd'}[compression]
+    else:
+        # Archive ZIP non compressée : chaque membre est déjà compressé (gzip / zstd / Parquet)
+        attachment_name = 'flagged_rows.parquet' if attachments == 'parquet' else f"flagged_rows.csv{extension}"
+        body = report_export.iter_zip([
+            (report_name + extension, report_export.compress(report(header, analyses()), compression)),
+            (attachment_name, flagged_rows())
+        ])
+        download_name = os.path.splitext(report_name)[0] + '.zip'
+        mimetype = 'application/zip'
+    
+    def generate():
+        try:
+            yield from body
+        except Exception as e:
+            # En-têtes déjà envoyés : le flux est interrompu, l'archive ou le JSON restent incomplets
+            logger.error(f"Erreur export rapport: {str(e)}")
+            raise
+    
+    headers = {'Content-Disposition': f'attachment; filename="{download_name}"', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
 
 if __name__ == '__main__':
     # Créer les dossiers nécessaires
@@ -6,16 +6,47 @@ Utilise des techniques de machine learning pour détecter des anomalies
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from sklearn.cluster import DBSCAN
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, TruncatedSVD
 import logging
+import os
+
+from joblib import Parallel, delayed
+
+from core.data_utils import dataset_hash, find_time_column
+
+from .baseline import baseline_id, baseline_metadata, build_profiles, compare_profiles, write_metadata
+from .feature_hashing import HashedFeatureEncoder
+from .density_clustering import CLUSTERING_SAMPLE_SIZE, sampled_dbscan
+from .entity_baselines import entity_baselines, find_entity_column, find_ip_column
+from .model_store import ModelStore, model_key
+from .outlier_kernel import METHODS, matrix_outliers, score_outliers
+from .quantile_sketch import ColumnSketches
+from .sections import run_sections
+from .sequence_gaps import is_id_column_name
+from .time_buckets import TimeBucketIndex, detect_bursts
+
+# Isolation Forest : taille du sous-échantillon d'entraînement et des lots de scoring
+ISOLATION_FOREST_FIT_SAMPLE = 100000
+SCORING_BATCH_SIZE = 50000
 
 class AnomalyDetector:
-    def __init__(self, filepath):
+    def __init__(self, filepath, use_sketches=False, sketch_k=200, model_dir=None, hashed_features=False):
         self.filepath = filepath
         self.data = None
         self.logger = logging.getLogger(__name__)
+        # Statistiques approximées par sketches KLL (fusionnables, par morceaux)
+        self.use_sketches = use_sketches
+        self.sketch_k = sketch_k
+        # Modèles persistés à côté des fichiers analysés, indexés par hash
+        self.model_dir = model_dir or os.path.join(os.path.dirname(os.path.abspath(filepath)), 'models')
+        self.fit_sample_size = ISOLATION_FOREST_FIT_SAMPLE
+        self.batch_size = SCORING_BATCH_SIZE
+        self.n_jobs = -1
+        # Colonnes catégorielles et textuelles hachées en features creuses
+        self.hashed_features = hashed_features
+        # Index temporels partagés entre sections, calculés à la demande
+        self._time_indexes = {}
         
     def load_data(self):
         """Charge les données"""
@@ -52,185 +83,396 @@ class AnomalyDetector:
                 self.logger.error(f"Erreur chargement données: {str(e)}")
                 raise
     
-    def detect_anomalies(self):
-        """Détection complète d'anomalies"""
+    def detect_anomalies(self, sections=None, top_k=None, max_examples=None, progress=None):
+        """Détection complète d'anomalies (ou des seules sections demandées)"""
         if self.data is None:
             self.load_data()
         
-        anomalies = {
-            'statistical_outliers': self.detect_statistical_outliers(),
-            'isolation_forest_anomalies': self.detect_isolation_forest_anomalies(),
-            'clustering_anomalies': self.detect_clustering_anomalies(),
-            'pattern_based_anomalies': self.detect_pattern_based_anomalies(),
-            'temporal_anomalies': self.detect_temporal_anomalies(),
-            'text_anomalies': self.detect_text_anomalies(),
-            'summary': self.generate_anomaly_summary()
-        }
-        
-        return anomalies
+        return run_sections(self.section_steps(), sections, {'top_k': top_k, 'max_examples': max_examples},
+                            progress, len(self.data))
+    
+    def section_steps(self):
+        """Sections de la détection d'anomalies : (nom, méthode, bornes acceptées)"""
+        return [
+            ('statistical_outliers', self.detect_statistical_outliers, {'top_k': 'top_k'}),
+            ('isolation_forest_anomalies', self.detect_isolation_forest_anomalies, {'max_examples': 'max_examples'}),
+            ('clustering_anomalies', self.detect_clustering_anomalies, {'max_examples': 'max_examples'}),
+            ('pattern_based_anomalies', self.detect_pattern_based_anomalies, {'max_examples': 'max_examples'}),
+            ('temporal_anomalies', self.detect_temporal_anomalies, {'max_examples': 'max_examples'}),
+            ('text_anomalies', self.detect_text_anomalies, {'max_examples': 'max_examples'}),
+            ('entity_anomalies', self.detect_entity_anomalies, {'top_k': 'top_k'}),
+            ('bursts', self.detect_bursts, {'top_k': 'top_k'}),
+            ('summary', self.generate_anomaly_summary, {})
+        ]
     
-    def detect_statistical_outliers(self):
+    def detect_statistical_outliers(self, top_k=10):
         """Détection d'outliers statistiques"""
-        outliers = {}
+        numeric_data = self.data.select_dtypes(include=[np.number])
         
-        numeric_cols = self.data.select_dtypes(include=[np.number]).columns
+        if self.use_sketches:
+            bounds = self._sketch_bounds(numeric_data)
+            columns = [col for col in numeric_data.columns if bounds[col]['count'] > 10]
+            stats = {
+                key: np.array([bounds[col][key] for col in columns], dtype=np.float64)
+                for key in ['count', 'lower', 'upper', 'mean', 'std', 'median', 'mad']
+            }
+            # MAD approximée : pas de repli sur l'écart absolu moyen
+            stats['meanad'] = np.full(len(columns), np.nan)
+            matrix = numeric_data[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            result = score_outliers(matrix, stats, top_k)
+        else:
+            result = matrix_outliers(
+                numeric_data.to_numpy(dtype=np.float64, na_value=np.nan), top_k
+            )
+            stats = result['stats']
+            columns = list(numeric_data.columns)
         
-        for col in numeric_cols:
-            col_data = self.data[col].dropna()
-            if len(col_data) > 10:
-                # Méthode IQR
-                Q1 = col_data.quantile(0.25)
-                Q3 = col_data.quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                
-                iqr_outliers = col_data[(col_data < lower_bound) | (col_data > upper_bound)]
-                
-                # Méthode Z-score
-                z_scores = np.abs((col_data - col_data.mean()) / col_data.std())
-                zscore_outliers = col_data[z_scores > 3]
-                
-                # Méthode modified Z-score (plus robuste)
-                median = col_data.median()
-                mad = np.median(np.abs(col_data - median))
-                modified_z_scores = 0.6745 * (col_data - median) / mad
-                modified_zscore_outliers = col_data[np.abs(modified_z_scores) > 3.5]
-                
-                outliers[col] = {
-                    'iqr_outliers': {
-                        'count': len(iqr_outliers),
-                        'percentage': len(iqr_outliers) / len(col_data) * 100,
-                        'values': iqr_outliers.head(10).tolist(),
-                        'bounds': {'lower': lower_bound, 'upper': upper_bound}
-                    },
-                    'zscore_outliers': {
-                        'count': len(zscore_outliers),
-                        'percentage': len(zscore_outliers) / len(col_data) * 100,
-                        'values': zscore_outliers.head(10).tolist()
-                    },
-                    'modified_zscore_outliers': {
-                        'count': len(modified_zscore_outliers),
-                        'percentage': len(modified_zscore_outliers) / len(col_data) * 100,
-                        'values': modified_zscore_outliers.head(10).tolist()
-                    }
+        outliers = {}
+        for i, col in enumerate(columns):
+            total = int(stats['count'][i])
+            if total <= 10:
+                continue
+            
+            col_result = {}
+            for m, method in enumerate(METHODS):
+                present = result['rows'][m, :, i] >= 0
+                rows = result['rows'][m, present, i]
+                col_result[f'{method}_outliers'] = {
+                    'count': int(result['counts'][m, i]),
+                    'percentage': result['counts'][m, i] / total * 100,
+                    'values': result['values'][m, present, i].tolist(),
+                    'indices': numeric_data.index[rows].tolist()
                 }
+            
+            col_result['iqr_outliers']['bounds'] = {
+                'lower': float(stats['lower'][i]),
+                'upper': float(stats['upper'][i])
+            }
+            if self.use_sketches:
+                col_result['approximate'] = True
+            
+            outliers[col] = col_result
         
         return outliers
     
-    def detect_isolation_forest_anomalies(self):
+    def _sketch_bounds(self, numeric_data, chunksize=100000):
+        """Bornes d'outliers à partir de sketches KLL fusionnés par morceaux"""
+        sketches = ColumnSketches(k=self.sketch_k)
+        for start in range(0, len(numeric_data), chunksize):
+            sketches.update(numeric_data.iloc[start:start + chunksize])
+        return sketches.outlier_bounds()
+    
+    def detect_isolation_forest_anomalies(self, max_examples=20):
         """Détection d'anomalies avec Isolation Forest"""
         try:
-            numeric_data = self.data.select_dtypes(include=[np.number])
-            
-            if numeric_data.empty or len(numeric_data) < 10:
-                return {'error': 'Pas assez de données numériques'}
-            
-            # Préparation des données
-            numeric_data_clean = numeric_data.dropna()
-            if len(numeric_data_clean) < 10:
-                return {'error': 'Pas assez de données après nettoyage'}
-            
-            # Standardisation
-            scaler = StandardScaler()
-            scaled_data = scaler.fit_transform(numeric_data_clean)
-            
-            # Isolation Forest
-            isolation_forest = IsolationForest(
-                contamination=0.1,  # 10% d'anomalies attendues
-                random_state=42,
-                n_estimators=100
-            )
+            if self.hashed_features:
+                if len(self.data) < 10:
+                    return {'error': 'Pas assez de données'}
+                
+                # Toutes les colonnes : numériques standardisées + blocs hachés
+                encoder = HashedFeatureEncoder().fit(self.data)
+                matrix = encoder.transform(self.data)
+                rows_index = self.data.index
+                columns = list(encoder.column_slices)
+            else:
+                numeric_data = self.data.select_dtypes(include=[np.number])
+                
+                if numeric_data.empty or len(numeric_data) < 10:
+                    return {'error': 'Pas assez de données numériques'}
+                
+                # Préparation des données
+                numeric_data_clean = numeric_data.dropna()
+                if len(numeric_data_clean) < 10:
+                    return {'error': 'Pas assez de données après nettoyage'}
+                
+                encoder = None
+                matrix = numeric_data_clean.to_numpy(dtype=np.float64)
+                rows_index = numeric_data_clean.index
+                columns = list(numeric_data_clean.columns)
             
-            anomaly_labels = isolation_forest.fit_predict(scaled_data)
-            anomaly_scores = isolation_forest.decision_function(scaled_data)
+            artifact, reused = self._get_isolation_forest(matrix, columns, encoder)
             
-            # Identification des anomalies
-            anomalies_mask = anomaly_labels == -1
-            anomalous_indices = numeric_data_clean.index[anomalies_mask]
+            # Scoring de toutes les lignes par lots, en parallèle
+            anomaly_scores, anomaly_sums, normal_sums = self._batch_score(artifact, matrix)
+            anomalies_mask = anomaly_scores < 0
+            anomalous_indices = rows_index[anomalies_mask]
+            anomalous_positions = np.flatnonzero(anomalies_mask)
             
             # Analyse des anomalies
             anomaly_analysis = []
-            for idx in anomalous_indices[:20]:  # Limiter à 20 pour la performance
+            for idx, position in zip(anomalous_indices[:max_examples], anomalous_positions[:max_examples]):
                 row_data = self.data.loc[idx]
-                score = anomaly_scores[numeric_data_clean.index.get_loc(idx)]
                 
                 anomaly_analysis.append({
                     'index': int(idx),
-                    'anomaly_score': float(score),
+                    'anomaly_score': float(anomaly_scores[position]),
                     'data_sample': {col: str(row_data[col])[:100] for col in row_data.index[:5]}
                 })
             
+            n_anomalies = int(anomalies_mask.sum())
+            n_normal = len(anomaly_scores) - n_anomalies
+            
             return {
-                'total_anomalies': len(anomalous_indices),
-                'percentage': len(anomalous_indices) / len(numeric_data_clean) * 100,
+                'total_anomalies': n_anomalies,
+                'percentage': n_anomalies / len(anomaly_scores) * 100,
                 'anomaly_details': anomaly_analysis,
                 'feature_importance': self._calculate_feature_importance(
-                    scaled_data, anomaly_labels, numeric_data_clean.columns
-                )
+                    anomaly_sums / n_anomalies if n_anomalies else None,
+                    normal_sums / n_normal if n_normal else None,
+                    columns,
+                    encoder
+                ),
+                'model': {
+                    'key': artifact.get('key'),
+                    'reused': reused,
+                    'fit_rows': artifact['fit_rows'],
+                    'scored_rows': len(anomaly_scores)
+                }
             }
             
         except Exception as e:
             self.logger.error(f"Erreur Isolation Forest: {str(e)}")
             return {'error': str(e)}
     
-    def _calculate_feature_importance(self, data, labels, feature_names):
+    def _get_isolation_forest(self, matrix, columns, encoder=None):
+        """Charge le modèle persisté pour ce jeu de données ou l'entraîne sur un sous-échantillon"""
+        params = {
+            'columns': columns,
+            'hashed_features': encoder.n_features if encoder is not None else None,
+            'fit_sample_size': self.fit_sample_size,
+            'contamination': 0.1,
+            'n_estimators': 100,
+            'random_state': 42
+        }
+        
+        store, key = None, None
+        if os.path.exists(self.filepath):
+            store = ModelStore(self.model_dir)
+            key = model_key(dataset_hash(self.filepath), 'isolation_forest', params)
+            artifact = store.load(key)
+            if artifact is not None and artifact.get('columns') == columns:
+                return artifact, True
+        
+        artifact = self._fit_isolation_forest(matrix, columns, scale=encoder is None)
+        artifact['encoder'] = encoder
+        artifact['key'] = key
+        
+        if store is not None:
+            try:
+                store.save(key, artifact)
+            except Exception as e:
+                self.logger.warning(f"Persistance du modèle impossible: {str(e)}")
+        
+        return artifact, False
+    
+    def _fit_isolation_forest(self, matrix, columns, scale=True):
+        """Entraîne scaler et Isolation Forest sur un sous-échantillon borné"""
+        # Sous-échantillon aléatoire borné (reproductible)
+        n_rows = matrix.shape[0]
+        rng = np.random.default_rng(42)
+        if n_rows > self.fit_sample_size:
+            sample = matrix[np.sort(rng.choice(n_rows, self.fit_sample_size, replace=False))]
+        else:
+            sample = matrix
+        
+        # Standardisation (déjà faite par l'encodeur pour les features hachées)
+        scaler = StandardScaler() if scale else None
+        scaled_sample = scaler.fit_transform(sample) if scale else sample
+        
+        # Isolation Forest
+        isolation_forest = IsolationForest(
+            contamination=0.1,  # 10% d'anomalies attendues
+            random_state=42,
+            n_estimators=100,
+            max_samples='auto',
+            n_jobs=self.n_jobs
+        )
+        isolation_forest.fit(scaled_sample)
+        
+        return {
+            'columns': columns,
+            'scaler': scaler,
+            'model': isolation_forest,
+            'fit_rows': sample.shape[0]
+        }
+    
+    def register_baseline(self, name):
+        """Enregistre le jeu de données courant comme référence de confiance"""
+        if self.data is None:
+            self.load_data()
+        
+        numeric_data_clean = self.data.select_dtypes(include=[np.number]).dropna()
+        if len(numeric_data_clean) < 10:
+            return {'error': 'Pas assez de données numériques'}
+        
+        columns = list(numeric_data_clean.columns)
+        matrix = numeric_data_clean.to_numpy(dtype=np.float64)
+        artifact = self._fit_isolation_forest(matrix, columns)
+        
+        # Distribution des scores de référence, pour situer les scores futurs
+        scores, _, _ = self._batch_score(artifact, matrix)
+        artifact['score_quantiles'] = np.quantile(scores, [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
+        artifact['baseline_anomaly_rate'] = float((scores < 0).mean())
+        artifact['profiles'] = build_profiles(self.data)
+        
+        data_hash = dataset_hash(self.filepath)
+        key = baseline_id(name, data_hash)
+        artifact['key'] = key
+        
+        directory = os.path.join(self.model_dir, 'baselines')
+        ModelStore(directory).save(key, artifact)
+        metadata = baseline_metadata(
+            key, name, os.path.basename(self.filepath), data_hash,
+            columns, len(self.data), artifact['fit_rows']
+        )
+        write_metadata(directory, key, metadata)
+        
+        return metadata
+    
+    def score_against_baseline(self, key, top_k=20):
+        """Score les données courantes avec le modèle d'une baseline, sans réentraînement"""
+        # Chargement en mémoire projetée : les tableaux des arbres restent sur disque
+        artifact = ModelStore(os.path.join(self.model_dir, 'baselines')).load(key, mmap_mode='r')
+        if artifact is None:
+            return {'error': f'Baseline inconnue: {key}'}
+        
+        if self.data is None:
+            self.load_data()
+        
+        columns = artifact['columns']
+        missing = [col for col in columns if col not in self.data.columns]
+        if missing:
+            return {'error': f'Colonnes absentes des données: {missing}'}
+        
+        numeric_data_clean = self.data[columns].apply(pd.to_numeric, errors='coerce').dropna()
+        if numeric_data_clean.empty:
+            return {'error': 'Aucune ligne complète à scorer'}
+        
+        scores, anomaly_sums, normal_sums = self._batch_score(
+            artifact, numeric_data_clean.to_numpy(dtype=np.float64)
+        )
+        anomalies_mask = scores < 0
+        n_anomalies = int(anomalies_mask.sum())
+        n_normal = len(scores) - n_anomalies
+        
+        # Lignes les plus anormales en premier
+        worst = np.argsort(scores, kind='stable')[:top_k]
+        worst = worst[scores[worst] < 0]
+        
+        return {
+            'baseline': key,
+            'scored_rows': len(scores),
+            'skipped_rows': len(self.data) - len(scores),
+            'total_anomalies': n_anomalies,
+            'percentage': n_anomalies / len(scores) * 100,
+            'baseline_percentage': artifact['baseline_anomaly_rate'] * 100,
+            'score_quantiles': np.quantile(scores, [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]).tolist(),
+            'baseline_score_quantiles': np.asarray(artifact['score_quantiles']).tolist(),
+            'top_anomalies': [
+                {'index': int(numeric_data_clean.index[i]), 'anomaly_score': float(scores[i])}
+                for i in worst
+            ],
+            'feature_importance': self._calculate_feature_importance(
+                anomaly_sums / n_anomalies if n_anomalies else None,
+                normal_sums / n_normal if n_normal else None,
+                columns
+            ),
+            'column_drift': compare_profiles(artifact['profiles'], self.data)
+        }
+    
+    def _batch_score(self, artifact, matrix):
+        """Scores par lots bornés en mémoire, avec sommes par classe pour l'importance"""
+        scaler, model = artifact['scaler'], artifact['model']
+        
+        def score_batch(batch):
+            scaled = scaler.transform(batch) if scaler is not None else batch
+            scores = model.decision_function(scaled)
+            anomalous = scores < 0
+            return (
+                scores,
+                np.asarray(scaled[anomalous].sum(axis=0)).ravel(),
+                np.asarray(scaled[~anomalous].sum(axis=0)).ravel()
+            )
+        
+        batches = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(score_batch)(matrix[start:start + self.batch_size])
+            for start in range(0, matrix.shape[0], self.batch_size)
+        )
+        
+        scores = np.concatenate([batch[0] for batch in batches])
+        anomaly_sums = np.sum([batch[1] for batch in batches], axis=0)
+        normal_sums = np.sum([batch[2] for batch in batches], axis=0)
+        return scores, anomaly_sums, normal_sums
+    
+    def _calculate_feature_importance(self, anomaly_means, normal_means, feature_names, encoder=None):
         """Calcule l'importance des features pour les anomalies"""
         try:
-            anomalies = data[labels == -1]
-            normal = data[labels == 1]
-            
-            if len(anomalies) == 0 or len(normal) == 0:
+            if anomaly_means is None or normal_means is None:
                 return {}
             
-            importance = {}
-            for i, feature in enumerate(feature_names):
-                # Différence de moyenne entre anomalies et données normales
-                anomaly_mean = np.mean(anomalies[:, i])
-                normal_mean = np.mean(normal[:, i])
-                importance[feature] = abs(anomaly_mean - normal_mean)
+            if encoder is not None:
+                # Features hachées : écarts agrégés par colonne source
+                importance = encoder.aggregate_by_column(np.abs(anomaly_means - normal_means))
+            else:
+                importance = {}
+                for i, feature in enumerate(feature_names):
+                    # Différence de moyenne entre anomalies et données normales
+                    importance[feature] = float(abs(anomaly_means[i] - normal_means[i]))
             
             # Normalisation
             max_importance = max(importance.values()) if importance.values() else 1
+            if max_importance == 0:
+                return importance
             importance = {k: v/max_importance for k, v in importance.items()}
             
             return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
         except:
             return {}
     
-    def detect_clustering_anomalies(self):
+    def detect_clustering_anomalies(self, max_examples=20):
         """Détection d'anomalies par clustering"""
         try:
-            numeric_data = self.data.select_dtypes(include=[np.number]).dropna()
-            
-            if numeric_data.empty or len(numeric_data) < 10:
-                return {'error': 'Pas assez de données numériques'}
-            
-            # Standardisation
-            scaler = StandardScaler()
-            scaled_data = scaler.fit_transform(numeric_data)
+            if self.hashed_features:
+                numeric_data = self.data
+                if len(numeric_data) < 10:
+                    return {'error': 'Pas assez de données'}
+                
+                # Matrice creuse réduite par SVD tronquée (compatible CSR)
+                scaled_data = HashedFeatureEncoder().fit_transform(self.data)
+                reducer = TruncatedSVD(n_components=min(5, scaled_data.shape[1] - 1), random_state=42)
+            else:
+                numeric_data = self.data.select_dtypes(include=[np.number]).dropna()
+                
+                if numeric_data.empty or len(numeric_data) < 10:
+                    return {'error': 'Pas assez de données numériques'}
+                
+                # Standardisation
+                scaler = StandardScaler()
+                scaled_data = scaler.fit_transform(numeric_data)
+                reducer = PCA(n_components=min(5, scaled_data.shape[1]), random_state=42)
             
-            # Réduction de dimensionnalité si nécessaire
+            # Réduction de dimensionnalité si nécessaire (ajustée sur un échantillon)
             if scaled_data.shape[1] > 5:
-                pca = PCA(n_components=min(5, scaled_data.shape[1]))
-                scaled_data = pca.fit_transform(scaled_data)
+                rng = np.random.default_rng(42)
+                fit_rows = rng.choice(scaled_data.shape[0], min(scaled_data.shape[0], CLUSTERING_SAMPLE_SIZE), replace=False)
+                reducer.fit(scaled_data[fit_rows])
+                scaled_data = reducer.transform(scaled_data)
+            elif self.hashed_features:
+                scaled_data = scaled_data.toarray()
             
-            # DBSCAN clustering
-            dbscan = DBSCAN(eps=0.5, min_samples=5)
-            cluster_labels = dbscan.fit_predict(scaled_data)
+            # DBSCAN sur échantillon, eps estimé par k-distance, affectation par lots
+            cluster_labels, clustering_info = sampled_dbscan(scaled_data, min_samples=5)
             
             # Identification des anomalies (points avec label -1)
             anomalies_mask = cluster_labels == -1
             anomalous_indices = numeric_data.index[anomalies_mask]
             
-            # Analyse des clusters
-            unique_labels = set(cluster_labels)
+            # Analyse des clusters (tailles par comptage unique)
+            unique_labels, cluster_sizes = np.unique(cluster_labels, return_counts=True)
             cluster_info = {}
             
-            for label in unique_labels:
+            for label, cluster_size in zip(unique_labels, cluster_sizes):
                 if label != -1:  # Exclure les anomalies
-                    cluster_mask = cluster_labels == label
-                    cluster_size = np.sum(cluster_mask)
                     cluster_info[f'cluster_{label}'] = {
                         'size': int(cluster_size),
                         'percentage': float(cluster_size / len(cluster_labels) * 100)
@@ -239,16 +481,18 @@ class AnomalyDetector:
             return {
                 'total_anomalies': len(anomalous_indices),
                 'percentage': len(anomalous_indices) / len(numeric_data) * 100,
-                'anomalous_indices': anomalous_indices[:20].tolist(),
+                'anomalous_indices': anomalous_indices[:max_examples].tolist(),
                 'cluster_info': cluster_info,
-                'total_clusters': len(unique_labels) - (1 if -1 in unique_labels else 0)
+                'total_clusters': len(cluster_info),
+                'eps': clustering_info['eps'],
+                'sample_size': clustering_info['sample_size']
             }
             
         except Exception as e:
             self.logger.error(f"Erreur clustering: {str(e)}")
             return {'error': str(e)}
     
-    def detect_pattern_based_anomalies(self):
+    def detect_pattern_based_anomalies(self, max_examples=5):
         """Détection d'anomalies basée sur les patterns"""
         pattern_anomalies = []
         
@@ -264,13 +508,13 @@ class AnomalyDetector:
                     singleton_percentage = singleton_count / len(value_counts) * 100
                     
                     if singleton_percentage < 10 and singleton_count > 0:
-                        singletons = value_counts[value_counts == 1].index.tolist()
+                        singletons = value_counts[value_counts == 1].index[:max_examples].tolist()
                         pattern_anomalies.append({
                             'column': col,
                             'type': 'rare_values',
                             'count': singleton_count,
                             'percentage': singleton_percentage,
-                            'examples': singletons[:5]
+                            'examples': singletons
                         })
                 
                 # Valeurs extrêmement fréquentes
@@ -304,14 +548,14 @@ class AnomalyDetector:
                                 'column': col,
                                 'type': 'abnormal_length',
                                 'count': len(length_anomalies),
-                                'examples': length_anomalies.head(3).tolist(),
+                                'examples': length_anomalies.head(max_examples).tolist(),
                                 'mean_length': mean_length,
-                                'anomaly_lengths': lengths[z_scores > 3].tolist()[:5]
+                                'anomaly_lengths': lengths[z_scores > 3].head(max_examples).tolist()
                             })
         
         return pattern_anomalies
     
-    def detect_temporal_anomalies(self):
+    def detect_temporal_anomalies(self, max_examples=3):
         """Détection d'anomalies temporelles"""
         temporal_anomalies = []
         
@@ -345,35 +589,113 @@ class AnomalyDetector:
                                     'count': len(large_gaps),
                                     'largest_gap': str(large_gaps.max()),
                                     'mean_interval': str(mean_interval),
-                                    'gap_locations': [str(d) for d in sorted_dates[intervals > threshold][:3]]
+                                    'gap_locations': [str(d) for d in sorted_dates[intervals > threshold][:max_examples]]
                                 })
                     
                     # Détection de bursts (beaucoup d'activité en peu de temps)
-                    date_counts = dates.dt.date.value_counts()
-                    if len(date_counts) > 1:
+                    index = self._time_index(col)
+                    daily_counts = index.counts('day')
+                    # Jours actifs uniquement, comme un comptage par date
+                    active_days = np.flatnonzero(daily_counts)
+                    if len(active_days) > 1:
+                        date_counts = daily_counts[active_days]
                         mean_daily_count = date_counts.mean()
-                        std_daily_count = date_counts.std()
+                        std_daily_count = date_counts.std(ddof=1)
                         
                         if std_daily_count > 0:
                             burst_threshold = mean_daily_count + 3 * std_daily_count
-                            burst_days = date_counts[date_counts > burst_threshold]
+                            burst = date_counts > burst_threshold
+                            burst_days = active_days[burst][np.argsort(-date_counts[burst], kind='stable')]
                             
                             if len(burst_days) > 0:
                                 temporal_anomalies.append({
                                     'column': col,
                                     'type': 'activity_bursts',
                                     'count': len(burst_days),
-                                    'burst_days': [str(d) for d in burst_days.index[:3]],
-                                    'max_daily_activity': int(burst_days.max()),
+                                    'burst_days': [str(index.bucket_start('day', d).date()) for d in burst_days[:max_examples]],
+                                    'max_daily_activity': int(daily_counts[burst_days[0]]),
                                     'mean_daily_activity': float(mean_daily_count)
                                 })
+                    
+                    # Rafales à la minute et à l'heure (connexions scriptées...)
+                    for resolution, bursts in detect_bursts(index, top_k=max_examples).items():
+                        if resolution == 'day' or 'kleinberg' not in bursts or bursts['kleinberg']['count'] == 0:
+                            continue
+                        temporal_anomalies.append({
+                            'column': col,
+                            'type': f'{resolution}_bursts',
+                            'count': bursts['kleinberg']['count'],
+                            'bursts': bursts['kleinberg']['bursts'],
+                            'mean_activity': bursts['mean_count']
+                        })
                         
             except Exception as e:
                 self.logger.error(f"Erreur analyse temporelle {col}: {str(e)}")
         
         return temporal_anomalies
     
-    def detect_text_anomalies(self):
+    def detect_entity_anomalies(self, entity_columns=None, value_columns=None, threshold=3.5,
+                                min_group_size=5, top_k=20):
+        """Écarts de chaque ligne par rapport à la baseline de sa propre entité"""
+        if self.data is None:
+            self.load_data()
+        
+        try:
+            if entity_columns is None:
+                entity_column = find_entity_column(self.data)
+                if entity_column is None:
+                    return {'error': 'Aucune colonne d\'entité détectée'}
+                entity_columns = [entity_column]
+            elif isinstance(entity_columns, str):
+                entity_columns = [entity_columns]
+            
+            if value_columns is None:
+                value_columns = [
+                    col for col in self.data.select_dtypes(include=[np.number]).columns
+                    if col not in entity_columns and not is_id_column_name(col)
+                ]
+            
+            return entity_baselines(
+                self.data,
+                entity_columns,
+                value_columns,
+                time_column=find_time_column(self.data),
+                ip_column=find_ip_column(self.data),
+                threshold=threshold,
+                min_group_size=min_group_size,
+                top_k=top_k
+            )
+        except Exception as e:
+            self.logger.error(f"Erreur baselines par entité: {str(e)}")
+            return {'error': str(e)}
+    
+    def detect_bursts(self, time_column=None, threshold=3.0, top_k=10):
+        """Rafales d'activité par minute, heure et jour (z-score, fenêtre glissante, Kleinberg)"""
+        if self.data is None:
+            self.load_data()
+        
+        time_column = time_column or find_time_column(self.data)
+        if time_column is None:
+            return {'error': 'Aucune colonne temporelle détectée'}
+        
+        try:
+            index = self._time_index(time_column)
+            return {
+                'time_column': time_column,
+                'resolutions': detect_bursts(index, threshold=threshold, top_k=top_k)
+            }
+        except Exception as e:
+            self.logger.error(f"Erreur détection de rafales: {str(e)}")
+            return {'error': str(e)}
+    
+    def _time_index(self, column):
+        """Index de comptages temporels d'une colonne, construit une fois (rafales et anomalies temporelles)"""
+        if column not in self._time_indexes:
+            dates = pd.to_datetime(self.data[column], errors='coerce')
+            self._time_indexes[column] = TimeBucketIndex.from_times(dates.to_numpy(dtype='datetime64[ns]'))
+        return self._time_indexes[column]
+    
+    def detect_text_anomalies(self, max_examples=5):
         """Détection d'anomalies dans le texte"""
         text_anomalies = []
         
@@ -383,30 +705,36 @@ class AnomalyDetector:
                 
                 if len(text_data) > 10:
                     # Détection d'encoding/caractères suspects
+                    # Comptage complet, exemples conservés au plus max_examples
                     encoding_issues = []
+                    encoding_count = 0
                     for idx, text in text_data.items():
                         try:
                             # Vérification des caractères non-printables
                             non_printable = sum(1 for c in text if ord(c) < 32 and c not in '\t\n\r')
                             if non_printable > 0:
+                                encoding_count += 1
+                                if len(encoding_issues) < max_examples:
+                                    encoding_issues.append({
+                                        'index': idx,
+                                        'text_preview': text[:50],
+                                        'non_printable_count': non_printable
+                                    })
+                        except:
+                            encoding_count += 1
+                            if len(encoding_issues) < max_examples:
                                 encoding_issues.append({
                                     'index': idx,
-                                    'text_preview': text[:50],
-                                    'non_printable_count': non_printable
+                                    'text_preview': str(text)[:50],
+                                    'error': 'encoding_error'
                                 })
-                        except:
-                            encoding_issues.append({
-                                'index': idx,
-                                'text_preview': str(text)[:50],
-                                'error': 'encoding_error'
-                            })
                     
-                    if len(encoding_issues) > 0:
+                    if encoding_count > 0:
                         text_anomalies.append({
                             'column': col,
                             'type': 'encoding_anomalies',
-                            'count': len(encoding_issues),
-                            'examples': encoding_issues[:5]
+                            'count': encoding_count,
+                            'examples': encoding_issues
                         })
                     
                     # Détection de patterns de hash/encoded data
@@ -426,24 +754,27 @@ class AnomalyDetector:
                             'type': 'encoded_data',
                             'count': len(potential_hashes),
                             'percentage': len(potential_hashes) / len(text_data) * 100,
-                            'examples': potential_hashes[:3]
+                            'examples': potential_hashes[:max_examples]
                         })
                     
                     # Détection de texte très répétitif
                     repetitive_texts = []
+                    repetitive_count = 0
                     for text in text_data:
                         if len(text) > 10:
                             # Vérification de caractères répétés
                             max_char_repeat = max([text.count(c) for c in set(text)] + [0])
                             if max_char_repeat > len(text) * 0.5:  # Plus de 50% du même caractère
-                                repetitive_texts.append(text[:50])
+                                repetitive_count += 1
+                                if len(repetitive_texts) < max_examples:
+                                    repetitive_texts.append(text[:50])
                     
-                    if len(repetitive_texts) > 0:
+                    if repetitive_count > 0:
                         text_anomalies.append({
                             'column': col,
                             'type': 'repetitive_text',
-                            'count': len(repetitive_texts),
-                            'examples': repetitive_texts[:3]
+                            'count': repetitive_count,
+                            'examples': repetitive_texts
                         })
         
         return text_anomalies
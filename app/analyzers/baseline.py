@@ -0,0 +1,150 @@
+"""
+Modèles de référence (baselines)
+Profils de colonnes d'un jeu de données de confiance et mesure de dérive
+"""
+
+import datetime
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Nombre de classes des histogrammes numériques et de modalités conservées
+PROFILE_BINS = 20
+PROFILE_TOP_VALUES = 50
+
+# Seuils usuels du Population Stability Index
+PSI_THRESHOLDS = (0.1, 0.25)
+
+
+def baseline_id(name, data_hash):
+    """Identifiant stable d'une baseline : nom nettoyé et début du hash"""
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_') or 'baseline'
+    return f"{slug}_{data_hash[:12]}"
+
+
+def build_profiles(frame, bins=PROFILE_BINS, top_values=PROFILE_TOP_VALUES):
+    """Profil de chaque colonne : taux de nulls et distribution des valeurs"""
+    profiles = {}
+    for col in frame.columns:
+        series = frame[col]
+        profile = {'null_rate': float(series.isnull().mean())}
+
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[np.isfinite(values)]
+            if len(values) == 0:
+                continue
+            # Classes de même effectif sur la baseline (déciles étendus)
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)))
+            counts, _ = np.histogram(values, bins=np.r_[-np.inf, edges[1:-1], np.inf])
+            profile.update({
+                'kind': 'numeric',
+                'mean': float(values.mean()),
+                'std': float(values.std()),
+                'edges': edges[1:-1],
+                'distribution': counts / counts.sum()
+            })
+        else:
+            frequencies = series.dropna().astype(str).value_counts(normalize=True)
+            top = frequencies.head(top_values)
+            profile.update({
+                'kind': 'categorical',
+                'distinct': int(len(frequencies)),
+                'values': top.index.tolist(),
+                'distribution': np.r_[top.to_numpy(), max(0.0, 1 - top.sum())]
+            })
+
+        profiles[col] = profile
+    return profiles
+
+
+def population_stability_index(expected, actual, epsilon=1e-6):
+    expected = np.clip(np.asarray(expected, dtype=np.float64), epsilon, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), epsilon, None)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def _drift_level(psi):
+    if psi < PSI_THRESHOLDS[0]:
+        return 'stable'
+    if psi < PSI_THRESHOLDS[1]:
+        return 'moderate'
+    return 'significant'
+
+
+def compare_profiles(profiles, frame):
+    """Dérive de chaque colonne par rapport à son profil de référence"""
+    drift = {}
+    for col, profile in profiles.items():
+        if col not in frame.columns:
+            drift[col] = {'status': 'missing_column'}
+            continue
+
+        series = frame[col]
+        result = {
+            'null_rate': float(series.isnull().mean()),
+            'baseline_null_rate': profile['null_rate']
+        }
+
+        if profile['kind'] == 'numeric':
+            values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[np.isfinite(values)]
+            if len(values) == 0:
+                drift[col] = {**result, 'status': 'no_values'}
+                continue
+            counts, _ = np.histogram(values, bins=np.r_[-np.inf, profile['edges'], np.inf])
+            actual = counts / counts.sum()
+            std = profile['std'] if profile['std'] > 0 else 1.0
+            result['mean_shift_std'] = float((values.mean() - profile['mean']) / std)
+        else:
+            values = series.dropna().astype(str)
+            if len(values) == 0:
+                drift[col] = {**result, 'status': 'no_values'}
+                continue
+            codes = pd.Categorical(values, categories=profile['values']).codes
+            counts = np.bincount(np.where(codes < 0, len(profile['values']), codes),
+                                 minlength=len(profile['values']) + 1)
+            actual = counts / counts.sum()
+            result['unseen_value_rate'] = float(actual[-1])
+
+        psi = population_stability_index(profile['distribution'], actual)
+        result.update({'psi': psi, 'status': _drift_level(psi)})
+        drift[col] = result
+
+    return drift
+
+
+def write_metadata(directory, key, metadata):
+    """Fiche JSON à côté du modèle, pour lister les baselines sans les charger"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{key}.json"), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False)
+
+
+def list_baselines(directory):
+    """Baselines enregistrées, les plus récentes d'abord"""
+    if not os.path.isdir(directory):
+        return []
+
+    baselines = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                baselines.append(json.load(f))
+    return sorted(baselines, key=lambda b: b.get('created', ''), reverse=True)
+
+
+def baseline_metadata(key, name, source, data_hash, columns, rows, fit_rows):
+    return {
+        'id': key,
+        'name': name,
+        'source': source,
+        'sha256': data_hash,
+        'columns': columns,
+        'rows': rows,
+        'fit_rows': fit_rows,
+        'created': datetime.datetime.now().isoformat()
+    }
@@ -0,0 +1,229 @@
+"""
+Analyse de Benford vectorisée
+Extraction des digits par log10/mantisse et tests de conformité (chi², MAD, Z)
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import stats
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+
+def _first_digit_expected():
+    digits = np.arange(1, 10)
+    return digits, np.log10(1 + 1 / digits)
+
+
+def _second_digit_expected():
+    digits = np.arange(0, 10)
+    first = np.arange(1, 10)[:, None]
+    return digits, np.log10(1 + 1 / (10 * first + digits)).sum(axis=0)
+
+
+def _first_two_expected():
+    digits = np.arange(10, 100)
+    return digits, np.log10(1 + 1 / digits)
+
+
+def _last_two_expected():
+    digits = np.arange(0, 100)
+    return digits, np.full(100, 0.01)
+
+
+# Configuration des tests : distribution attendue, seuils MAD de Nigrini
+# (conformité proche / acceptable / marginale) et taille minimale d'échantillon
+TESTS = {
+    'first_digit': {
+        'expected': _first_digit_expected(),
+        'mad_thresholds': (0.006, 0.012, 0.015),
+        'min_count': 30
+    },
+    'second_digit': {
+        'expected': _second_digit_expected(),
+        'mad_thresholds': (0.008, 0.010, 0.012),
+        'min_count': 50
+    },
+    'first_two_digits': {
+        'expected': _first_two_expected(),
+        'mad_thresholds': (0.0012, 0.0018, 0.0022),
+        'min_count': 300
+    },
+    'last_two_digits': {
+        'expected': _last_two_expected(),
+        'mad_thresholds': (0.0012, 0.0018, 0.0022),
+        'min_count': 300
+    }
+}
+
+CONFORMITY_LEVELS = ('close_conformity', 'acceptable_conformity', 'marginal_conformity', 'nonconformity')
+
+
+def first_two_digits(values):
+    """Deux premiers digits significatifs (10-99) via log10 et mantisse, -1 si indéfini"""
+    x = np.abs(np.asarray(values, dtype=np.float64))
+    valid = np.isfinite(x) & (x > 0)
+    result = np.full(len(x), -1, dtype=np.int64)
+    if not np.any(valid):
+        return result
+
+    x = x[valid]
+    exponent = np.floor(np.log10(x))
+    scaled = np.floor(x * 10.0 ** (1 - exponent) + 1e-9)
+
+    # Correction des erreurs d'arrondi de log10 autour des puissances de 10
+    exponent = exponent + (scaled >= 100) - (scaled < 10)
+    scaled = np.floor(x * 10.0 ** (1 - exponent) + 1e-9)
+
+    result[valid] = np.clip(scaled, 10, 99).astype(np.int64)
+    return result
+
+
+def extract_digits(values, test='first_digit'):
+    """Digits testés pour chaque valeur (-1 pour les valeurs non éligibles)"""
+    if test == 'last_two_digits':
+        x = np.abs(np.asarray(values, dtype=np.float64))
+        # Test des deux derniers digits : partie entière des valeurs >= 10
+        valid = np.isfinite(x) & (x >= 10)
+        result = np.full(len(x), -1, dtype=np.int64)
+        result[valid] = np.mod(np.floor(x[valid]), 100).astype(np.int64)
+        return result
+
+    digits = first_two_digits(values)
+    valid = digits >= 0
+
+    if test == 'first_digit':
+        return np.where(valid, digits // 10, -1)
+    if test in ('second_digit', 'first_two_digits'):
+        # Seules les valeurs >= 10 ont un second digit (Nigrini) : 5 ne doit pas compter comme 50
+        with np.errstate(invalid='ignore'):
+            valid &= np.abs(np.asarray(values, dtype=np.float64)) >= 10
+        if test == 'second_digit':
+            return np.where(valid, digits % 10, -1)
+        return np.where(valid, digits, -1)
+
+    raise ValueError(f"Test de Benford inconnu: {test}")
+
+
+def _conformity(mad, thresholds):
+    """Classe de conformité de Nigrini pour un ou plusieurs MAD"""
+    levels = np.searchsorted(np.asarray(thresholds), mad, side='right')
+    return np.asarray(CONFORMITY_LEVELS)[levels]
+
+
+def _statistics(counts, expected):
+    """Chi², MAD et Z par digit pour une matrice de comptages (groupes x digits)"""
+    totals = counts.sum(axis=1, keepdims=True).astype(np.float64)
+    safe_totals = np.where(totals > 0, totals, 1)
+    observed = counts / safe_totals
+    difference = observed - expected
+
+    chi_square = (safe_totals * difference ** 2 / expected).sum(axis=1)
+    mad = np.abs(difference).mean(axis=1)
+
+    # Z-statistique avec correction de continuité (Nigrini)
+    correction = np.minimum(1 / (2 * safe_totals), np.abs(difference))
+    z_scores = (np.abs(difference) - correction) / np.sqrt(expected * (1 - expected) / safe_totals)
+
+    return observed, chi_square, mad, z_scores
+
+
+def benford_test(values, test='first_digit', z_threshold=1.96):
+    """Test de Benford complet sur un tableau de valeurs"""
+    if test not in TESTS:
+        raise ValueError(f"Test de Benford inconnu: {test}")
+
+    config = TESTS[test]
+    digit_labels, expected = config['expected']
+    offset = digit_labels[0]
+
+    digits = extract_digits(values, test)
+    digits = digits[digits >= 0]
+    total = len(digits)
+
+    if total < config['min_count']:
+        return {'test': test, 'sample_size': total, 'error': 'Échantillon insuffisant'}
+
+    counts = np.bincount(digits - offset, minlength=len(digit_labels))[None, :]
+    observed, chi_square, mad, z_scores = _statistics(counts, expected)
+    degrees_of_freedom = len(digit_labels) - 1
+
+    result = {
+        'test': test,
+        'sample_size': total,
+        'chi_square': float(chi_square[0]),
+        'degrees_of_freedom': degrees_of_freedom,
+        'mad': float(mad[0]),
+        'conformity': str(_conformity(mad, config['mad_thresholds'])[0]),
+        'digits': {
+            int(digit): {
+                'count': int(counts[0, i]),
+                'observed': float(observed[0, i]),
+                'expected': float(expected[i]),
+                'z_score': float(z_scores[0, i])
+            }
+            for i, digit in enumerate(digit_labels)
+        },
+        'significant_digits': [
+            int(digit_labels[i]) for i in np.flatnonzero(z_scores[0] > z_threshold)
+        ]
+    }
+
+    if HAS_SCIPY:
+        result['p_value'] = float(stats.chi2.sf(chi_square[0], degrees_of_freedom))
+
+    return result
+
+
+def benford_by_group(values, groups, test='first_digit', min_count=None, top_k=20):
+    """Test de Benford par groupe (ex: par utilisateur) en une seule passe bincount"""
+    if test not in TESTS:
+        raise ValueError(f"Test de Benford inconnu: {test}")
+
+    config = TESTS[test]
+    digit_labels, expected = config['expected']
+    n_digits = len(digit_labels)
+    min_count = config['min_count'] if min_count is None else min_count
+
+    digits = extract_digits(values, test)
+    group_codes, group_names = pd.factorize(pd.Series(groups), sort=False)
+    valid = (digits >= 0) & (group_codes >= 0)
+
+    n_groups = len(group_names)
+    flat_index = group_codes[valid] * n_digits + (digits[valid] - digit_labels[0])
+    counts = np.bincount(flat_index, minlength=n_groups * n_digits).reshape(n_groups, n_digits)
+
+    totals = counts.sum(axis=1)
+    eligible = np.flatnonzero(totals >= min_count)
+    if len(eligible) == 0:
+        return {'test': test, 'groups_tested': 0, 'groups': []}
+
+    _, chi_square, mad, z_scores = _statistics(counts[eligible], expected)
+    conformity = _conformity(mad, config['mad_thresholds'])
+
+    # Groupes les moins conformes en premier
+    order = np.argsort(-mad, kind='stable')[:top_k]
+
+    groups_result = []
+    for position in order:
+        row = eligible[position]
+        worst_digit = int(np.argmax(z_scores[position]))
+        groups_result.append({
+            'group': str(group_names[row]),
+            'sample_size': int(totals[row]),
+            'chi_square': float(chi_square[position]),
+            'mad': float(mad[position]),
+            'conformity': str(conformity[position]),
+            'most_deviant_digit': int(digit_labels[worst_digit]),
+            'most_deviant_z_score': float(z_scores[position, worst_digit])
+        })
+
+    return {
+        'test': test,
+        'groups_tested': int(len(eligible)),
+        'nonconforming_groups': int((conformity == 'nonconformity').sum()),
+        'groups': groups_result
+    }
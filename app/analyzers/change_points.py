@@ -0,0 +1,186 @@
+"""
+Détection de ruptures sur séries numériques ordonnées dans le temps
+CUSUM et segmentation binaire pénalisée (O(n log n)) calculées par sommes cumulées
+"""
+
+import numpy as np
+import pandas as pd
+
+# Au-delà, la série est réduite à des moyennes de blocs consécutifs
+MAX_SERIES_POINTS = 200000
+
+# Taille minimale d'un segment et nombre maximal de ruptures recherchées
+MIN_SEGMENT_SIZE = 10
+MAX_CHANGE_POINTS = 20
+
+# Multiplicateur de la pénalité BIC (2·σ²·log n)
+PENALTY_FACTOR = 2.0
+
+
+def kolmogorov_sf(x):
+    """P(K > x) de la loi de Kolmogorov (loi limite du maximum de CUSUM normalisé)"""
+    x = np.asarray(x, dtype=np.float64)
+    k = np.arange(1, 101)[:, None]
+    with np.errstate(over='ignore'):
+        terms = 2 * (-1.0) ** (k - 1) * np.exp(-2 * k ** 2 * np.maximum(x.ravel(), 1e-3) ** 2)
+    return np.clip(terms.sum(axis=0), 0.0, 1.0).reshape(x.shape)
+
+
+def robust_noise_scale(values):
+    """Écart-type du bruit estimé par la MAD des différences premières (insensible aux ruptures)"""
+    if len(values) < 3:
+        return float(np.std(values))
+    differences = np.diff(values)
+    mad = np.median(np.abs(differences - np.median(differences)))
+    scale = mad / 0.6745 / np.sqrt(2)
+    return float(scale) if scale > 0 else float(np.std(values))
+
+
+def block_means(values, max_points=MAX_SERIES_POINTS):
+    """Réduction d'une série trop longue en moyennes de blocs ; renvoie aussi le début de chaque bloc"""
+    n = len(values)
+    if n <= max_points:
+        return values, np.arange(n)
+    block = -(-n // max_points)
+    starts = np.arange(0, n, block)
+    sums = np.add.reduceat(values, starts)
+    return sums / np.diff(np.r_[starts, n]), starts
+
+
+def cusum(values, sigma=None):
+    """Rupture unique la plus probable : maximum de |S_k| des écarts cumulés à la moyenne"""
+    n = len(values)
+    sigma = robust_noise_scale(values) if sigma is None else sigma
+    partial = np.cumsum(values - values.mean())[:-1]
+    if n < 2 or sigma == 0:
+        return {'position': None, 'statistic': 0.0, 'p_value': 1.0}
+
+    position = int(np.argmax(np.abs(partial)))
+    statistic = float(np.abs(partial[position]) / (sigma * np.sqrt(n)))
+    return {'position': position + 1, 'statistic': statistic, 'p_value': float(kolmogorov_sf(statistic))}
+
+
+def _best_split(cumulative, start, end, min_size):
+    """Meilleure coupure de [start, end[ : réduction maximale de la somme des carrés intra-segment"""
+    n = end - start
+    if n < 2 * min_size:
+        return None, 0.0
+    splits = np.arange(start + min_size, end - min_size + 1)
+    left_n = splits - start
+    right_n = end - splits
+    left_sum = cumulative[splits] - cumulative[start]
+    right_sum = cumulative[end] - cumulative[splits]
+    total = cumulative[end] - cumulative[start]
+    # SSE(segment) - SSE(gauche) - SSE(droite), par les sommes cumulées
+    gains = left_sum ** 2 / left_n + right_sum ** 2 / right_n - total ** 2 / n
+    best = int(np.argmax(gains))
+    return int(splits[best]), float(gains[best])
+
+
+def binary_segmentation(values, penalty=None, min_size=MIN_SEGMENT_SIZE, max_changes=MAX_CHANGE_POINTS,
+                        sigma=None):
+    """Segmentation binaire pénalisée : on coupe tant que le gain dépasse la pénalité
+
+    Chaque niveau de découpe parcourt la série une fois par sommes cumulées, d'où O(n log n).
+    """
+    n = len(values)
+    sigma = robust_noise_scale(values) if sigma is None else sigma
+    if penalty is None:
+        penalty = PENALTY_FACTOR * sigma ** 2 * np.log(max(n, 2))
+
+    cumulative = np.r_[0.0, np.cumsum(values)]
+
+    # Meilleure coupure de chaque segment en attente, calculée une seule fois
+    candidates = [(0, n) + _best_split(cumulative, 0, n, min_size)]
+    changes = []
+    while candidates and len(changes) < max_changes:
+        # Segment offrant le plus grand gain d'abord
+        best = max(range(len(candidates)), key=lambda i: candidates[i][3])
+        start, end, split, gain = candidates.pop(best)
+        if split is None or gain <= penalty:
+            break
+        changes.append((split, gain, start, end))
+        candidates.append((start, split) + _best_split(cumulative, start, split, min_size))
+        candidates.append((split, end) + _best_split(cumulative, split, end, min_size))
+
+    return sorted(changes), penalty
+
+
+def _segment_stats(values, boundaries):
+    segments = []
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        segment = values[start:end]
+        segments.append((start, end, float(segment.mean()), float(segment.std())))
+    return segments
+
+
+def detect_change_points(times, values, index=None, max_points=MAX_SERIES_POINTS, min_size=MIN_SEGMENT_SIZE,
+                         max_changes=MAX_CHANGE_POINTS, penalty_factor=PENALTY_FACTOR):
+    """Ruptures de moyenne d'une série triée par horodatage, avec moyennes des segments et confiance"""
+    times = np.asarray(times, dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=np.float64)
+    index = np.arange(len(values)) if index is None else np.asarray(index)
+
+    valid = ~np.isnat(times) & np.isfinite(values)
+    order = np.argsort(times[valid], kind='stable')
+    times, values, index = times[valid][order], values[valid][order], index[valid][order]
+    if len(values) < 2 * min_size:
+        return {'error': 'Série trop courte', 'points': int(len(values))}
+
+    # Mode échantillonné : moyennes de blocs consécutifs
+    reduced, block_starts = block_means(values, max_points)
+    sampled = len(reduced) < len(values)
+
+    sigma = robust_noise_scale(reduced)
+    point_sigma = robust_noise_scale(values) if sampled else sigma
+    penalty = penalty_factor * sigma ** 2 * np.log(len(reduced))
+    changes, penalty = binary_segmentation(reduced, penalty, min_size, max_changes, sigma)
+    boundaries = [0] + [split for split, _, _, _ in changes] + [len(reduced)]
+
+    # Statistiques des segments sur les points d'origine
+    original_boundaries = [int(block_starts[b]) if b < len(reduced) else len(values) for b in boundaries]
+    segments = _segment_stats(values, original_boundaries)
+
+    change_points = []
+    for i, (split, gain, start, end) in enumerate(changes):
+        # Confiance : CUSUM du segment parent, normalisé par le bruit global
+        parent = cusum(reduced[start:end], sigma)
+        position = int(block_starts[split])
+        before, after = segments[i], segments[i + 1]
+        change_points.append({
+            'time': pd.Timestamp(times[position]).isoformat(),
+            'row': index[position].item() if hasattr(index[position], 'item') else index[position],
+            'position': position,
+            'mean_before': before[2],
+            'mean_after': after[2],
+            'shift': after[2] - before[2],
+            'shift_sigma': float((after[2] - before[2]) / point_sigma) if point_sigma > 0 else None,
+            'gain': gain,
+            'confidence': 1.0 - float(parent['p_value'])
+        })
+
+    overall = cusum(reduced, sigma)
+    return {
+        'points': int(len(values)),
+        'sampled': sampled,
+        'analyzed_points': int(len(reduced)),
+        'noise_sigma': point_sigma,
+        'penalty': float(penalty),
+        'cusum': {
+            'time': pd.Timestamp(times[block_starts[overall['position']]]).isoformat()
+            if overall['position'] is not None else None,
+            'statistic': overall['statistic'],
+            'p_value': overall['p_value']
+        },
+        'change_points': change_points,
+        'segments': [
+            {
+                'start': pd.Timestamp(times[start]).isoformat(),
+                'end': pd.Timestamp(times[end - 1]).isoformat(),
+                'points': int(end - start),
+                'mean': mean,
+                'std': std
+            }
+            for start, end, mean, std in segments
+        ]
+    }
@@ -0,0 +1,140 @@
+"""
+Détecteur d'accès concurrents et de sauts d'IP
+Comptage distinct sur fenêtre glissante : IP par utilisateur et utilisateurs par IP
+"""
+
+import numpy as np
+import pandas as pd
+
+# Fenêtre glissante et nombre de valeurs distinctes à partir duquel une fenêtre est signalée
+CONCURRENT_WINDOW_MINUTES = 10
+MIN_DISTINCT_VALUES = 3
+
+# Valeurs et lignes détaillées au plus par incident
+MAX_INCIDENT_VALUES = 20
+MAX_INCIDENT_ROWS = 50
+
+NANOSECONDS_PER_MINUTE = 60 * 10 ** 9
+
+
+def window_starts(keys, times, window):
+    """Début de la fenêtre ]t - window, t] de chaque événement, dans un tableau trié par (clé, temps)
+
+    Les temps sont remplacés par leur rang parmi les instants distincts, ce qui permet
+    une recherche dichotomique unique sur une clé composite (clé, rang) sans débordement.
+    """
+    distinct_times = np.unique(times)
+    ranks = np.searchsorted(distinct_times, times, side='right')
+    bounds = np.searchsorted(distinct_times, times - window, side='right')
+
+    width = np.int64(len(distinct_times) + 1)
+    composite = keys * width + ranks
+    return np.searchsorted(composite, keys * width + bounds, side='right')
+
+
+def previous_occurrence(keys, values):
+    """Position précédente du même couple (clé, valeur) dans l'ordre trié, -1 sinon"""
+    positions = np.arange(len(keys))
+    order = np.lexsort((positions, values, keys))
+    same = np.r_[False, (keys[order][1:] == keys[order][:-1]) & (values[order][1:] == values[order][:-1])]
+
+    previous = np.full(len(keys), -1, dtype=np.int64)
+    previous[order[same]] = order[np.flatnonzero(same) - 1]
+    return previous
+
+
+def sliding_distinct(keys, values, times, window):
+    """Nombre de valeurs distinctes dans la fenêtre de chaque événement (tableaux triés par (clé, temps))
+
+    Un événement j répète une valeur de la fenêtre de i si sa précédente occurrence
+    tombe dans cette fenêtre ; comme les débuts de fenêtre sont croissants, les i concernés
+    forment un intervalle [j, e_j], cumulé par tableau de différences.
+    """
+    n = len(keys)
+    starts = window_starts(keys, times, window)
+    previous = previous_occurrence(keys, values)
+
+    repeated = np.flatnonzero(previous >= 0)
+    last = np.searchsorted(starts, previous[repeated], side='right') - 1
+    contributes = last >= repeated
+    changes = (
+        np.bincount(repeated[contributes], minlength=n + 1)
+        - np.bincount(last[contributes] + 1, minlength=n + 1)
+    )
+    repeats = np.cumsum(changes[:n])
+
+    return starts, (np.arange(n) - starts + 1) - repeats
+
+
+def _incidents(keys, flagged, distinct):
+    """Regroupe les événements signalés consécutifs d'une même clé ; garde le pic de chaque groupe"""
+    positions = np.flatnonzero(flagged)
+    if len(positions) == 0:
+        return positions, positions
+
+    new_incident = np.r_[True, (np.diff(positions) > 1) | (keys[positions][1:] != keys[positions][:-1])]
+    incident_ids = np.cumsum(new_incident) - 1
+    # Pic : distinct maximal, premier atteint en cas d'égalité
+    order = np.lexsort((positions, -distinct[positions], incident_ids))
+    peaks = positions[order[np.r_[True, incident_ids[order][1:] != incident_ids[order][:-1]]]]
+    return peaks, np.bincount(incident_ids)
+
+
+def concurrent_access(frame, key_column, value_column, time_column,
+                      window_minutes=CONCURRENT_WINDOW_MINUTES, min_distinct=MIN_DISTINCT_VALUES,
+                      max_examples=20):
+    """Fenêtres où une clé (ex : utilisateur) est associée à au moins min_distinct valeurs (ex : IP)"""
+    key_codes, key_values = pd.factorize(frame[key_column], sort=False)
+    value_codes, value_values = pd.factorize(frame[value_column], sort=False)
+    times = pd.to_datetime(frame[time_column], errors='coerce').to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+    valid = (key_codes >= 0) & (value_codes >= 0) & (times != np.iinfo(np.int64).min)
+    rows = np.flatnonzero(valid)
+    rows = rows[np.lexsort((times[rows], key_codes[rows]))]
+    keys = key_codes[rows].astype(np.int64)
+    values = value_codes[rows].astype(np.int64)
+    times = times[rows]
+
+    result = {
+        'key_column': key_column,
+        'value_column': value_column,
+        'time_column': time_column,
+        'window_minutes': window_minutes,
+        'min_distinct': min_distinct,
+        'events': int(len(rows))
+    }
+    if len(rows) == 0:
+        return {**result, 'flagged_events': 0, 'incident_count': 0, 'keys_flagged': 0,
+                'max_distinct': 0, 'incidents': []}
+
+    starts, distinct = sliding_distinct(keys, values, times, int(window_minutes * NANOSECONDS_PER_MINUTE))
+    flagged = distinct >= min_distinct
+    peaks, incident_sizes = _incidents(keys, flagged, distinct)
+
+    # Incidents les plus marqués d'abord
+    top = np.lexsort((times[peaks], -distinct[peaks]))[:max_examples]
+    index = frame.index.to_numpy()
+    incidents = []
+    for i in top:
+        peak = peaks[i]
+        start = starts[peak]
+        window_values = np.unique(values[start:peak + 1])
+        incidents.append({
+            'key': str(key_values[keys[peak]]),
+            'distinct_values': int(distinct[peak]),
+            'values': [str(value_values[code]) for code in window_values[:MAX_INCIDENT_VALUES]],
+            'window_start': pd.Timestamp(times[start]).isoformat(),
+            'window_end': pd.Timestamp(times[peak]).isoformat(),
+            'window_events': int(peak - start + 1),
+            'flagged_events': int(incident_sizes[i]),
+            'rows': index[rows[start:min(peak + 1, start + MAX_INCIDENT_ROWS)]].tolist()
+        })
+
+    return {
+        **result,
+        'flagged_events': int(flagged.sum()),
+        'incident_count': int(len(peaks)),
+        'keys_flagged': int(len(np.unique(keys[flagged]))),
+        'max_distinct': int(distinct.max()),
+        'incidents': incidents
+    }
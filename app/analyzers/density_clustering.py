@@ -0,0 +1,71 @@
+"""
+Clustering par densité à grande échelle
+DBSCAN sur un échantillon (eps estimé par k-distance) puis affectation par lots
+"""
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
+
+# Taille de l'échantillon clusterisé et des lots d'affectation
+CLUSTERING_SAMPLE_SIZE = 20000
+ASSIGNMENT_BATCH_SIZE = 50000
+
+
+def k_distances(sample, k):
+    """Distance de chaque point de l'échantillon à son k-ième voisin (index arborescent)"""
+    k = min(k, len(sample) - 1)
+    neighbors = NearestNeighbors(n_neighbors=k + 1, algorithm='kd_tree').fit(sample)
+    distances, _ = neighbors.kneighbors(sample)
+    # La colonne 0 est le point lui-même
+    return distances[:, k]
+
+
+def estimate_eps(sample, min_samples=5):
+    """eps au coude de la courbe triée des k-distances (point le plus éloigné de la corde)"""
+    distances = np.sort(k_distances(sample, min_samples))
+    if len(distances) < 3 or distances[-1] == distances[0]:
+        return float(distances[-1]) if len(distances) and distances[-1] > 0 else 0.5
+
+    x = np.linspace(0, 1, len(distances))
+    y = (distances - distances[0]) / (distances[-1] - distances[0])
+    knee = int(np.argmax(x - y))
+    eps = float(distances[knee])
+    return eps if eps > 0 else float(distances[distances > 0][0])
+
+
+def sampled_dbscan(data, min_samples=5, eps=None, sample_size=CLUSTERING_SAMPLE_SIZE,
+                   batch_size=ASSIGNMENT_BATCH_SIZE, random_state=42):
+    """DBSCAN borné en mémoire : noyaux trouvés sur un échantillon, puis chaque point
+    rejoint le cluster du noyau le plus proche à moins d'eps, sinon il est du bruit"""
+    data = np.asarray(data, dtype=np.float64)
+    n = len(data)
+
+    rng = np.random.default_rng(random_state)
+    if n > sample_size:
+        sample = data[np.sort(rng.choice(n, sample_size, replace=False))]
+    else:
+        sample = data
+
+    if eps is None:
+        eps = estimate_eps(sample, min_samples)
+
+    dbscan = DBSCAN(eps=eps, min_samples=min_samples, algorithm='kd_tree')
+    sample_labels = dbscan.fit_predict(sample)
+    core_indices = dbscan.core_sample_indices_
+
+    labels = np.full(n, -1, dtype=np.int64)
+    if len(core_indices) == 0:
+        return labels, {'eps': eps, 'sample_size': len(sample), 'core_points': 0}
+
+    core_points = sample[core_indices]
+    core_labels = sample_labels[core_indices]
+    tree = NearestNeighbors(n_neighbors=1, algorithm='kd_tree').fit(core_points)
+
+    for start in range(0, n, batch_size):
+        batch = data[start:start + batch_size]
+        distances, nearest = tree.kneighbors(batch)
+        within = distances[:, 0] <= eps
+        labels[start:start + len(batch)] = np.where(within, core_labels[nearest[:, 0]], -1)
+
+    return labels, {'eps': eps, 'sample_size': len(sample), 'core_points': int(len(core_indices))}
@@ -0,0 +1,253 @@
+"""
+Baselines comportementales par entité
+Statistiques robustes par groupe (médiane/MAD, débit horaire, IP distinctes) en une passe tri-segmentation
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from .outlier_kernel import MAD_CONSTANT, MEANAD_CONSTANT
+
+# Noms de colonnes désignant une entité (utilisateur, compte, client...)
+ENTITY_COLUMN_PATTERN = re.compile(r'(user|login|account|compte|client|customer|email|owner|actor)')
+IP_COLUMN_PATTERN = re.compile(r'(^|_)(ip|ip_?addr(ess)?|src_?ip|source_?ip|remote_?addr)($|_)')
+
+# Seuil du z-score modifié et taille minimale d'historique d'une entité
+ENTITY_Z_THRESHOLD = 3.5
+MIN_GROUP_SIZE = 5
+
+# Échelle minimale relative à la médiane : évite des scores démesurés quand
+# quelques valeurs quasi identiques écrasent la MAD d'une petite entité
+MIN_RELATIVE_SCALE = 0.05
+
+NANOSECONDS_PER_HOUR = 3600 * 10 ** 9
+
+
+def find_entity_column(frame):
+    """Première colonne non numérique dont le nom évoque une entité"""
+    for col in frame.columns:
+        if ENTITY_COLUMN_PATTERN.search(str(col).lower()) and not pd.api.types.is_numeric_dtype(frame[col]):
+            return col
+    return None
+
+
+def find_ip_column(frame):
+    for col in frame.columns:
+        if IP_COLUMN_PATTERN.search(str(col).lower()):
+            return col
+    return None
+
+
+def group_codes(frame, columns):
+    """Code entier dense par groupe (-1 si une clé manque) et libellés des groupes"""
+    if len(columns) == 1:
+        codes, uniques = pd.factorize(frame[columns[0]], sort=False)
+        labels = [str(value) for value in uniques]
+    else:
+        grouped = frame.groupby(columns, sort=False, dropna=True)
+        codes = grouped.ngroup().fillna(-1).to_numpy()
+        # ngroup numérote dans l'ordre des clés du groupby
+        labels = [' × '.join(str(part) for part in key) for key in grouped.size().index]
+    return np.asarray(codes, dtype=np.int64), labels
+
+
+def _segments(counts):
+    """Début de chaque groupe dans un tableau trié par code"""
+    return np.r_[0, np.cumsum(counts)[:-1]]
+
+
+def group_medians(codes, values, n_groups):
+    """Médiane de chaque groupe : un tri lexicographique (groupe, valeur) puis lecture au milieu"""
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = _segments(counts)
+
+    medians = np.full(n_groups, np.nan)
+    present = counts > 0
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    medians[present] = (sorted_values[low] + sorted_values[high]) / 2
+    return medians, counts
+
+
+def group_robust_stats(codes, values, n_groups):
+    """Effectif, médiane, MAD et écart absolu moyen de chaque groupe (NaN ignorés)"""
+    values = np.asarray(values, dtype=np.float64)
+    valid = (codes >= 0) & np.isfinite(values)
+    codes, values = codes[valid], values[valid]
+
+    medians, counts = group_medians(codes, values, n_groups)
+    deviations = np.abs(values - medians[codes])
+    mads, _ = group_medians(codes, deviations, n_groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        meanads = np.bincount(codes, weights=deviations, minlength=n_groups) / counts
+
+    return {'count': counts, 'median': medians, 'mad': mads, 'meanad': meanads}
+
+
+def robust_scale(mad, meanad):
+    """Échelle du z-score modifié, avec repli sur l'écart absolu moyen quand MAD = 0"""
+    return np.where(
+        mad > 0,
+        mad / MAD_CONSTANT,
+        np.where(meanad > 0, MEANAD_CONSTANT * meanad, np.nan)
+    )
+
+
+def group_rates(codes, times, n_groups):
+    """Événements par heure de chaque groupe sur sa période d'activité (une heure minimum)"""
+    times = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+    valid = (codes >= 0) & (times != np.iinfo(np.int64).min)
+    codes, times = codes[valid], times[valid]
+
+    order = np.argsort(codes, kind='stable')
+    sorted_times = times[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    present = counts > 0
+    starts = _segments(counts)[present]
+
+    first = np.zeros(n_groups, dtype=np.int64)
+    last = np.zeros(n_groups, dtype=np.int64)
+    if len(starts):
+        first[present] = np.minimum.reduceat(sorted_times, starts)
+        last[present] = np.maximum.reduceat(sorted_times, starts)
+
+    hours = np.maximum((last - first) / NANOSECONDS_PER_HOUR, 1.0)
+    return {'count': counts, 'first': first, 'last': last, 'rate_per_hour': counts / hours}
+
+
+def group_distinct(codes, other_codes, n_groups):
+    """Nombre de valeurs distinctes (ex : IP) par groupe, via un tri (groupe, valeur)"""
+    valid = (codes >= 0) & (other_codes >= 0)
+    codes, other_codes = codes[valid], other_codes[valid]
+    if len(codes) == 0:
+        return np.zeros(n_groups, dtype=np.int64)
+
+    order = np.lexsort((other_codes, codes))
+    sorted_codes, sorted_other = codes[order], other_codes[order]
+    new_pair = np.r_[True, (sorted_codes[1:] != sorted_codes[:-1]) | (sorted_other[1:] != sorted_other[:-1])]
+    return np.bincount(sorted_codes[new_pair], minlength=n_groups)
+
+
+def _top_rows(scores, flagged, top_k):
+    """Positions des top_k lignes signalées, par score décroissant"""
+    positions = np.flatnonzero(flagged)
+    if len(positions) > top_k:
+        positions = positions[np.argpartition(-scores[positions], top_k - 1)[:top_k]]
+    return positions[np.argsort(-scores[positions], kind='stable')]
+
+
+def score_against_groups(codes, values, stats, threshold=ENTITY_Z_THRESHOLD, min_group_size=MIN_GROUP_SIZE):
+    """z-score modifié de chaque ligne par rapport à la baseline de sa propre entité"""
+    values = np.asarray(values, dtype=np.float64)
+    safe_codes = np.maximum(codes, 0)
+    median = stats['median'][safe_codes]
+    scale = np.fmax(robust_scale(stats['mad'], stats['meanad'])[safe_codes], MIN_RELATIVE_SCALE * np.abs(median))
+    scale = np.where(scale > 0, scale, np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = np.abs(values - median) / scale
+    eligible = (codes >= 0) & (stats['count'][safe_codes] >= min_group_size)
+    scores = np.where(eligible & np.isfinite(scores), scores, 0.0)
+    return scores, scores > threshold
+
+
+def _population_outliers(metric, eligible, threshold):
+    """Entités dont la métrique s'écarte de celle de l'ensemble des entités (z-score modifié)"""
+    values = metric[eligible]
+    if len(values) < 3:
+        return np.zeros(len(metric)), np.zeros(len(metric), dtype=bool)
+
+    median = np.median(values)
+    deviations = np.abs(values - median)
+    scale = robust_scale(np.median(deviations), deviations.mean())
+    if not np.isfinite(scale):
+        return np.zeros(len(metric)), np.zeros(len(metric), dtype=bool)
+
+    scores = np.where(eligible, (metric - median) / scale, 0.0)
+    # Seul un excès est suspect (débit élevé, nombreuses IP)
+    return scores, scores > threshold
+
+
+def entity_baselines(frame, entity_columns, value_columns, time_column=None, ip_column=None,
+                     threshold=ENTITY_Z_THRESHOLD, min_group_size=MIN_GROUP_SIZE, top_k=20):
+    """Lignes et entités qui s'écartent de leur propre historique"""
+    if isinstance(entity_columns, str):
+        entity_columns = [entity_columns]
+
+    codes, labels = group_codes(frame, entity_columns)
+    n_groups = len(labels)
+    index = frame.index
+    result = {
+        'entity_columns': entity_columns,
+        'entities': n_groups,
+        'threshold': threshold,
+        'min_group_size': min_group_size,
+        'value_outliers': {}
+    }
+
+    # Écarts de valeur par rapport à l'entité (ex : montant 50× l'habituel)
+    for col in value_columns:
+        values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        stats = group_robust_stats(codes, values, n_groups)
+        scores, flagged = score_against_groups(codes, values, stats, threshold, min_group_size)
+
+        examples = []
+        for pos in _top_rows(scores, flagged, top_k):
+            group = codes[pos]
+            median = stats['median'][group]
+            examples.append({
+                'index': index[pos].item() if hasattr(index[pos], 'item') else index[pos],
+                'entity': labels[group],
+                'value': float(values[pos]),
+                'entity_median': float(median),
+                'ratio_to_median': float(values[pos] / median) if median else None,
+                'entity_events': int(stats['count'][group]),
+                'score': float(scores[pos])
+            })
+
+        result['value_outliers'][col] = {
+            'count': int(flagged.sum()),
+            'entities_flagged': int(len(np.unique(codes[flagged]))),
+            'entities_with_baseline': int((stats['count'] >= min_group_size).sum()),
+            'top_rows': examples
+        }
+
+    counts = np.bincount(codes[codes >= 0], minlength=n_groups)
+    eligible = counts >= min_group_size
+    entity_metrics = {}
+
+    if time_column is not None:
+        times = pd.to_datetime(frame[time_column], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        rates = group_rates(codes, times, n_groups)
+        entity_metrics['rate_per_hour'] = rates['rate_per_hour']
+
+    if ip_column is not None:
+        ip_codes, _ = pd.factorize(frame[ip_column], sort=False)
+        entity_metrics['distinct_ips'] = group_distinct(codes, np.asarray(ip_codes, dtype=np.int64), n_groups)
+
+    # Entités atypiques au regard de la population : débit horaire, nombre d'IP
+    for metric_name, metric in entity_metrics.items():
+        scores, flagged = _population_outliers(metric.astype(np.float64), eligible, threshold)
+        top = _top_rows(scores, flagged, top_k)
+        result[f'{metric_name}_outliers'] = {
+            'count': int(flagged.sum()),
+            'population_median': float(np.median(metric[eligible])) if eligible.any() else None,
+            'top_entities': [
+                {
+                    'entity': labels[group],
+                    metric_name: float(metric[group]),
+                    'events': int(counts[group]),
+                    'score': float(scores[group])
+                }
+                for group in top
+            ]
+        }
+
+    result['time_column'] = time_column
+    result['ip_column'] = ip_column
+    return result
@@ -0,0 +1,162 @@
+"""
+Graphe comptes – attributs partagés
+Graphe biparti (IP, domaine e-mail, appareil) encodé en entiers et composantes connexes par union-find vectorisé
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Colonnes d'attributs susceptibles de relier des comptes
+EMAIL_COLUMN_PATTERN = re.compile(r'(e_?mail|courriel)')
+DEVICE_COLUMN_PATTERN = re.compile(r'(device|appareil|user_?agent|fingerprint|imei|mac_?addr|hostname|machine)')
+
+# Un attribut partagé par plus de comptes est un concentrateur (NAT, webmail public...) et n'est pas relié
+MAX_ATTRIBUTE_DEGREE = 50
+# ... ou par une part trop importante des comptes (domaine de l'entreprise par exemple)
+MAX_ATTRIBUTE_SHARE = 0.2
+
+# Comptes et attributs détaillés au plus par groupe
+MAX_CLUSTER_ACCOUNTS = 50
+MAX_CLUSTER_ATTRIBUTES = 20
+
+
+def find_attribute_columns(frame, account_column, ip_column=None):
+    """Colonnes d'attributs par type : ip, email_domain, device"""
+    attributes = {}
+    if ip_column is not None and ip_column != account_column:
+        attributes['ip'] = ip_column
+    for col in frame.columns:
+        name = str(col).lower()
+        if 'email_domain' not in attributes and EMAIL_COLUMN_PATTERN.search(name):
+            attributes['email_domain'] = col
+        elif 'device' not in attributes and col != account_column and DEVICE_COLUMN_PATTERN.search(name):
+            attributes['device'] = col
+    return attributes
+
+
+def email_domains(series):
+    """Domaine en minuscules de chaque adresse e-mail (NaN si absent)"""
+    return series.astype('string').str.extract(r'@([^@\s>]+)\s*>?\s*$', expand=False).str.lower()
+
+
+def _distinct(values):
+    """Valeurs distinctes triées (tri puis comparaison aux voisins)"""
+    values = np.sort(values)
+    return values[np.r_[True, values[1:] != values[:-1]]] if len(values) else values
+
+
+def connected_components(n_nodes, sources, targets):
+    """Union-find vectorisé : rattachement des racines à la plus petite, puis compression des chemins"""
+    parent = np.arange(n_nodes, dtype=np.int64)
+    if len(sources) == 0:
+        return parent
+
+    while True:
+        root_sources, root_targets = parent[sources], parent[targets]
+        pending = root_sources != root_targets
+        if not pending.any():
+            break
+
+        low = np.minimum(root_sources[pending], root_targets[pending])
+        high = np.maximum(root_sources[pending], root_targets[pending])
+        # Plusieurs rattachements possibles pour une racine : le plus petit l'emporte
+        np.minimum.at(parent, high, low)
+
+        # Saut de pointeurs jusqu'à ce que chaque nœud pointe sur sa racine
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+        sources, targets = sources[pending], targets[pending]
+
+    return parent
+
+
+def link_accounts(frame, account_column, attribute_columns, max_attribute_degree=MAX_ATTRIBUTE_DEGREE,
+                  top_k=20):
+    """Groupes de comptes reliés par des attributs partagés, classés par taille puis activité"""
+    account_codes, account_values = pd.factorize(frame[account_column], sort=False)
+    account_codes = np.asarray(account_codes, dtype=np.int64)
+    n_accounts = len(account_values)
+    activity = np.bincount(account_codes[account_codes >= 0], minlength=n_accounts)
+
+    # Nœuds attributs numérotés après les comptes, un bloc par type
+    sources, targets = [], []
+    attribute_labels = []
+    hubs = []
+    offset = n_accounts
+    for kind, col in attribute_columns.items():
+        codes, uniques = pd.factorize(frame[col], sort=False)
+        codes = np.asarray(codes, dtype=np.int64)
+        if kind == 'email_domain':
+            # Extraction sur les seules adresses distinctes, puis recodage par domaine
+            domain_codes, uniques = pd.factorize(email_domains(pd.Series(uniques, dtype=object)), sort=False)
+            codes = np.where(codes >= 0, np.r_[domain_codes, -1][codes], -1)
+
+        # Arêtes distinctes (compte, attribut)
+        valid = (account_codes >= 0) & (codes >= 0)
+        pairs = _distinct(account_codes[valid] * len(uniques) + codes[valid])
+        pair_accounts, pair_attributes = pairs // len(uniques), pairs % len(uniques)
+
+        # Les concentrateurs sont écartés : ils relieraient des comptes sans rapport
+        degree = np.bincount(pair_attributes, minlength=len(uniques))
+        hub = (degree > max_attribute_degree) | ((degree > 2) & (degree > MAX_ATTRIBUTE_SHARE * n_accounts))
+        for code in np.flatnonzero(hub)[np.argsort(-degree[hub], kind='stable')][:MAX_CLUSTER_ATTRIBUTES]:
+            hubs.append({'type': kind, 'value': str(uniques[code]), 'accounts': int(degree[code])})
+
+        kept = ~hub[pair_attributes]
+        sources.append(pair_accounts[kept])
+        targets.append(pair_attributes[kept] + offset)
+        attribute_labels.append((offset, kind, uniques))
+        offset += len(uniques)
+
+    sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+    roots = connected_components(offset, sources, targets)
+
+    # Composantes vues côté comptes
+    account_roots = roots[:n_accounts]
+    component_ids, account_component = np.unique(account_roots, return_inverse=True)
+    sizes = np.bincount(account_component)
+    events = np.bincount(account_component, weights=activity).astype(np.int64)
+    linked = np.flatnonzero(sizes > 1)
+
+    ranked = linked[np.lexsort((-events[linked], -sizes[linked]))][:top_k]
+
+    # Attributs de chaque composante retenue (arêtes conservées uniquement)
+    edge_component = np.searchsorted(component_ids, roots[sources]) if len(sources) else sources
+    clusters = []
+    for component in ranked:
+        members = np.flatnonzero(account_component == component)
+        members = members[np.argsort(-activity[members], kind='stable')]
+
+        shared = {}
+        attribute_nodes = _distinct(targets[edge_component == component])
+        for start, kind, uniques in attribute_labels:
+            nodes = attribute_nodes[(attribute_nodes >= start) & (attribute_nodes < start + len(uniques))]
+            if len(nodes):
+                shared[kind] = [str(uniques[node - start]) for node in nodes[:MAX_CLUSTER_ATTRIBUTES]]
+
+        clusters.append({
+            'accounts_count': int(sizes[component]),
+            'events': int(events[component]),
+            'accounts': [str(account_values[a]) for a in members[:MAX_CLUSTER_ACCOUNTS]],
+            'shared_attributes': shared
+        })
+
+    return {
+        'account_column': account_column,
+        'attribute_columns': attribute_columns,
+        'accounts': int(n_accounts),
+        'edges': int(len(sources)),
+        'linked_clusters': int(len(linked)),
+        'linked_accounts': int(sizes[linked].sum()),
+        'largest_cluster': int(sizes.max()) if len(sizes) else 0,
+        'max_attribute_degree': max_attribute_degree,
+        'hub_attributes': hubs,
+        'clusters': clusters
+    }
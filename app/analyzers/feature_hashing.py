@@ -0,0 +1,145 @@
+"""
+Encodage creux des colonnes catégorielles et textuelles
+Hachage des modalités et des n-grammes de caractères dans une matrice de largeur fixe
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+# Largeur du bloc haché de chaque colonne
+CATEGORICAL_HASH_BUCKETS = 1 << 10
+TEXT_HASH_BUCKETS = 1 << 12
+
+# Au-delà de ce ratio de valeurs distinctes, une colonne texte est découpée en n-grammes
+TEXT_UNIQUE_RATIO = 0.5
+
+# Lignes encodées par morceau
+ENCODING_CHUNK_SIZE = 100000
+
+
+class HashedFeatureEncoder:
+    """Numériques standardisées + blocs hachés par colonne, en matrice CSR"""
+
+    def __init__(self, categorical_buckets=CATEGORICAL_HASH_BUCKETS, text_buckets=TEXT_HASH_BUCKETS,
+                 ngram_range=(2, 4), chunk_size=ENCODING_CHUNK_SIZE):
+        self.categorical_buckets = categorical_buckets
+        self.text_buckets = text_buckets
+        self.ngram_range = ngram_range
+        self.chunk_size = chunk_size
+        self.numeric_columns = []
+        self.categorical_columns = []
+        self.text_columns = []
+        self.means = None
+        self.stds = None
+        self.column_slices = {}
+
+    def fit(self, frame):
+        """Choix du type de chaque colonne et statistiques de standardisation"""
+        self.numeric_columns = list(frame.select_dtypes(include=[np.number]).columns)
+        self.categorical_columns = []
+        self.text_columns = []
+
+        for col in frame.columns:
+            if col in self.numeric_columns:
+                continue
+            values = frame[col].dropna()
+            if len(values) == 0:
+                continue
+            if values.nunique() / len(values) > TEXT_UNIQUE_RATIO:
+                self.text_columns.append(col)
+            else:
+                self.categorical_columns.append(col)
+
+        numeric = frame[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.means = np.nan_to_num(np.nanmean(numeric, axis=0)) if len(numeric) else np.zeros(0)
+        stds = np.nanstd(numeric, axis=0) if len(numeric) else np.zeros(0)
+        self.stds = np.where(np.nan_to_num(stds) > 0, stds, 1.0)
+
+        # Plages de colonnes de chaque source, pour agréger les importances
+        offset = 0
+        self.column_slices = {}
+        for col in self.numeric_columns:
+            self.column_slices[col] = (offset, offset + 1)
+            offset += 1
+        for col in self.categorical_columns:
+            self.column_slices[col] = (offset, offset + self.categorical_buckets)
+            offset += self.categorical_buckets
+        for col in self.text_columns:
+            self.column_slices[col] = (offset, offset + self.text_buckets)
+            offset += self.text_buckets
+        self.n_features = offset
+
+        return self
+
+    def _hash_categorical(self, series):
+        """Hachage des seules valeurs distinctes, puis diffusion par codes"""
+        codes, uniques = pd.factorize(series.astype('string'), sort=False)
+        buckets = np.fromiter(
+            (murmurhash3_32(f"{series.name}={value}", seed=0, positive=True) % self.categorical_buckets
+             for value in uniques),
+            dtype=np.int64,
+            count=len(uniques)
+        )
+        present = codes >= 0
+        rows = np.flatnonzero(present)
+        return sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, buckets[codes[present]])),
+            shape=(len(series), self.categorical_buckets)
+        )
+
+    def _hash_text(self, series):
+        """N-grammes de caractères hachés, calculés une fois par valeur distincte"""
+        codes, uniques = pd.factorize(series.astype('string'), sort=False)
+        vectorizer = HashingVectorizer(
+            analyzer='char_wb',
+            ngram_range=self.ngram_range,
+            n_features=self.text_buckets,
+            alternate_sign=False,
+            norm='l2'
+        )
+        unique_matrix = vectorizer.transform(np.asarray(uniques, dtype=object))
+        # Ligne vide pour les valeurs manquantes
+        unique_matrix = sparse.vstack([unique_matrix, sparse.csr_matrix((1, self.text_buckets))]).tocsr()
+        return unique_matrix[np.where(codes >= 0, codes, len(uniques))]
+
+    def _transform_chunk(self, frame):
+        blocks = []
+        if self.numeric_columns:
+            numeric = frame[self.numeric_columns].apply(pd.to_numeric, errors='coerce')
+            numeric = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            # Valeurs manquantes imputées à la moyenne (0 après standardisation)
+            scaled = np.nan_to_num((numeric - self.means) / self.stds)
+            blocks.append(sparse.csr_matrix(scaled))
+        for col in self.categorical_columns:
+            blocks.append(self._hash_categorical(frame[col]))
+        for col in self.text_columns:
+            blocks.append(self._hash_text(frame[col]))
+
+        if not blocks:
+            return sparse.csr_matrix((len(frame), 0))
+        return sparse.hstack(blocks, format='csr')
+
+    def iter_transform(self, frame):
+        """Encodage par morceaux (mémoire bornée par la taille d'un morceau)"""
+        for start in range(0, len(frame), self.chunk_size):
+            yield self._transform_chunk(frame.iloc[start:start + self.chunk_size])
+
+    def transform(self, frame):
+        chunks = list(self.iter_transform(frame))
+        if not chunks:
+            return sparse.csr_matrix((0, self.n_features))
+        return sparse.vstack(chunks, format='csr')
+
+    def fit_transform(self, frame):
+        return self.fit(frame).transform(frame)
+
+    def aggregate_by_column(self, values):
+        """Somme des valeurs par colonne source (ex: importances par bloc haché)"""
+        values = np.asarray(values).ravel()
+        return {
+            col: float(values[start:end].sum())
+            for col, (start, end) in self.column_slices.items()
+        }
@@ -0,0 +1,54 @@
+"""
+Stockage des modèles entraînés
+Persistance sur disque des modèles indexés par le hash du jeu de données
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import joblib
+
+
+def model_key(data_hash, name, params):
+    """Clé d'un modèle : hash des données, nom du modèle et paramètres"""
+    params_hash = hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()[:16]
+    return f"{data_hash}_{name}_{params_hash}"
+
+
+class ModelStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.joblib")
+
+    def load(self, key, mmap_mode=None):
+        """Charge un modèle persisté, None s'il est absent ou illisible"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return joblib.load(path, mmap_mode=mmap_mode)
+        except Exception as e:
+            self.logger.warning(f"Modèle illisible {path}: {str(e)}")
+            return None
+
+    def save(self, key, artifact):
+        """Écriture atomique : fichier temporaire puis renommage"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            joblib.dump(artifact, tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.path(key)
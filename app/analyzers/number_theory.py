@@ -0,0 +1,257 @@
+"""
+Noyau de théorie des nombres vectorisé
+Primalité et puissances de 2 sur des tableaux d'entiers (crible + Miller-Rabin, Montgomery 64 bits)
+"""
+
+import numpy as np
+
+# Limite du crible d'Ératosthène (tableau booléen de ~4 Mo)
+SIEVE_LIMIT = 1 << 22
+
+# Bases de Miller-Rabin déterministes pour tout entier < 3.3e24 (donc tout int64)
+MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+# Bases déterministes pour tout entier < 2**64 (Sinclair) : 7 passes au lieu de 12 sur les grandes valeurs
+MILLER_RABIN_BASES_64 = (2, 325, 9375, 28178, 450775, 9780504, 1795265022)
+
+_LOW_MASK = np.uint64(0xFFFFFFFF)
+_HALF = np.uint64(32)
+
+# Petits premiers utilisés pour éliminer rapidement les composés avant Miller-Rabin
+_SMALL_PRIMES = None
+_SIEVE_CACHE = {}
+
+
+def _sieve(limit):
+    """Crible d'Ératosthène jusqu'à limit inclus (mis en cache)"""
+    cached = _SIEVE_CACHE.get('sieve')
+    if cached is not None and len(cached) > limit:
+        return cached
+
+    sieve = np.ones(limit + 1, dtype=bool)
+    sieve[:2] = False
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = False
+
+    _SIEVE_CACHE['sieve'] = sieve
+    return sieve
+
+
+def _small_primes():
+    """Premiers < 1000 pour la division d'essai vectorisée"""
+    global _SMALL_PRIMES
+    if _SMALL_PRIMES is None:
+        _SMALL_PRIMES = np.flatnonzero(_sieve(1000)[:1000]).astype(np.int64)
+    return _SMALL_PRIMES
+
+
+def integral_values(values):
+    """Extrait les valeurs entières finies (NaN, inf et décimales exclus) en int64"""
+    array = np.asarray(values)
+
+    if array.dtype == bool:
+        array = array.astype(np.int64)
+
+    if np.issubdtype(array.dtype, np.integer):
+        if array.dtype == np.uint64:
+            array = array[array <= np.iinfo(np.int64).max]
+        return array.astype(np.int64, copy=False)
+
+    array = np.asarray(array, dtype=np.float64)
+    # 2**63 n'est pas représentable en int64 : borne stricte
+    mask = np.isfinite(array) & (np.abs(array) < 2.0 ** 63)
+    array = array[mask]
+    array = array[array == np.floor(array)]
+    return array.astype(np.int64)
+
+
+def _powmod_small(base, exponent, modulus):
+    """Exponentiation modulaire vectorisée pour des modules < 2**32"""
+    base = base.astype(np.uint64) % modulus
+    exponent = exponent.astype(np.uint64).copy()
+    result = np.ones_like(modulus)
+
+    while np.any(exponent):
+        odd = (exponent & np.uint64(1)).astype(bool)
+        result = np.where(odd, (result * base) % modulus, result)
+        base = (base * base) % modulus
+        exponent >>= np.uint64(1)
+
+    return result
+
+
+def _split_power_of_two(n):
+    """Décomposition n - 1 = d * 2**s pour des candidats impairs"""
+    d = n - np.uint64(1)
+    s = np.zeros(len(n), dtype=np.int64)
+    even = (d & np.uint64(1)) == 0
+    while np.any(even):
+        d = np.where(even, d >> np.uint64(1), d)
+        s += even
+        even = (d & np.uint64(1)) == 0
+    return d, s
+
+
+def _strong_probable_prime(x, s, is_one, is_minus_one, square):
+    """Fin d'un tour de Miller-Rabin : x = a**d, jusqu'à s - 1 élévations au carré par candidat"""
+    witness_ok = is_one(x) | is_minus_one(x)
+    rounds = s - 1
+    pending = ~witness_ok & (rounds > 0)
+    while np.any(pending):
+        x = np.where(pending, square(x), x)
+        witness_ok |= pending & is_minus_one(x)
+        rounds -= pending
+        pending = ~witness_ok & (rounds > 0)
+    return witness_ok
+
+
+def _miller_rabin_small(candidates):
+    """Miller-Rabin vectorisé pour des candidats impairs < 2**32"""
+    n = candidates.astype(np.uint64)
+    d, s = _split_power_of_two(n)
+    is_prime = np.ones(len(n), dtype=bool)
+    n_minus_one = n - np.uint64(1)
+
+    for base in MILLER_RABIN_BASES:
+        base_array = np.full(len(n), base, dtype=np.uint64)
+        applicable = base_array < n
+        x = _powmod_small(base_array, d, n)
+        witness_ok = _strong_probable_prime(x, s, lambda x: x == 1, lambda x: x == n_minus_one,
+                                            lambda x: (x * x) % n)
+        is_prime &= witness_ok | ~applicable
+
+    return is_prime
+
+
+def _mulhi(a, b):
+    """Mot haut du produit 128 bits de deux tableaux uint64 (produits de demi-mots de 32 bits)"""
+    a0, a1 = a & _LOW_MASK, a >> _HALF
+    b0, b1 = b & _LOW_MASK, b >> _HALF
+    p01, p10 = a0 * b1, a1 * b0
+    middle = ((a0 * b0) >> _HALF) + (p01 & _LOW_MASK) + (p10 & _LOW_MASK)
+    return a1 * b1 + (p01 >> _HALF) + (p10 >> _HALF) + (middle >> _HALF)
+
+
+class _Montgomery:
+    """Arithmétique modulaire vectorisée en forme de Montgomery (R = 2**64) pour des modules impairs < 2**63
+
+    La réduction n'utilise que des produits uint64 (modulo 2**64) et leurs mots hauts :
+    aucune division ni entier 128 bits.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        # Inverse de n modulo 2**64 par Newton (chaque itération double les bits exacts)
+        inverse = n.copy()
+        for _ in range(5):
+            inverse *= np.uint64(2) - n * inverse
+        self.n_prime = np.uint64(0) - inverse
+        # R mod n puis R**2 mod n par doublements successifs (2x < 2**64 car n < 2**63)
+        self.one = (np.uint64(0) - n) % n
+        r_squared = self.one
+        for _ in range(64):
+            r_squared = self._reduce_sum(r_squared + r_squared)
+        self.r_squared = r_squared
+        self.minus_one = n - self.one
+
+    def _reduce_sum(self, value):
+        return np.where(value >= self.n, value - self.n, value)
+
+    def multiply(self, a, b):
+        """a * b / R mod n (REDC)"""
+        low = a * b
+        m = low * self.n_prime
+        # low + bas(m * n) vaut 0 ou 2**64 : retenue si low est non nul
+        return self._reduce_sum(_mulhi(a, b) + _mulhi(m, self.n) + (low != 0))
+
+    def to_form(self, values):
+        return self.multiply(values % self.n, self.r_squared)
+
+    def power(self, base, exponent):
+        result = self.one.copy()
+        exponent = exponent.copy()
+        while np.any(exponent):
+            odd = (exponent & np.uint64(1)).astype(bool)
+            result = np.where(odd, self.multiply(result, base), result)
+            base = self.multiply(base, base)
+            exponent >>= np.uint64(1)
+        return result
+
+
+def _miller_rabin_large(candidates):
+    """Miller-Rabin vectorisé pour des candidats impairs < 2**63 (arithmétique de Montgomery)
+
+    Les candidats déjà écartés par une base ne sont plus testés par les suivantes.
+    """
+    n = candidates.astype(np.uint64)
+    d, s = _split_power_of_two(n)
+    is_prime = np.ones(len(n), dtype=bool)
+
+    for base in MILLER_RABIN_BASES_64:
+        active = np.flatnonzero(is_prime)
+        if len(active) == 0:
+            break
+        modulus = n[active]
+        residue = np.uint64(base) % modulus
+        # Base multiple du candidat : tour sans information
+        applicable = residue != 0
+        arithmetic = _Montgomery(modulus)
+        x = arithmetic.power(arithmetic.to_form(residue), d[active])
+        witness_ok = _strong_probable_prime(x, s[active], lambda x: x == arithmetic.one,
+                                            lambda x: x == arithmetic.minus_one,
+                                            lambda x: arithmetic.multiply(x, x))
+        is_prime[active] = witness_ok | ~applicable
+
+    return is_prime
+
+
+def is_prime(values):
+    """Masque booléen de primalité pour un tableau d'entiers int64"""
+    values = np.asarray(values, dtype=np.int64)
+    result = np.zeros(len(values), dtype=bool)
+    if len(values) == 0:
+        return result
+
+    positive = values > 1
+    if not np.any(positive):
+        return result
+
+    # Plage bornée : lecture directe dans le crible
+    max_value = int(values[positive].max())
+    limit = min(max_value, SIEVE_LIMIT)
+    sieve = _sieve(limit)
+    in_sieve = positive & (values <= limit)
+    result[in_sieve] = sieve[values[in_sieve]]
+
+    large = positive & (values > limit)
+    if not np.any(large):
+        return result
+
+    # Grandes valeurs : travail sur les valeurs uniques uniquement
+    unique_large, inverse = np.unique(values[large], return_inverse=True)
+    unique_prime = np.ones(len(unique_large), dtype=bool)
+
+    # Division d'essai vectorisée pour écarter la majorité des composés
+    for prime in _small_primes():
+        unique_prime &= ((unique_large % prime) != 0) | (unique_large == prime)
+
+    remaining = np.flatnonzero(unique_prime)
+    small_mask = unique_large[remaining] < (1 << 32)
+
+    small_idx = remaining[small_mask]
+    if len(small_idx):
+        unique_prime[small_idx] = _miller_rabin_small(unique_large[small_idx])
+
+    large_idx = remaining[~small_mask]
+    if len(large_idx):
+        unique_prime[large_idx] = _miller_rabin_large(unique_large[large_idx])
+
+    result[large] = unique_prime[inverse]
+    return result
+
+
+def is_power_of_two(values):
+    """Masque booléen des puissances de 2 (entiers strictement positifs)"""
+    values = np.asarray(values, dtype=np.int64)
+    return (values > 0) & ((values & (values - 1)) == 0)
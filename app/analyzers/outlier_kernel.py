@@ -0,0 +1,160 @@
+"""
+Noyau d'outliers matriciel
+Calcule IQR, z-score et z-score modifié pour toutes les colonnes en une fois
+"""
+
+import warnings
+
+import numpy as np
+
+# Ordre des méthodes dans les tableaux de résultats
+METHODS = ('iqr', 'zscore', 'modified_zscore')
+
+# Facteur de cohérence de la MAD avec l'écart-type d'une loi normale
+MAD_CONSTANT = 0.6745
+
+# Repli quand MAD = 0 : écart absolu moyen (1.253314 = sqrt(pi / 2))
+MEANAD_CONSTANT = 1.253314
+
+# Nombre de cellules traitées par bloc de lignes (borne les temporaires)
+BLOCK_CELLS = 1 << 22
+
+
+def column_statistics(matrix, iqr_factor=1.5):
+    """Statistiques robustes et classiques de chaque colonne d'une matrice (NaN ignorés)"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    count = (~np.isnan(matrix)).sum(axis=0)
+    if matrix.shape[1] == 0 or matrix.shape[0] == 0:
+        nan = np.full(matrix.shape[1], np.nan)
+        return {
+            'count': count, 'lower': nan, 'upper': nan, 'mean': nan,
+            'std': nan, 'median': nan, 'mad': nan, 'meanad': nan
+        }
+
+    # Colonnes entièrement vides : NaN attendus, avertissements inutiles
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q1, median, q3 = np.nanquantile(matrix, [0.25, 0.5, 0.75], axis=0)
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0, ddof=1)
+        deviations = np.abs(matrix - median)
+        mad = np.nanmedian(deviations, axis=0)
+        meanad = np.nanmean(deviations, axis=0)
+
+    iqr = q3 - q1
+    return {
+        'count': count,
+        'lower': q1 - iqr_factor * iqr,
+        'upper': q3 + iqr_factor * iqr,
+        'mean': mean,
+        'std': std,
+        'median': median,
+        'mad': mad,
+        'meanad': meanad
+    }
+
+
+def _scores(block, stats):
+    """Scores par méthode ; les non-outliers valent -inf"""
+    lower, upper = stats['lower'], stats['upper']
+    spread = np.where(upper > lower, upper - lower, 1.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # IQR : distance hors des bornes, normalisée par la largeur de l'intervalle
+        iqr_score = np.maximum(lower - block, block - upper) / spread
+        iqr_score = np.where((block < lower) | (block > upper), iqr_score, -np.inf)
+
+        std = np.where(stats['std'] > 0, stats['std'], np.nan)
+        z_score = np.abs(block - stats['mean']) / std
+
+        # MAD nulle : repli sur l'écart absolu moyen, sinon aucun outlier
+        mad_scale = np.where(
+            stats['mad'] > 0,
+            stats['mad'] / MAD_CONSTANT,
+            np.where(stats['meanad'] > 0, MEANAD_CONSTANT * stats['meanad'], np.nan)
+        )
+        modified_score = np.abs(block - stats['median']) / mad_scale
+
+    return iqr_score, z_score, modified_score
+
+
+def _prune_top(cols, rows, scores, top_k):
+    """Ne garde que les top_k meilleurs candidats (col, ligne, score) de chaque colonne"""
+    order = np.lexsort((rows, -scores, cols))
+    cols, rows, scores = cols[order], rows[order], scores[order]
+
+    # Rang de chaque candidat dans sa colonne
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    lengths = np.diff(np.r_[starts, len(cols)])
+    ranks = np.arange(len(cols)) - np.repeat(starts, lengths)
+
+    keep = ranks < top_k
+    return cols[keep], rows[keep], scores[keep]
+
+
+def score_outliers(matrix, stats, top_k=10, z_threshold=3, modified_z_threshold=3.5):
+    """Comptages et top-k extrêmes par méthode et par colonne
+
+    Retourne des tableaux compacts : counts (3 x p), values / rows / scores
+    (3 x top_k x p, NaN / -1 pour les positions vides), triés par score décroissant.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n_rows, n_cols = matrix.shape
+    thresholds = (None, z_threshold, modified_z_threshold)
+
+    counts = np.zeros((len(METHODS), n_cols), dtype=np.int64)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    candidates = [empty] * len(METHODS)
+
+    block_rows = max(1, BLOCK_CELLS // max(n_cols, 1))
+    for start in range(0, n_rows, block_rows):
+        block = matrix[start:start + block_rows]
+
+        for m, score in enumerate(_scores(block, stats)):
+            # IQR : tout score fini est hors bornes ; z-scores : seuil strict
+            if thresholds[m] is None:
+                flagged = np.isfinite(score)
+            else:
+                flagged = np.isfinite(score) & (score > thresholds[m])
+            counts[m] += flagged.sum(axis=0)
+
+            if top_k > 0:
+                # Les outliers sont rares : seuls leurs coordonnées sont conservées
+                block_rows_idx, block_cols = np.nonzero(flagged)
+                cols, rows, scores = candidates[m]
+                candidates[m] = _prune_top(
+                    np.concatenate([cols, block_cols]),
+                    np.concatenate([rows, start + block_rows_idx]),
+                    np.concatenate([scores, score[block_rows_idx, block_cols]]),
+                    top_k
+                )
+
+    k = min(top_k, n_rows)
+    values = np.full((len(METHODS), k, n_cols), np.nan)
+    rows = np.full((len(METHODS), k, n_cols), -1, dtype=np.int64)
+    scores = np.full((len(METHODS), k, n_cols), np.nan)
+
+    for m, (top_cols, top_rows, top_scores) in enumerate(candidates):
+        if len(top_cols) == 0:
+            continue
+        starts = np.flatnonzero(np.r_[True, top_cols[1:] != top_cols[:-1]])
+        ranks = np.arange(len(top_cols)) - np.repeat(starts, np.diff(np.r_[starts, len(top_cols)]))
+
+        values[m, ranks, top_cols] = matrix[top_rows, top_cols]
+        rows[m, ranks, top_cols] = top_rows
+        scores[m, ranks, top_cols] = top_scores
+
+    return {
+        'counts': counts,
+        'values': values,
+        'rows': rows,
+        'scores': scores
+    }
+
+
+def matrix_outliers(matrix, top_k=10, iqr_factor=1.5, z_threshold=3, modified_z_threshold=3.5):
+    """Statistiques et outliers des trois méthodes pour toutes les colonnes d'une matrice"""
+    stats = column_statistics(matrix, iqr_factor)
+    result = score_outliers(matrix, stats, top_k, z_threshold, modified_z_threshold)
+    result['stats'] = stats
+    return result
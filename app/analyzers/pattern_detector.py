@@ -9,6 +9,14 @@ import re
 from collections import Counter, defaultdict
 import logging
 
+from core.data_utils import find_time_column
+
+from .benford import TESTS, benford_by_group, benford_test
+from .change_points import MAX_SERIES_POINTS, detect_change_points
+from .number_theory import integral_values, is_prime, is_power_of_two
+from .sections import run_sections
+from .sequence_gaps import analyze_key_sequence, is_id_column_name, stream_sqlite_key_sequence
+
 class PatternDetector:
     def __init__(self, filepath):
         self.filepath = filepath
@@ -50,22 +58,27 @@ class PatternDetector:
                 self.logger.error(f"Erreur chargement données: {str(e)}")
                 raise
     
-    def detect_patterns(self):
-        """Détection de tous les types de patterns"""
+    def detect_patterns(self, sections=None, top_k=None, max_examples=None, progress=None):
+        """Détection de tous les types de patterns (ou des seules sections demandées)"""
         if self.data is None:
             self.load_data()
         
-        patterns = {
-            'sequential_patterns': self.detect_sequential_patterns(),
-            'repetitive_patterns': self.detect_repetitive_patterns(),
-            'frequency_patterns': self.detect_frequency_patterns(),
-            'text_patterns': self.detect_text_patterns(),
-            'numerical_patterns': self.detect_numerical_patterns(),
-            'temporal_patterns': self.detect_temporal_patterns(),
-            'correlation_patterns': self.detect_correlation_patterns()
-        }
-        
-        return patterns
+        return run_sections(self.section_steps(), sections, {'top_k': top_k, 'max_examples': max_examples},
+                            progress, len(self.data))
+    
+    def section_steps(self):
+        """Sections de la détection de patterns : (nom, méthode, bornes acceptées)"""
+        return [
+            ('sequential_patterns', self.detect_sequential_patterns, {}),
+            ('sequence_gaps', self.detect_sequence_gaps, {'max_examples': 'max_examples'}),
+            ('repetitive_patterns', self.detect_repetitive_patterns, {'top_k': 'top_k'}),
+            ('frequency_patterns', self.detect_frequency_patterns, {}),
+            ('text_patterns', self.detect_text_patterns, {'max_examples': 'max_examples'}),
+            ('numerical_patterns', self.detect_numerical_patterns, {}),
+            ('temporal_patterns', self.detect_temporal_patterns, {}),
+            ('change_points', self.detect_change_points, {'top_k': 'max_changes'}),
+            ('correlation_patterns', self.detect_correlation_patterns, {})
+        ]
     
     def detect_sequential_patterns(self):
         """Détection de patterns séquentiels"""
@@ -102,7 +115,70 @@ class PatternDetector:
         
         return sequential_patterns
     
-    def detect_repetitive_patterns(self):
+    def detect_sequence_gaps(self, max_examples=20, chunksize=100000):
+        """Détection de trous, doublons et insertions dans les colonnes d'identifiants"""
+        file_extension = self.filepath.split('.')[-1].lower()
+        if self.data is None and file_extension in ['db', 'sqlite']:
+            return self._stream_sqlite_sequence_gaps(max_examples, chunksize)
+        
+        if self.data is None:
+            self.load_data()
+        
+        time_column = find_time_column(self.data)
+        timestamps = None
+        if time_column is not None:
+            timestamps = pd.to_datetime(self.data[time_column], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        
+        gaps = {}
+        for col in self.data.select_dtypes(include=[np.number]).columns:
+            values = self.data[col]
+            if not is_id_column_name(col):
+                continue
+            if len(integral_values(values.dropna().to_numpy())) < len(values.dropna()):
+                continue
+            
+            analysis = analyze_key_sequence(
+                values.to_numpy(dtype=np.float64, na_value=np.nan) if values.isna().any() else values.to_numpy(),
+                self.data.index.to_numpy(),
+                timestamps,
+                max_examples
+            )
+            analysis['time_column'] = time_column
+            gaps[col] = analysis
+        
+        return gaps
+    
+    def _stream_sqlite_sequence_gaps(self, max_examples, chunksize):
+        """Variante en flux pour SQLite : tri par le moteur, sans chargement complet"""
+        import sqlite3
+        conn = sqlite3.connect(self.filepath)
+        try:
+            tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
+            if not tables:
+                return {}
+            table_name = tables[0][0]
+            columns = conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+            
+            time_column = None
+            for _, name, _, _, _, _ in columns:
+                if any(keyword in name.lower() for keyword in ['date', 'time', 'created', 'modified']):
+                    time_column = name
+                    break
+            
+            gaps = {}
+            for _, name, declared_type, _, _, _ in columns:
+                if is_id_column_name(name) and 'INT' in (declared_type or '').upper():
+                    analysis = stream_sqlite_key_sequence(
+                        conn, table_name, name, time_column, chunksize, max_examples
+                    )
+                    analysis['time_column'] = time_column
+                    gaps[name] = analysis
+            
+            return gaps
+        finally:
+            conn.close()
+    
+    def detect_repetitive_patterns(self, top_k=5):
         """Détection de patterns répétitifs"""
         repetitive_patterns = []
         
@@ -112,7 +188,7 @@ class PatternDetector:
                 value_counts = values.value_counts()
                 
                 # Valeurs très répétitives
-                for value, count in value_counts.head(5).items():
+                for value, count in value_counts.head(top_k).items():
                     frequency = count / len(values)
                     if frequency > 0.1:  # Plus de 10% des valeurs
                         repetitive_patterns.append({
@@ -213,7 +289,7 @@ class PatternDetector:
         
         return {'deviation': deviation}
     
-    def detect_text_patterns(self):
+    def detect_text_patterns(self, max_examples=3):
         """Détection de patterns dans le texte"""
         text_patterns = []
         
@@ -235,7 +311,9 @@ class PatternDetector:
                     }
                     
                     for pattern_name, regex in patterns_to_check.items():
-                        matches = text_values.str.match(regex, na=False).sum()
+                        # Une seule évaluation de l'expression par colonne (comptage et exemples)
+                        matched = text_values.str.match(regex, na=False)
+                        matches = matched.sum()
                         if matches > 0:
                             percentage = matches / len(text_values) * 100
                             text_patterns.append({
@@ -243,7 +321,7 @@ class PatternDetector:
                                 'pattern_type': pattern_name,
                                 'matches': matches,
                                 'percentage': percentage,
-                                'examples': text_values[text_values.str.match(regex, na=False)].head(3).tolist()
+                                'examples': text_values[matched].head(max_examples).tolist()
                             })
                     
                     # Analyse de la longueur des chaînes
@@ -373,71 +451,72 @@ class PatternDetector:
     
     def _calculate_prime_percentage(self, series):
         """Calcule le pourcentage de nombres premiers"""
-        def is_prime(n):
-            if n < 2:
-                return False
-            for i in range(2, int(n**0.5) + 1):
-                if n % i == 0:
-                    return False
-            return True
-        
-        integers = series[series == series.astype(int)].astype(int)
-        primes = integers[integers.apply(is_prime)]
-        
-        return len(primes) / len(integers) if len(integers) > 0 else 0
+        integers = integral_values(series.to_numpy())
+        if len(integers) == 0:
+            return 0
+        
+        return float(is_prime(integers).sum() / len(integers))
     
     def _count_powers_of_2(self, series):
         """Compte les puissances de 2"""
-        powers_of_2 = 0
-        for value in series:
-            if value > 0 and (value & (value - 1)) == 0:
-                powers_of_2 += 1
-        return powers_of_2
+        integers = integral_values(series.to_numpy())
+        return int(is_power_of_two(integers).sum())
     
     def _analyze_digit_patterns(self, series, column_name):
-        """Analyse les patterns de digits"""
+        """Analyse les patterns de digits (loi de Benford)"""
         patterns = []
+        values = series.to_numpy()
         
-        # Conversion en chaînes pour analyser les digits
-        str_values = series.astype(str)
-        
-        # Analyse de Benford's Law (premier digit)
-        first_digits = []
-        for val in str_values:
-            if val[0].isdigit() and val[0] != '0':
-                first_digits.append(int(val[0]))
-        
-        if len(first_digits) > 30:  # Assez de données pour Benford
-            benford_analysis = self._analyze_benford_law(first_digits)
-            if benford_analysis['deviation'] > 0.1:
+        for test in ['first_digit', 'second_digit', 'first_two_digits']:
+            benford_analysis = benford_test(values, test)
+            if 'error' in benford_analysis:
+                continue
+            
+            if benford_analysis['conformity'] in ('marginal_conformity', 'nonconformity'):
                 patterns.append({
                     'column': column_name,
                     'type': 'benford_law_deviation',
-                    'deviation': benford_analysis['deviation'],
-                    'suspicion_level': 'high' if benford_analysis['deviation'] > 0.2 else 'medium'
+                    'test': test,
+                    'deviation': benford_analysis['mad'],
+                    'chi_square': benford_analysis['chi_square'],
+                    'p_value': benford_analysis.get('p_value'),
+                    'conformity': benford_analysis['conformity'],
+                    'significant_digits': benford_analysis['significant_digits'],
+                    'suspicion_level': 'high' if benford_analysis['conformity'] == 'nonconformity' else 'medium'
                 })
         
         return patterns
     
-    def _analyze_benford_law(self, first_digits):
-        """Analyse la conformité à la loi de Benford"""
-        benford_expected = [30.1, 17.6, 12.5, 9.7, 7.9, 6.7, 5.8, 5.1, 4.6]
+    def analyze_benford(self, column, group_by=None, tests=None, top_k=20):
+        """Analyse de Benford détaillée d'une colonne, éventuellement par groupe (ValueError si une colonne est inconnue)"""
+        if self.data is None:
+            self.load_data()
         
-        digit_counts = Counter(first_digits)
-        total = len(first_digits)
+        if column not in self.data.columns:
+            raise ValueError(f'Colonne inconnue: {column}')
+        if group_by is not None and group_by not in self.data.columns:
+            raise ValueError(f'Colonne de regroupement inconnue: {group_by}')
         
-        observed_percentages = []
-        for i in range(1, 10):
-            observed_percentages.append((digit_counts.get(i, 0) / total) * 100)
+        values = pd.to_numeric(self.data[column], errors='coerce').to_numpy()
+        tests = tests or list(TESTS.keys())
         
-        # Calcul de la déviation
-        deviations = []
-        for i in range(9):
-            deviations.append(abs(observed_percentages[i] - benford_expected[i]))
-        
-        avg_deviation = np.mean(deviations) / 100  # Normaliser
+        results = {}
+        for test in tests:
+            if test not in TESTS:
+                results[test] = {'error': f'Test de Benford inconnu: {test}'}
+                continue
+            
+            results[test] = benford_test(values, test)
+            if group_by is not None:
+                results[test]['by_group'] = benford_by_group(
+                    values, self.data[group_by].to_numpy(), test, top_k=top_k
+                )
         
-        return {'deviation': avg_deviation}
+        return {
+            'column': column,
+            'group_by': group_by,
+            'tests': results
+        }
     
     def _analyze_numerical_distribution(self, series, column_name):
         """Analyse la distribution numérique"""
@@ -492,6 +571,38 @@ class PatternDetector:
         
         return temporal_patterns
     
+    def detect_change_points(self, columns=None, max_points=MAX_SERIES_POINTS, max_changes=20):
+        """Ruptures de comportement des colonnes numériques ordonnées par horodatage"""
+        if self.data is None:
+            self.load_data()
+        
+        time_column = find_time_column(self.data)
+        if time_column is None:
+            return {'error': 'Aucune colonne temporelle détectée'}
+        
+        if columns is None:
+            columns = [
+                col for col in self.data.select_dtypes(include=[np.number]).columns
+                if not is_id_column_name(col)
+            ]
+        
+        times = pd.to_datetime(self.data[time_column], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        change_points = {}
+        for col in columns:
+            try:
+                values = pd.to_numeric(self.data[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                result = detect_change_points(
+                    times, values, self.data.index.to_numpy(),
+                    max_points=max_points, max_changes=max_changes
+                )
+                result['time_column'] = time_column
+                change_points[col] = result
+            except Exception as e:
+                self.logger.error(f"Erreur détection de ruptures {col}: {str(e)}")
+                change_points[col] = {'error': str(e)}
+        
+        return change_points
+    
     def _analyze_time_intervals(self, dates, column_name):
         """Analyse les intervalles de temps"""
         patterns = []
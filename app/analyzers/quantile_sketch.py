@@ -0,0 +1,278 @@
+"""
+Sketches de quantiles fusionnables (KLL)
+Statistiques approximées par morceaux pour les outliers IQR / z-score / MAD
+"""
+
+import numpy as np
+
+# Capacité minimale d'un compacteur
+MIN_CAPACITY = 8
+
+
+class KLLSketch:
+    """Sketch de quantiles KLL fusionnable (erreur de rang ~ 1.7 / k)"""
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = int(k)
+        self.c = c
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_accuracy(cls, epsilon, seed=None):
+        """Crée un sketch pour une erreur de rang cible (ex: 0.01 pour 1%)"""
+        return cls(k=max(MIN_CAPACITY, int(np.ceil(1.7 / epsilon))), seed=seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(MIN_CAPACITY, int(np.ceil(self.k * self.c ** depth)))
+
+    def _compress(self):
+        """Compacte les niveaux qui dépassent leur capacité"""
+        level = 0
+        while level < len(self.levels):
+            buffer = self.levels[level]
+            if len(buffer) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+
+                buffer = np.sort(buffer)
+                # Un élément reste au niveau courant si la taille est impaire
+                keep = buffer[-1:] if len(buffer) % 2 else buffer[:0]
+                pairs = buffer[:len(buffer) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Ajoute un lot de valeurs (NaN et inf ignorés)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fusionne un autre sketch dans celui-ci"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+
+        for level, buffer in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], buffer])
+
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(buffer), 2 ** level, dtype=np.int64)
+            for level, buffer in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantiles(self, qs):
+        """Quantiles approximés pour une liste de probabilités"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights)
+        targets = qs * cumulative[-1]
+        positions = np.clip(np.searchsorted(cumulative, targets, side='left'), 0, len(items) - 1)
+        result = items[positions]
+
+        # Les extrêmes sont connus exactement
+        result = np.where(qs <= 0, self.min, result)
+        result = np.where(qs >= 1, self.max, result)
+        return result
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def mad(self):
+        """MAD approximée : médiane pondérée des écarts à la médiane du sketch"""
+        if self.n == 0:
+            return np.nan
+
+        items, weights = self._weighted_items()
+        deviations = np.abs(items - self.median())
+        order = np.argsort(deviations, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, cumulative[-1] / 2, side='left')
+        return float(deviations[order][position])
+
+    def to_dict(self):
+        """Sérialisation pour l'échange entre workers"""
+        return {
+            'k': self.k,
+            'c': self.c,
+            'n': self.n,
+            'min': self.min,
+            'max': self.max,
+            'levels': [buffer.tolist() for buffer in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        sketch = cls(k=payload['k'], c=payload['c'])
+        sketch.n = payload['n']
+        sketch.min = payload['min']
+        sketch.max = payload['max']
+        sketch.levels = [np.asarray(buffer, dtype=np.float64) for buffer in payload['levels']]
+        return sketch
+
+
+class RunningMoments:
+    """Moyenne et variance fusionnables (algorithme de Chan)"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+
+        other = RunningMoments()
+        other.n = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+
+        total = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / total
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / total
+        self.n = total
+        return self
+
+    def std(self):
+        """Écart-type échantillon (ddof=1, comme pandas)"""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+
+class ColumnSketches:
+    """Sketches et moments par colonne numérique, alimentés par morceaux"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.seed = seed
+        self.sketches = {}
+        self.moments = {}
+
+    def update(self, frame):
+        """Ajoute un morceau de DataFrame"""
+        for col in frame.select_dtypes(include=[np.number]).columns:
+            values = frame[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            if col not in self.sketches:
+                self.sketches[col] = KLLSketch(k=self.k, seed=self.seed)
+                self.moments[col] = RunningMoments()
+            self.sketches[col].update(values)
+            self.moments[col].update(values)
+        return self
+
+    @classmethod
+    def from_chunks(cls, chunks, k=200, seed=None):
+        sketches = cls(k=k, seed=seed)
+        for chunk in chunks:
+            sketches.update(chunk)
+        return sketches
+
+    def merge(self, other):
+        for col, sketch in other.sketches.items():
+            if col in self.sketches:
+                self.sketches[col].merge(sketch)
+                self.moments[col].merge(other.moments[col])
+            else:
+                self.sketches[col] = sketch
+                self.moments[col] = other.moments[col]
+        return self
+
+    def outlier_bounds(self, iqr_factor=1.5):
+        """Bornes IQR, moyenne/écart-type et médiane/MAD par colonne"""
+        bounds = {}
+        for col, sketch in self.sketches.items():
+            q1, q3 = sketch.quantiles([0.25, 0.75])
+            iqr = q3 - q1
+            bounds[col] = {
+                'count': sketch.n,
+                'lower': float(q1 - iqr_factor * iqr),
+                'upper': float(q3 + iqr_factor * iqr),
+                'mean': self.moments[col].mean,
+                'std': self.moments[col].std(),
+                'median': sketch.median(),
+                'mad': sketch.mad()
+            }
+        return bounds
+
+
+def count_outliers(frame, bounds, z_threshold=3, modified_z_threshold=3.5):
+    """Comptage exact des outliers à partir de bornes précalculées (passe vectorisée)"""
+    columns = [col for col in bounds if col in frame.columns]
+    counts = {
+        col: {'iqr': 0, 'zscore': 0, 'modified_zscore': 0}
+        for col in columns
+    }
+    if not columns or frame.empty:
+        return counts
+
+    matrix = frame[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    lower = np.array([bounds[col]['lower'] for col in columns])
+    upper = np.array([bounds[col]['upper'] for col in columns])
+    mean = np.array([bounds[col]['mean'] for col in columns])
+    std = np.array([bounds[col]['std'] for col in columns])
+    median = np.array([bounds[col]['median'] for col in columns])
+    mad = np.array([bounds[col]['mad'] for col in columns])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iqr_counts = ((matrix < lower) | (matrix > upper)).sum(axis=0)
+        z_mask = np.abs(matrix - mean) / np.where(std > 0, std, np.nan) > z_threshold
+        modified = 0.6745 * np.abs(matrix - median) / np.where(mad > 0, mad, np.nan)
+        modified_counts = (modified > modified_z_threshold).sum(axis=0)
+
+    for i, col in enumerate(columns):
+        counts[col] = {
+            'iqr': int(iqr_counts[i]),
+            'zscore': int(z_mask[:, i].sum()),
+            'modified_zscore': int(modified_counts[i])
+        }
+
+    return counts
+
+
+def merge_counts(total, partial):
+    """Additionne les comptages de deux morceaux"""
+    for col, methods in partial.items():
+        if col not in total:
+            total[col] = dict(methods)
+        else:
+            for method, count in methods.items():
+                total[col][method] += count
+    return total
@@ -0,0 +1,53 @@
+"""
+Sélection des sections d'analyse
+Seules les sections demandées sont calculées ; bornes de travail (top_k, max_examples) transmises aux détecteurs
+"""
+
+# Bornes communes acceptées par les analyses complètes
+BOUND_NAMES = ('top_k', 'max_examples')
+
+
+def parse_sections(value):
+    """Liste de sections depuis 'a,b,c' (None ou vide : toutes)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    sections = [str(name).strip() for name in value if str(name).strip()]
+    return sections or None
+
+
+def resolve_sections(available, requested=None):
+    """Sections à calculer, dans l'ordre de l'analyse complète ; ValueError si une section est inconnue"""
+    requested = parse_sections(requested)
+    if requested is None:
+        return list(available)
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise ValueError(f"Section(s) inconnue(s): {', '.join(unknown)} (disponibles: {', '.join(available)})")
+    return [name for name in available if name in requested]
+
+
+def iter_sections(steps, sections=None, bounds=None, progress=None, rows=None):
+    """Exécute une à une les étapes (nom, méthode, {borne: paramètre}) des sections sélectionnées
+
+    Génère (nom, résultat) dès qu'une section est terminée. Une borne non fournie laisse
+    la valeur par défaut du détecteur ; les intermédiaires partagés (index temporel,
+    sessions, timeline...) restent calculés à la demande.
+    """
+    methods = {name: (method, accepted) for name, method, accepted in steps}
+    selected = resolve_sections([name for name, _, _ in steps], sections)
+    bounds = {name: value for name, value in (bounds or {}).items() if value is not None}
+
+    for step, name in enumerate(selected):
+        method, accepted = methods[name]
+        # Suivi d'avancement (file de tâches)
+        if progress is not None:
+            progress(name, step, len(selected), rows)
+        kwargs = {param: bounds[bound] for bound, param in accepted.items() if bound in bounds}
+        yield name, method(**kwargs)
+
+
+def run_sections(steps, sections=None, bounds=None, progress=None, rows=None):
+    """Résultats de toutes les sections sélectionnées, dans l'ordre de l'analyse complète"""
+    return dict(iter_sections(steps, sections, bounds, progress, rows))
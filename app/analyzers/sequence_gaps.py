@@ -0,0 +1,240 @@
+"""
+Détecteur de trous et de réordonnancements dans les séquences d'identifiants
+Tri unique des clés entières, plages manquantes encodées par longueur de plage
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Noms de colonnes susceptibles de contenir des identifiants séquentiels
+ID_COLUMN_PATTERN = re.compile(r'(^|_)(id|key|seq|num|no)($|_)')
+
+
+def is_id_column_name(name):
+    return bool(ID_COLUMN_PATTERN.search(str(name).lower()))
+
+
+def _to_python(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+class SequenceGapAccumulator:
+    """Accumule des morceaux de clés déjà triées (en mémoire ou depuis SQLite)"""
+
+    def __init__(self, max_examples=20):
+        self.max_examples = max_examples
+        self.total_rows = 0
+        self.distinct_keys = 0
+        self.min_key = None
+        self.max_key = None
+        self.missing_total = 0
+        self.gap_count = 0
+        self.gaps = []
+        self.duplicate_keys = 0
+        self.duplicate_rows = 0
+        self.duplicates = []
+        self.out_of_order_rows = 0
+        self.out_of_order = []
+        self._last_key = None
+        self._last_key_count = 0
+        self._last_key_rows = []
+        self._last_time = None
+
+    def _record_duplicate(self, key, count, rows):
+        self.duplicate_keys += 1
+        self.duplicate_rows += int(count) - 1
+        if len(self.duplicates) < self.max_examples:
+            self.duplicates.append({'key': int(key), 'count': int(count), 'rows': list(rows[:10])})
+
+    def _record_gaps(self, previous, following):
+        """Plages manquantes entre clés distinctes consécutives"""
+        lengths = following - previous - 1
+        has_gap = lengths > 0
+        if not np.any(has_gap):
+            return
+
+        self.gap_count += int(has_gap.sum())
+        self.missing_total += int(lengths[has_gap].sum())
+
+        room = self.max_examples - len(self.gaps)
+        if room > 0:
+            starts = previous[has_gap][:room] + 1
+            ends = following[has_gap][:room] - 1
+            for start, end in zip(starts, ends):
+                self.gaps.append({
+                    'start': int(start),
+                    'end': int(end),
+                    'length': int(end - start + 1)
+                })
+
+    def update(self, keys, rows, timestamps=None):
+        """Ajoute un morceau de clés triées avec leurs références de lignes"""
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = np.asarray(rows)
+        if len(keys) == 0:
+            return self
+
+        self.total_rows += len(keys)
+        if self.min_key is None:
+            self.min_key = int(keys[0])
+        self.max_key = int(keys[-1])
+
+        # Plages de clés identiques (encodage par longueur de plage)
+        boundaries = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        run_keys = keys[boundaries]
+        run_lengths = np.diff(np.r_[boundaries, len(keys)])
+
+        # Raccord avec la dernière plage du morceau précédent
+        if self._last_key is not None:
+            if run_keys[0] == self._last_key:
+                self._last_key_count += int(run_lengths[0])
+                self._last_key_rows.extend(rows[:min(run_lengths[0], 10)].tolist())
+                run_keys, run_lengths = run_keys[1:], run_lengths[1:]
+                boundaries = boundaries[1:]
+            if len(run_keys):
+                if self._last_key_count > 1:
+                    self._record_duplicate(self._last_key, self._last_key_count, self._last_key_rows)
+                self._record_gaps(np.array([self._last_key]), run_keys[:1])
+
+        if len(run_keys):
+            self.distinct_keys += len(run_keys) if self._last_key is not None else len(run_keys) - 1
+            self._record_gaps(run_keys[:-1], run_keys[1:])
+
+            # Doublons internes au morceau (la dernière plage reste ouverte)
+            duplicated = np.flatnonzero(run_lengths[:-1] > 1)
+            for i in duplicated:
+                start = boundaries[i]
+                self._record_duplicate(run_keys[i], run_lengths[i], rows[start:start + min(run_lengths[i], 10)].tolist())
+
+            last_start = boundaries[-1]
+            self._last_key = int(run_keys[-1])
+            self._last_key_count = int(run_lengths[-1])
+            self._last_key_rows = rows[last_start:last_start + 10].tolist()
+
+        if timestamps is not None:
+            self._update_order(keys, rows, timestamps)
+
+        return self
+
+    def _update_order(self, keys, rows, timestamps):
+        """Inversions adjacentes : horodatage antérieur à celui de la clé précédente"""
+        times = np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64)
+        valid = times != np.iinfo(np.int64).min
+        positions = np.arange(len(times))
+
+        # Dernière ligne horodatée précédant chaque ligne (-1 : morceau précédent)
+        last_valid = np.maximum.accumulate(np.where(valid, positions, -1))
+        previous = np.r_[-1, last_valid[:-1]]
+
+        previous_times = np.where(previous >= 0, times[np.maximum(previous, 0)], np.iinfo(np.int64).min)
+        if self._last_time is not None:
+            previous_times = np.where(previous >= 0, previous_times, self._last_time[0])
+
+        inverted = valid & (times < previous_times)
+        self.out_of_order_rows += int(inverted.sum())
+
+        room = self.max_examples - len(self.out_of_order)
+        for i in np.flatnonzero(inverted)[:max(room, 0)]:
+            if previous[i] >= 0:
+                previous_row, previous_key = rows[previous[i]], keys[previous[i]]
+            else:
+                _, previous_row, previous_key = self._last_time
+            self.out_of_order.append({
+                'row': _to_python(rows[i]),
+                'key': int(keys[i]),
+                'timestamp': pd.Timestamp(times[i]).isoformat(),
+                'previous_row': _to_python(previous_row),
+                'previous_key': int(previous_key),
+                'previous_timestamp': pd.Timestamp(previous_times[i]).isoformat()
+            })
+
+        if last_valid[-1] >= 0:
+            last = last_valid[-1]
+            self._last_time = (int(times[last]), rows[last], keys[last])
+
+    def result(self):
+        """Résumé final des trous, doublons et réordonnancements"""
+        if self._last_key is not None:
+            self.distinct_keys += 1
+            if self._last_key_count > 1:
+                self._record_duplicate(self._last_key, self._last_key_count, self._last_key_rows)
+            # La dernière plage est désormais comptabilisée
+            self._last_key = None
+
+        if self.total_rows == 0:
+            return {'error': 'Aucune clé entière'}
+
+        expected = self.max_key - self.min_key + 1
+        return {
+            'rows': self.total_rows,
+            'distinct_keys': self.distinct_keys,
+            'min_key': self.min_key,
+            'max_key': self.max_key,
+            'expected_keys': expected,
+            'completeness': self.distinct_keys / expected * 100,
+            'missing_keys': self.missing_total,
+            'missing_ranges_count': self.gap_count,
+            'missing_ranges': self.gaps,
+            'duplicate_keys': self.duplicate_keys,
+            'duplicate_rows': self.duplicate_rows,
+            'duplicates': self.duplicates,
+            'out_of_order_rows': self.out_of_order_rows,
+            'out_of_order': self.out_of_order
+        }
+
+
+def analyze_key_sequence(keys, index=None, timestamps=None, max_examples=20):
+    """Analyse en mémoire : un tri O(n log n) puis une passe linéaire"""
+    keys = np.asarray(keys)
+    index = np.arange(len(keys)) if index is None else np.asarray(index)
+
+    # Seules les clés entières finies sont analysées
+    if np.issubdtype(keys.dtype, np.integer):
+        valid = np.ones(len(keys), dtype=bool)
+    else:
+        keys = keys.astype(np.float64)
+        valid = np.isfinite(keys) & (keys == np.floor(keys)) & (np.abs(keys) < 2.0 ** 63)
+    keys = keys[valid].astype(np.int64)
+    index = index[valid]
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')[valid]
+
+    order = np.argsort(keys, kind='stable')
+    accumulator = SequenceGapAccumulator(max_examples)
+    accumulator.update(
+        keys[order],
+        index[order],
+        timestamps[order] if timestamps is not None else None
+    )
+    return accumulator.result()
+
+
+def stream_sqlite_key_sequence(conn, table, column, time_column=None, chunksize=100000, max_examples=20):
+    """Analyse en flux sur SQLite : tri délégué au moteur, lecture par morceaux"""
+    time_select = f', "{time_column}"' if time_column else ''
+    cursor = conn.execute(
+        f'SELECT rowid, "{column}"{time_select} FROM "{table}" '
+        f'WHERE "{column}" IS NOT NULL ORDER BY "{column}", rowid'
+    )
+
+    accumulator = SequenceGapAccumulator(max_examples)
+    while True:
+        batch = cursor.fetchmany(chunksize)
+        if not batch:
+            break
+
+        rowids = np.array([row[0] for row in batch], dtype=np.int64)
+        keys = pd.to_numeric(pd.Series([row[1] for row in batch]), errors='coerce').to_numpy(dtype=np.float64)
+        valid = np.isfinite(keys) & (keys == np.floor(keys))
+
+        timestamps = None
+        if time_column:
+            timestamps = pd.to_datetime(
+                pd.Series([row[2] for row in batch]), errors='coerce'
+            ).to_numpy(dtype='datetime64[ns]')[valid]
+
+        accumulator.update(keys[valid].astype(np.int64), rowids[valid], timestamps)
+
+    return accumulator.result()
@@ -0,0 +1,231 @@
+"""
+Reconstruction de sessions
+Tri unique par (utilisateur, horodatage), découpage sur inactivité et agrégats par segment
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Inactivité au-delà de laquelle une nouvelle session commence
+SESSION_GAP_MINUTES = 30
+
+# Actions et IP détaillées au plus par session dans une page de résultats
+MAX_SESSION_ACTIONS = 50
+MAX_SESSION_IPS = 20
+
+SORT_KEYS = ('start', 'duration', 'events', 'amount', 'distinct_ips')
+
+ACTION_COLUMN_PATTERN = re.compile(r'(action|event|operation|activity|method|verb)')
+AMOUNT_COLUMN_PATTERN = re.compile(r'(amount|montant|total|price|prix|sum|value|valeur)')
+
+NANOSECONDS_PER_SECOND = 10 ** 9
+
+
+def find_action_column(frame):
+    for col in frame.columns:
+        if ACTION_COLUMN_PATTERN.search(str(col).lower()) and not pd.api.types.is_numeric_dtype(frame[col]):
+            return col
+    return None
+
+
+def find_amount_column(frame):
+    for col in frame.columns:
+        if AMOUNT_COLUMN_PATTERN.search(str(col).lower()) and pd.api.types.is_numeric_dtype(frame[col]):
+            return col
+    return None
+
+
+def _codes(series):
+    """Codes entiers (-1 pour les valeurs manquantes) et valeurs distinctes"""
+    codes, uniques = pd.factorize(series, sort=False)
+    return np.asarray(codes, dtype=np.int64), np.asarray(uniques, dtype=object)
+
+
+def _segment_distinct(session_ids, codes, n_sessions):
+    """Nombre de valeurs distinctes par session, via un tri (session, valeur)"""
+    valid = codes >= 0
+    session_ids, codes = session_ids[valid], codes[valid]
+    if len(codes) == 0:
+        return np.zeros(n_sessions, dtype=np.int64)
+
+    order = np.lexsort((codes, session_ids))
+    sorted_sessions, sorted_codes = session_ids[order], codes[order]
+    new_pair = np.r_[True, (sorted_sessions[1:] != sorted_sessions[:-1]) | (sorted_codes[1:] != sorted_codes[:-1])]
+    return np.bincount(sorted_sessions[new_pair], minlength=n_sessions)
+
+
+class SessionTable:
+    """Sessions reconstruites : colonnes NumPy par session, détails lus à la demande par page"""
+
+    def __init__(self, user_column, time_column, gap_minutes, users, rows, times,
+                 starts, actions=None, ips=None, amounts=None, action_column=None,
+                 ip_column=None, amount_column=None):
+        self.user_column = user_column
+        self.time_column = time_column
+        self.action_column = action_column
+        self.ip_column = ip_column
+        self.amount_column = amount_column
+        self.gap_minutes = gap_minutes
+
+        # Lignes triées par (utilisateur, horodatage)
+        self.users = users
+        self.rows = rows
+        self.times = times
+        self.actions = actions
+        self.ips = ips
+
+        # Une entrée par session
+        self.starts = starts
+        self.ends = np.r_[starts[1:], len(rows)]
+        self.events = self.ends - self.starts
+        self.user_codes = users['codes'][starts] if len(starts) else np.zeros(0, dtype=np.int64)
+        self.start_times = times[starts] if len(starts) else np.zeros(0, dtype=np.int64)
+        self.end_times = times[self.ends - 1] if len(starts) else np.zeros(0, dtype=np.int64)
+        self.durations = (self.end_times - self.start_times) / NANOSECONDS_PER_SECOND
+
+        session_ids = np.repeat(np.arange(len(starts)), self.events)
+        self.distinct_ips = (
+            _segment_distinct(session_ids, ips['codes'], len(starts)) if ips is not None else None
+        )
+        self.amounts = (
+            np.add.reduceat(np.nan_to_num(amounts), starts) if amounts is not None and len(starts) else None
+        )
+
+    @classmethod
+    def build(cls, frame, user_column, time_column, gap_minutes=SESSION_GAP_MINUTES,
+              action_column=None, ip_column=None, amount_column=None):
+        """Un tri lexicographique puis découpage vectorisé aux changements d'utilisateur ou d'inactivité"""
+        user_codes, user_values = _codes(frame[user_column])
+        times = pd.to_datetime(frame[time_column], errors='coerce').to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        valid = (user_codes >= 0) & (times != np.iinfo(np.int64).min)
+
+        rows = np.flatnonzero(valid)
+        order = np.lexsort((times[rows], user_codes[rows]))
+        rows = rows[order]
+        sorted_users = user_codes[rows]
+        sorted_times = times[rows]
+
+        gap = int(gap_minutes * 60 * NANOSECONDS_PER_SECOND)
+        boundaries = np.r_[True, (sorted_users[1:] != sorted_users[:-1]) | (np.diff(sorted_times) > gap)] \
+            if len(rows) else np.zeros(0, dtype=bool)
+        starts = np.flatnonzero(boundaries)
+
+        def sorted_codes(column):
+            if column is None:
+                return None
+            codes, values = _codes(frame[column])
+            return {'codes': codes[rows], 'values': values}
+
+        amounts = None
+        if amount_column is not None:
+            amounts = pd.to_numeric(frame[amount_column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+
+        return cls(
+            user_column, time_column, gap_minutes,
+            {'codes': sorted_users, 'values': user_values},
+            frame.index.to_numpy()[rows], sorted_times, starts,
+            actions=sorted_codes(action_column),
+            ips=sorted_codes(ip_column),
+            amounts=amounts,
+            action_column=action_column,
+            ip_column=ip_column,
+            amount_column=amount_column
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def summary(self):
+        """Vue d'ensemble des sessions"""
+        if len(self) == 0:
+            return {'total_sessions': 0}
+
+        sessions_per_user = np.bincount(self.user_codes)
+        sessions_per_user = sessions_per_user[sessions_per_user > 0]
+        summary = {
+            'total_sessions': len(self),
+            'total_events': int(self.events.sum()),
+            'users': int(len(sessions_per_user)),
+            'gap_minutes': self.gap_minutes,
+            'mean_duration_seconds': float(self.durations.mean()),
+            'median_duration_seconds': float(np.median(self.durations)),
+            'max_duration_seconds': float(self.durations.max()),
+            'mean_events_per_session': float(self.events.mean()),
+            'max_events_per_session': int(self.events.max()),
+            'mean_sessions_per_user': float(sessions_per_user.mean()),
+            'single_event_sessions': int((self.events == 1).sum())
+        }
+        if self.distinct_ips is not None:
+            summary['multi_ip_sessions'] = int((self.distinct_ips > 1).sum())
+        if self.amounts is not None:
+            summary['total_amount'] = float(self.amounts.sum())
+        return summary
+
+    def _selection(self, user=None, sort='start', descending=False):
+        """Indices des sessions filtrées puis triées"""
+        selected = np.arange(len(self))
+        if user is not None:
+            matches = np.flatnonzero(self.users['values'].astype(str) == str(user))
+            selected = selected[np.isin(self.user_codes, matches)]
+
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Tri inconnu: {sort} (attendu: {', '.join(SORT_KEYS)})")
+        keys = {
+            'start': self.start_times,
+            'duration': self.durations,
+            'events': self.events,
+            'amount': self.amounts,
+            'distinct_ips': self.distinct_ips
+        }[sort]
+        if keys is None:
+            raise ValueError(f"Tri indisponible sans colonne associée: {sort}")
+
+        order = np.argsort(-keys[selected] if descending else keys[selected], kind='stable')
+        return selected[order]
+
+    def _describe(self, session):
+        start, end = self.starts[session], self.ends[session]
+        description = {
+            'session_id': int(session),
+            'user': str(self.users['values'][self.user_codes[session]]),
+            'start': pd.Timestamp(self.start_times[session]).isoformat(),
+            'end': pd.Timestamp(self.end_times[session]).isoformat(),
+            'duration_seconds': float(self.durations[session]),
+            'events': int(self.events[session]),
+            'rows': self.rows[start:min(end, start + MAX_SESSION_ACTIONS)].tolist()
+        }
+
+        if self.actions is not None:
+            codes = self.actions['codes'][start:min(end, start + MAX_SESSION_ACTIONS)]
+            description['actions'] = [
+                str(self.actions['values'][code]) if code >= 0 else None for code in codes
+            ]
+        if self.ips is not None:
+            codes = np.unique(self.ips['codes'][start:end])
+            codes = codes[codes >= 0][:MAX_SESSION_IPS]
+            description['ips'] = [str(self.ips['values'][code]) for code in codes]
+            description['distinct_ips'] = int(self.distinct_ips[session])
+        if self.amounts is not None:
+            description['total_amount'] = float(self.amounts[session])
+
+        description['truncated'] = bool(self.events[session] > MAX_SESSION_ACTIONS)
+        return description
+
+    def page(self, page=1, per_page=50, user=None, sort='start', descending=False):
+        """Page de sessions détaillées ; seules les sessions de la page sont matérialisées"""
+        page = max(int(page), 1)
+        per_page = max(int(per_page), 1)
+        selected = self._selection(user, sort, descending)
+        offset = (page - 1) * per_page
+
+        return {
+            'page': page,
+            'per_page': per_page,
+            'total': int(len(selected)),
+            'pages': int((len(selected) + per_page - 1) // per_page),
+            'sort': sort,
+            'descending': descending,
+            'sessions': [self._describe(session) for session in selected[offset:offset + per_page]]
+        }
@@ -0,0 +1,211 @@
+"""
+Index de comptages temporels et détection de rafales
+Comptages int64 par minute, heure et jour (np.bincount sur décalages epoch), rafales à chaque résolution
+"""
+
+import numpy as np
+import pandas as pd
+
+# Résolutions en secondes ; chaque niveau est un multiple entier du précédent
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Au-delà, la résolution la plus fine est ignorée (dates aberrantes étalées sur des décennies)
+MAX_BUCKETS = 10_000_000
+
+# Seuils par défaut
+BURST_Z_THRESHOLD = 3.0
+SLIDING_WINDOWS = {'minute': 5, 'hour': 3, 'day': 7}
+KLEINBERG_SCALE = 2.0
+KLEINBERG_GAMMA = 1.0
+
+NANOSECONDS_PER_SECOND = 10 ** 9
+
+
+class TimeBucketIndex:
+    """Comptages d'événements par minute, heure et jour depuis minuit du premier jour"""
+
+    def __init__(self, origin, counts):
+        self.origin = origin
+        self._counts = counts
+
+    @classmethod
+    def from_times(cls, times):
+        """Un seul np.bincount sur les minutes écoulées, puis agrégation par remodelage"""
+        times = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+        times = times[times != np.iinfo(np.int64).min]
+        if len(times) == 0:
+            return cls(None, {name: np.zeros(0, dtype=np.int64) for name in RESOLUTIONS})
+
+        day = RESOLUTIONS['day'] * NANOSECONDS_PER_SECOND
+        origin = (times.min() // day) * day
+        minutes = (times - origin) // (RESOLUTIONS['minute'] * NANOSECONDS_PER_SECOND)
+
+        counts = {}
+        span = int(minutes.max()) + 1
+        if span <= MAX_BUCKETS:
+            counts['minute'] = np.bincount(minutes, minlength=span).astype(np.int64)
+            counts['hour'] = cls._coarsen(counts['minute'], 60)
+        else:
+            counts['hour'] = np.bincount(minutes // 60).astype(np.int64)
+        counts['day'] = cls._coarsen(counts['hour'], 24)
+        return cls(int(origin), counts)
+
+    @staticmethod
+    def _coarsen(counts, factor):
+        padded = np.zeros(-(-len(counts) // factor) * factor, dtype=np.int64)
+        padded[:len(counts)] = counts
+        return padded.reshape(-1, factor).sum(axis=1)
+
+    def resolutions(self):
+        return [name for name in RESOLUTIONS if name in self._counts]
+
+    def counts(self, resolution):
+        return self._counts[resolution]
+
+    def bucket_start(self, resolution, position):
+        return pd.Timestamp(self.origin + int(position) * RESOLUTIONS[resolution] * NANOSECONDS_PER_SECOND)
+
+
+def zscore_bursts(counts, threshold=BURST_Z_THRESHOLD):
+    """Buckets dont le comptage dépasse la moyenne de threshold écarts-types"""
+    std = counts.std()
+    if std == 0:
+        return np.zeros(len(counts)), np.zeros(len(counts), dtype=bool)
+    scores = (counts - counts.mean()) / std
+    return scores, scores > threshold
+
+
+def sliding_window_bursts(counts, window, threshold=BURST_Z_THRESHOLD):
+    """Sommes glissantes sur window buckets comparées à l'attendu de Poisson (λ·window)"""
+    window = max(1, min(window, len(counts)))
+    cumulative = np.r_[0, np.cumsum(counts)]
+    sums = cumulative[window:] - cumulative[:-window]
+    expected = counts.mean() * window
+    if expected == 0:
+        return sums, np.zeros(len(sums)), np.zeros(len(sums), dtype=bool)
+    scores = (sums - expected) / np.sqrt(expected)
+    return sums, scores, scores > threshold
+
+
+def _clamp_scan(shift, low, high):
+    """Composition préfixe (scan de Hillis-Steele) des applications x ↦ clamp(x + shift, low, high)
+
+    Ces applications sont stables par composition, ce qui rend la récurrence de Viterbi
+    à deux états parallélisable en log2(n) passes vectorisées.
+    """
+    shift, low, high = shift.copy(), low.copy(), high.copy()
+    step = 1
+    while step < len(shift):
+        # f = préfixe jusqu'à i - step (appliqué d'abord), g = bloc courant
+        f_shift, f_low, f_high = shift[:-step], low[:-step], high[:-step]
+        g_shift, g_low, g_high = shift[step:], low[step:], high[step:]
+        new_low = np.clip(f_low + g_shift, g_low, g_high)
+        new_high = np.clip(f_high + g_shift, g_low, g_high)
+        shift[step:] = f_shift + g_shift
+        low[step:] = new_low
+        high[step:] = new_high
+        step *= 2
+    return shift, low, high
+
+
+def kleinberg_bursts(counts, scale=KLEINBERG_SCALE, gamma=KLEINBERG_GAMMA):
+    """Automate de Kleinberg à deux états (taux de base / taux × scale) sur comptages de Poisson
+
+    Retourne l'état (0 ou 1) de chaque bucket selon le chemin de coût minimal.
+    """
+    n = len(counts)
+    base_rate = counts.mean() if n else 0.0
+    if n == 0 or base_rate == 0:
+        return np.zeros(n, dtype=np.int8)
+
+    burst_rate = base_rate * scale
+    # Écart de coût (-log vraisemblance) état 1 - état 0, coût d'entrée en rafale
+    delta = (burst_rate - base_rate) - counts * np.log(scale)
+    entry_cost = gamma * np.log(n)
+
+    # D_t = C1_t - C0_t = clamp(D_{t-1}, 0, entry_cost) + delta_t, avec D_{-1} = +inf
+    _, _, cost_gap = _clamp_scan(delta, delta, delta + entry_cost)
+
+    # Retour arrière : l'état précédent est imposé hors de [0, entry_cost[, recopié sinon
+    determined = (cost_gap < 0) | (cost_gap >= entry_cost)
+    determined[-1] = True
+    values = (cost_gap < 0).astype(np.int8)
+    positions = np.where(determined, np.arange(n), n)
+    next_determined = np.minimum.accumulate(positions[::-1])[::-1]
+    return values[next_determined]
+
+
+def _runs(states):
+    """Plages [début, fin[ des états à 1"""
+    edges = np.diff(np.r_[0, states.astype(np.int8), 0])
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_bursts(index, threshold=BURST_Z_THRESHOLD, windows=None, scale=KLEINBERG_SCALE,
+                  gamma=KLEINBERG_GAMMA, top_k=10):
+    """Rafales par z-score, fenêtre glissante et Kleinberg à chaque résolution de l'index"""
+    windows = {**SLIDING_WINDOWS, **(windows or {})}
+    results = {}
+
+    for resolution in index.resolutions():
+        # Période active seulement : les buckets vides avant le premier événement
+        # (alignement sur minuit) ou après le dernier biaiseraient le taux de base
+        counts = index.counts(resolution)
+        active = np.flatnonzero(counts)
+        offset = int(active[0]) if len(active) else 0
+        counts = counts[offset:int(active[-1]) + 1] if len(active) else counts
+        if len(counts) < 3:
+            results[resolution] = {'buckets': int(len(counts)), 'status': 'insufficient_span'}
+            continue
+
+        def bucket(position, count, score=None):
+            entry = {'start': index.bucket_start(resolution, offset + position).isoformat(), 'count': int(count)}
+            if score is not None:
+                entry['score'] = float(score)
+            return entry
+
+        scores, flagged = zscore_bursts(counts, threshold)
+        top = np.flatnonzero(flagged)
+        top = top[np.argsort(-scores[top], kind='stable')][:top_k]
+
+        window = windows[resolution]
+        sums, window_scores, window_flagged = sliding_window_bursts(counts, window, threshold)
+        window_top = np.flatnonzero(window_flagged)
+        window_top = window_top[np.argsort(-window_scores[window_top], kind='stable')][:top_k]
+
+        states = kleinberg_bursts(counts, scale, gamma)
+        starts, ends = _runs(states)
+        cumulative = np.r_[0, np.cumsum(counts)]
+        events = cumulative[ends] - cumulative[starts]
+        excess = events - counts.mean() * (ends - starts)
+        ranked = np.argsort(-excess, kind='stable')[:top_k]
+
+        results[resolution] = {
+            'buckets': int(len(counts)),
+            'mean_count': float(counts.mean()),
+            'max_count': int(counts.max()),
+            'zscore': {
+                'count': int(flagged.sum()),
+                'top': [bucket(p, counts[p], scores[p]) for p in top]
+            },
+            'sliding_window': {
+                'window': int(window),
+                'count': int(window_flagged.sum()),
+                'top': [bucket(p, sums[p], window_scores[p]) for p in window_top]
+            },
+            'kleinberg': {
+                'count': int(len(starts)),
+                'bursts': [
+                    {
+                        'start': index.bucket_start(resolution, offset + starts[i]).isoformat(),
+                        'end': index.bucket_start(resolution, offset + ends[i]).isoformat(),
+                        'buckets': int(ends[i] - starts[i]),
+                        'events': int(events[i]),
+                        'excess_events': float(excess[i])
+                    }
+                    for i in ranked
+                ]
+            }
+        }
+
+    return results
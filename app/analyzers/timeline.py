@@ -0,0 +1,206 @@
+"""
+Moteur de timeline forensique
+Index unique trié dans le temps de tous les horodatages, persisté et parcouru par curseur
+"""
+
+import base64
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_COLUMN_KEYWORDS = ['date', 'time', 'created', 'modified', 'updated', 'deleted', 'login', 'logout']
+
+# Nature de l'événement déduite du nom de la colonne (premier motif reconnu)
+EVENT_KINDS = [
+    (re.compile(r'(delet|remov|suppr)'), 'record_deleted'),
+    (re.compile(r'(modif|updat|edit|chang)'), 'record_modified'),
+    (re.compile(r'(creat|insert|ajout)'), 'record_created'),
+    (re.compile(r'(logout|logoff|deconn)'), 'logout'),
+    (re.compile(r'(login|logon|connex|auth)'), 'login'),
+]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Événements examinés par passe quand un filtre de type rend la page non contiguë
+FILTER_SCAN_CHUNK = 100000
+
+
+def event_kind(column):
+    name = str(column).lower()
+    for pattern, kind in EVENT_KINDS:
+        if pattern.search(name):
+            return kind
+    return 'timestamp'
+
+
+def find_timestamp_columns(frame):
+    """Colonnes temporelles dont une majorité de valeurs est lisible comme date"""
+    columns = []
+    for col in frame.columns:
+        if any(keyword in str(col).lower() for keyword in TIMESTAMP_COLUMN_KEYWORDS):
+            if pd.to_datetime(frame[col], errors='coerce').notna().mean() > 0.5:
+                columns.append(col)
+    return columns
+
+
+def build_timeline(frame, timestamp_columns, context_columns=None):
+    """Fusion de toutes les colonnes temporelles en un index (temps, colonne, ligne) trié une fois
+
+    Le résultat ne contient que des tableaux NumPy, pour être persisté puis relu en mmap.
+    """
+    times, rows, types = [], [], []
+    for code, col in enumerate(timestamp_columns):
+        values = pd.to_datetime(frame[col], errors='coerce').to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        valid = np.flatnonzero(values != np.iinfo(np.int64).min)
+        times.append(values[valid])
+        rows.append(valid)
+        types.append(np.full(len(valid), code, dtype=np.int16))
+
+    times = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    types = np.concatenate(types) if types else np.zeros(0, dtype=np.int16)
+
+    order = np.lexsort((rows, types, times))
+    timeline = {
+        'times': times[order],
+        'rows': rows[order],
+        'types': types[order],
+        'index': frame.index.to_numpy()[rows[order]] if len(order) else np.zeros(0, dtype=np.int64),
+        'columns': list(timestamp_columns),
+        'kinds': [event_kind(col) for col in timestamp_columns],
+        'context': {}
+    }
+
+    # Contexte (utilisateur, action...) encodé par ligne pour décrire les événements
+    for col in context_columns or []:
+        codes, uniques = pd.factorize(frame[col], sort=False)
+        timeline['context'][col] = {
+            'codes': np.asarray(codes, dtype=np.int32)[rows[order]],
+            'values': np.asarray([str(value) for value in uniques], dtype=object)
+        }
+
+    return timeline
+
+
+def _cursor_tag(key):
+    """Empreinte de la clé complète (hash des données compris) : un curseur ne vaut que pour sa timeline"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(key, position):
+    payload = json.dumps({'k': _cursor_tag(key), 'p': int(position)}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(key, cursor):
+    """Position encodée dans le curseur ; refuse un curseur d'une autre timeline"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        position = int(payload['p'])
+    except Exception:
+        raise ValueError('Curseur invalide')
+    if payload.get('k') != _cursor_tag(key):
+        raise ValueError('Curseur périmé : la timeline a changé')
+    return position
+
+
+def _to_ns(value):
+    if value is None or value == '':
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return timestamp.value
+
+
+def timeline_summary(timeline):
+    times, types = timeline['times'], timeline['types']
+    counts = np.bincount(types.astype(np.int64), minlength=len(timeline['columns'])) if len(types) else \
+        np.zeros(len(timeline['columns']), dtype=np.int64)
+    return {
+        'total_events': int(len(times)),
+        'earliest': pd.Timestamp(int(times[0])).isoformat() if len(times) else None,
+        'latest': pd.Timestamp(int(times[-1])).isoformat() if len(times) else None,
+        'event_types': {
+            col: {'kind': kind, 'events': int(count)}
+            for col, kind, count in zip(timeline['columns'], timeline['kinds'], counts)
+        }
+    }
+
+
+def describe_events(timeline, positions):
+    """Événements lisibles pour les positions données de l'index"""
+    columns, kinds = timeline['columns'], timeline['kinds']
+    events = []
+    for position in positions:
+        column = columns[int(timeline['types'][position])]
+        row = timeline['index'][position]
+        event = {
+            'timestamp': pd.Timestamp(int(timeline['times'][position])).isoformat(),
+            'event': kinds[int(timeline['types'][position])],
+            'column': column,
+            'row': row.item() if hasattr(row, 'item') else row,
+            'description': f"{column} (ligne {row})"
+        }
+        context = {}
+        for col, encoded in timeline['context'].items():
+            code = int(encoded['codes'][position])
+            context[col] = encoded['values'][code] if code >= 0 else None
+        if context:
+            event['context'] = context
+            details = ', '.join(f"{col}={value}" for col, value in context.items() if value is not None)
+            if details:
+                event['description'] += f" — {details}"
+        events.append(event)
+    return events
+
+
+def page_timeline(timeline, key, cursor=None, limit=DEFAULT_PAGE_SIZE, since=None, until=None, event_type=None):
+    """Page d'événements : bornes temporelles et curseur résolus par recherche dichotomique"""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    times = timeline['times']
+
+    since_ns, until_ns = _to_ns(since), _to_ns(until)
+    low = int(np.searchsorted(times, since_ns, side='left')) if since_ns is not None else 0
+    high = int(np.searchsorted(times, until_ns, side='right')) if until_ns is not None else len(times)
+
+    position = max(decode_cursor(key, cursor), low) if cursor else low
+
+    if event_type is None:
+        positions = np.arange(position, min(position + limit, high))
+        next_position = position + limit if position + limit < high else None
+    else:
+        # Type d'événement renvoyé dans 'event' (login, record_modified...) : une ou plusieurs colonnes
+        kinds = [str(kind) for kind in timeline['kinds']]
+        codes = [code for code, kind in enumerate(kinds) if kind == event_type]
+        if not codes:
+            raise ValueError(f"Type d'événement inconnu: {event_type} (disponibles: {', '.join(sorted(set(kinds)))})")
+        found = []
+        next_position = None
+        scan = position
+        while scan < high:
+            stop = min(scan + FILTER_SCAN_CHUNK, high)
+            matches = scan + np.flatnonzero(np.isin(timeline['types'][scan:stop], codes))
+            found.append(matches[:limit - sum(len(f) for f in found)])
+            if sum(len(f) for f in found) >= limit:
+                last = found[-1][-1] + 1
+                next_position = int(last) if last < high else None
+                break
+            scan = stop
+        positions = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    return {
+        'events': describe_events(timeline, positions),
+        'count': int(len(positions)),
+        'limit': limit,
+        'range_events': int(max(high - low, 0)),
+        'next_cursor': encode_cursor(key, next_position) if next_position is not None else None,
+        'since': since,
+        'until': until,
+        'type': event_type
+    }
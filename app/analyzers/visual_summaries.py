@@ -0,0 +1,154 @@
+"""
+Données de visualisation pré-agrégées
+Histogrammes NumPy, matrice de corrélation bornée et réordonnée par clustering, séries sous-échantillonnées (LTTB)
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# Bornes de taille des figures, indépendantes du nombre de lignes
+MAX_HISTOGRAM_BINS = 50
+MAX_HEATMAP_COLUMNS = 40
+MAX_SERIES_POINTS = 500
+MAX_ACTIVITY_POINTS = 2000
+
+# Lignes échantillonnées pour la corrélation des tables volumineuses
+CORRELATION_SAMPLE_ROWS = 100000
+
+# Au-delà, la largeur 'auto' donnerait toujours plus de MAX_HISTOGRAM_BINS intervalles : pas de calcul d'IQR
+HISTOGRAM_AUTO_ROWS = 100000
+
+
+def histogram(values, max_bins=MAX_HISTOGRAM_BINS):
+    """Comptages par intervalle (largeur 'auto' de NumPy, au plus max_bins) ; None si aucune valeur finie"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return None
+
+    low, high = finite.min(), finite.max()
+    if low == high:
+        counts, edges = np.histogram(finite, bins=1, range=(low - 0.5, high + 0.5))
+    elif len(finite) > HISTOGRAM_AUTO_ROWS:
+        # Intervalles réguliers : chemin rapide de np.histogram (sans recherche dichotomique)
+        counts, edges = np.histogram(finite, bins=max_bins, range=(low, high))
+    else:
+        edges = np.histogram_bin_edges(finite, bins='auto')
+        bins = edges if len(edges) - 1 <= max_bins else max_bins
+        counts, edges = np.histogram(finite, bins=bins, range=(low, high))
+    return {
+        'edges': edges,
+        'counts': counts,
+        'missing': int(len(values) - len(finite))
+    }
+
+
+def cluster_order(corr):
+    """Ordre des colonnes regroupant les variables corrélées (clustering hiérarchique sur 1 - |r|)"""
+    if len(corr) < 3 or not HAS_SCIPY:
+        return np.arange(len(corr))
+    distance = 1.0 - np.abs(np.nan_to_num(corr, nan=0.0))
+    np.fill_diagonal(distance, 0.0)
+    distance = np.clip((distance + distance.T) / 2, 0.0, None)
+    return leaves_list(linkage(squareform(distance, checks=False), method='average'))
+
+
+def correlation_summary(frame, max_columns=MAX_HEATMAP_COLUMNS, sample_rows=CORRELATION_SAMPLE_ROWS,
+                        random_state=42):
+    """Corrélations des colonnes numériques non constantes, bornées à max_columns et réordonnées
+
+    Sur une table large, les colonnes retenues sont les plus corrélées aux autres (somme des |r|).
+    Au-delà de sample_rows lignes, les corrélations sont estimées sur un échantillon.
+    """
+    sampled = len(frame) > sample_rows
+    if sampled:
+        frame = frame.sample(n=sample_rows, random_state=random_state)
+    frame = frame.loc[:, frame.std() > 0]
+    if frame.shape[1] < 2:
+        return None
+    values = frame.to_numpy(dtype=np.float64)
+    # Sans valeur manquante, np.corrcoef évite le calcul par paires de pandas
+    corr = np.corrcoef(values, rowvar=False) if np.isfinite(values).all() else frame.corr().to_numpy()
+    columns = list(frame.columns)
+
+    total_columns = len(columns)
+    if total_columns > max_columns:
+        strength = np.nansum(np.abs(corr), axis=0)
+        keep = np.sort(np.argsort(-strength, kind='stable')[:max_columns])
+        corr = corr[np.ix_(keep, keep)]
+        columns = [columns[i] for i in keep]
+
+    order = cluster_order(corr)
+    return {
+        'columns': [columns[i] for i in order],
+        'matrix': corr[np.ix_(order, order)],
+        'total_columns': total_columns,
+        'sampled': sampled
+    }
+
+
+def lttb(x, y, threshold):
+    """Indices des points retenus par Largest-Triangle-Three-Buckets (premier et dernier inclus)
+
+    Chaque intervalle garde le point formant le plus grand triangle avec le point retenu
+    précédent et la moyenne de l'intervalle suivant : pics et creux sont préservés.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    # Bornes des intervalles et moyennes de chacun calculées en une passe ; le dernier point est seul
+    bounds = np.minimum((np.arange(threshold - 1) * every).astype(np.int64) + 1, n - 1)
+    bounds[-1] = n - 1
+    sizes = np.diff(np.r_[bounds, n])
+    means_x = np.add.reduceat(x, bounds) / sizes
+    means_y = np.add.reduceat(y, bounds) / sizes
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        mean_x, mean_y = means_x[bucket + 1], means_y[bucket + 1]
+
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def sort_times(times):
+    """Dates lisibles triées et positions des lignes correspondantes (tri partagé par toutes les séries)"""
+    times = pd.to_datetime(pd.Series(times), errors='coerce').to_numpy(dtype='datetime64[ns]')
+    rows = np.flatnonzero(~np.isnat(times))
+    rows = rows[np.argsort(times[rows], kind='stable')]
+    return times[rows], rows
+
+
+def downsample_series(times, values, max_points=MAX_SERIES_POINTS):
+    """Série déjà triée par date, sans valeurs manquantes, réduite à max_points par LTTB"""
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(values)
+    times, values = times[valid], values[valid]
+
+    keep = lttb(times.astype(np.int64), values, max_points)
+    return {
+        # Dates à la seconde : chaînes deux fois plus courtes que la précision nanoseconde
+        'times': np.datetime_as_string(times[keep], unit='s'),
+        'values': values[keep],
+        'points': int(len(times))
+    }
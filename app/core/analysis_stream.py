@@ -0,0 +1,183 @@
+"""
+Analyse combinée en flux
+Un seul chargement du fichier, sections émises une à une (NDJSON ou server-sent events) dès qu'elles sont prêtes
+"""
+
+import logging
+import sys
+import time
+
+from analyzers.anomaly_detector import AnomalyDetector
+from core.data_utils import dataset_hash
+from analyzers.pattern_detector import PatternDetector
+from analyzers.sections import iter_sections, parse_sections, resolve_sections
+from core.database_analyzer import DatabaseAnalyzer
+from core.forensic_analyzer import ForensicAnalyzer
+from core.result_cache import code_version
+from core.serialization import dumps
+
+# Analyseurs disponibles, les plus rapides d'abord (IsolationForest et DBSCAN en dernier)
+STREAM_ANALYZERS = ['basic', 'forensic', 'patterns', 'visualizations', 'anomalies']
+
+STREAM_FORMATS = ('ndjson', 'sse')
+
+# Méthode d'analyse complète de chaque analyseur (mêmes résultats que les endpoints dédiés)
+ANALYSIS_METHODS = {
+    'basic': 'analyze',
+    'forensic': 'full_analysis',
+    'patterns': 'detect_patterns',
+    'visualizations': 'generate_visualizations',
+    'anomalies': 'detect_anomalies'
+}
+
+
+def analysis_compute(name, analyzer):
+    """Analyse complète sous la forme mise en cache (section -> résultat), commune aux endpoints et au flux"""
+    if name == 'visualizations':
+        return lambda: {'visualizations': analyzer.generate_visualizations()}
+    return getattr(analyzer, ANALYSIS_METHODS[name])
+
+
+def file_sections(name, analyzer, sections=None):
+    """Sections demandées propres au fichier (nom, chemin, dates) : (section, méthode), hors cache de résultats
+
+    Un même contenu peut être reçu sous plusieurs noms ; seul le reste de l'analyse dépend du contenu.
+    """
+    names = getattr(analyzer, 'FILE_SECTIONS', ())
+    if name == 'visualizations' or not names:
+        return []
+    requested = parse_sections(sections)
+    return [(section, method) for section, method, _ in analyzer.section_steps()
+            if section in names and (requested is None or section in requested)]
+
+
+def create_analyzer(name, filepath, model_dir):
+    if name in ('basic', 'visualizations'):
+        return DatabaseAnalyzer(filepath)
+    if name == 'forensic':
+        return ForensicAnalyzer(filepath, model_dir=model_dir)
+    if name == 'patterns':
+        return PatternDetector(filepath)
+    return AnomalyDetector(filepath, model_dir=model_dir)
+
+
+def resolve_request(analyzers=None, sections=None):
+    """Analyseurs demandés (ordre d'exécution fixe) et sections par analyseur
+
+    Les sections sont qualifiées par leur analyseur : 'forensic.timestamp_analysis,anomalies.bursts'.
+    Un analyseur sans section listée est calculé entièrement ; sans liste d'analyseurs,
+    ce sont ceux des sections demandées (tous si aucune section n'est précisée).
+    """
+    requested = parse_sections(analyzers) or ([] if parse_sections(sections) else list(STREAM_ANALYZERS))
+    unknown = [name for name in requested if name not in STREAM_ANALYZERS]
+    if unknown:
+        raise ValueError(f"Analyseur(s) inconnu(s): {', '.join(unknown)} (disponibles: {', '.join(STREAM_ANALYZERS)})")
+
+    per_analyzer = {}
+    for qualified in parse_sections(sections) or []:
+        analyzer, _, section = qualified.partition('.')
+        if analyzer not in STREAM_ANALYZERS or not section:
+            raise ValueError(f"Section invalide: {qualified} (attendu: analyseur.section)")
+        per_analyzer.setdefault(analyzer, []).append(section)
+        if analyzer not in requested:
+            requested.append(analyzer)
+
+    return [name for name in STREAM_ANALYZERS if name in requested], per_analyzer
+
+
+def format_event(event, stream_format='ndjson'):
+    payload = dumps(event).decode('utf-8')
+    if stream_format == 'sse':
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + '\n'
+
+
+def stream_analysis(filepath, analyzers, sections=None, bounds=None, model_dir=None, result_cache=None):
+    """Génère les événements start / section / section_error / analyzer_done / end
+
+    Les résultats complets déjà en cache sont relus sans charger le fichier ; sinon le fichier
+    est chargé une seule fois et partagé par tous les analyseurs. Un analyseur calculé sans
+    erreur alimente le cache avec la même clé que son endpoint dédié, hors sections propres au fichier.
+    """
+    logger = logging.getLogger(__name__)
+    sections = sections or {}
+    bounds = {name: value for name, value in (bounds or {}).items() if value is not None}
+    started = time.time()
+    data = None
+    data_hash = dataset_hash(filepath) if result_cache is not None else None
+
+    yield {'event': 'start', 'analyzers': analyzers, 'sections': sections}
+
+    for name in analyzers:
+        analyzer_started = time.time()
+        analyzer = create_analyzer(name, filepath, model_dir)
+        version = code_version(sys.modules[type(analyzer).__module__])
+        params = {**bounds}
+        if sections.get(name):
+            params['sections'] = sections[name]
+        if name == 'anomalies':
+            params = {'hashed': False, **params}
+
+        live = file_sections(name, analyzer, sections.get(name))
+        cached = result_cache.get(data_hash, name, version, params) if result_cache is not None else None
+        if cached is not None:
+            for section, method in live:
+                yield {'event': 'section', 'analyzer': name, 'section': section, 'cached': False, 'data': method()}
+            for section, result in cached.items():
+                yield {'event': 'section', 'analyzer': name, 'section': section, 'cached': True, 'data': result}
+            yield {'event': 'analyzer_done', 'analyzer': name, 'sections': len(live) + len(cached), 'cached': True,
+                   'elapsed_seconds': round(time.time() - analyzer_started, 3)}
+            continue
+
+        try:
+            if data is None:
+                analyzer.load_data()
+                data = analyzer.data
+            else:
+                # Même DataFrame partagé : aucun analyseur ne le modifie
+                analyzer.data = data
+        except Exception as e:
+            logger.error(f"Erreur chargement pour l'analyse en flux: {str(e)}")
+            yield {'event': 'error', 'error': str(e)}
+            break
+
+        if name == 'visualizations':
+            steps = [('visualizations', analyzer.generate_visualizations, {})]
+        else:
+            steps = analyzer.section_steps()
+
+        results, failed = {}, False
+        try:
+            selected = resolve_sections([section for section, _, _ in steps], sections.get(name))
+        except ValueError as e:
+            yield {'event': 'section_error', 'analyzer': name, 'section': None, 'error': str(e)}
+            selected, failed = [], True
+
+        for section in selected:
+            section_started = time.time()
+            try:
+                # Une section à la fois : une erreur n'interrompt pas les suivantes
+                _, result = next(iter_sections(steps, [section], bounds))
+            except Exception as e:
+                logger.error(f"Erreur section {name}.{section}: {str(e)}")
+                yield {'event': 'section_error', 'analyzer': name, 'section': section, 'error': str(e)}
+                failed = True
+                continue
+
+            results[section] = result
+            yield {'event': 'section', 'analyzer': name, 'section': section, 'cached': False,
+                   'elapsed_seconds': round(time.time() - section_started, 3), 'data': result}
+
+        if result_cache is not None and not failed:
+            try:
+                result_cache.put(data_hash, name, version, params,
+                                 {section: result for section, result in results.items()
+                                  if section not in dict(live)})
+            except Exception as e:
+                logger.warning(f"Mise en cache impossible ({name}): {str(e)}")
+
+        yield {'event': 'analyzer_done', 'analyzer': name, 'sections': len(results), 'cached': False,
+               'elapsed_seconds': round(time.time() - analyzer_started, 3)}
+
+    yield {'event': 'end', 'elapsed_seconds': round(time.time() - started, 3)}
+
@@ -0,0 +1,299 @@
+"""
+Upload par morceaux reprenable
+Session (init), envoi des morceaux dans n'importe quel ordre avec somme SHA-256, finalisation ; hash du fichier calculé au fil de l'eau
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from core.data_utils import remember_hash
+from core.serialization import dumps, loads
+
+# Taille des morceaux par défaut et bornes acceptées (chaque morceau reste sous MAX_CONTENT_LENGTH)
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Taille maximale d'un fichier reçu par morceaux
+MAX_UPLOAD_BYTES = 64 * 1024 ** 3
+
+# Sessions inactives conservées avant purge (reprise possible jusque-là)
+UPLOAD_RETENTION_HOURS = 48
+
+# Hash calculés pendant la réception (ceux des métadonnées forensiques)
+HASH_ALGORITHMS = ('md5', 'sha1', 'sha256')
+
+# Taille des lectures lors de l'écriture et du hachage
+IO_BLOCK_SIZE = 1024 * 1024
+
+
+class IncompleteUploadError(RuntimeError):
+    """Finalisation demandée alors que des morceaux manquent"""
+
+    def __init__(self, missing):
+        super().__init__(f"{len(missing)} morceau(x) manquant(s)")
+        self.missing = missing
+
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+
+def _write_json(path, payload):
+    """Écriture atomique : fichier temporaire puis renommage"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps(payload))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ChunkedUploads:
+    """Sessions d'upload sur disque : tout processus web peut recevoir un morceau ou reprendre une session
+
+    Chaque morceau validé est écrit à sa position dans un fichier préalloué puis marqué par un
+    fichier témoin (sa somme SHA-256). Les hash du fichier complet avancent dès que les morceaux
+    suivants sont présents ; l'état en mémoire d'un processus n'est réutilisé que si les sommes
+    sur disque confirment qu'aucun morceau haché n'a été réécrit ailleurs, sinon il est recalculé.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_UPLOAD_BYTES, retention_hours=UPLOAD_RETENTION_HOURS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retention_hours = retention_hours
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # upload_id -> (hash en cours par algorithme, sommes des morceaux déjà hachés, dans l'ordre)
+        self._hashers = {}
+
+    def _session_dir(self, upload_id):
+        return os.path.join(self.directory, upload_id)
+
+    def _data_path(self, upload_id):
+        return os.path.join(self._session_dir(upload_id), 'data.part')
+
+    def _marker_path(self, upload_id, index):
+        return os.path.join(self._session_dir(upload_id), 'chunks', str(index))
+
+    def _read_session(self, upload_id):
+        if not self._valid_id(upload_id):
+            return None
+        try:
+            with open(os.path.join(self._session_dir(upload_id), 'session.json'), 'rb') as f:
+                return loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def create(self, filename, total_size, chunk_size=None, sha256=None):
+        """Nouvelle session ; renvoie son état (identifiant, taille et nombre de morceaux)"""
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if total_size is None or total_size < 1:
+            raise ValueError("Taille du fichier invalide")
+        if total_size > self.max_bytes:
+            raise ValueError(f"Fichier trop volumineux (maximum {self.max_bytes} octets)")
+        if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"Taille de morceau invalide (entre {MIN_CHUNK_SIZE} et {MAX_CHUNK_SIZE} octets)")
+        if sha256 is not None and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256.lower())):
+            raise ValueError("Somme SHA-256 attendue invalide")
+
+        self.purge()
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._session_dir(upload_id), 'chunks'))
+        # Fichier préalloué (creux) : chaque morceau est écrit à sa position, dans n'importe quel ordre
+        with open(self._data_path(upload_id), 'wb') as f:
+            f.truncate(total_size)
+
+        session = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'size': total_size,
+            'chunk_size': chunk_size,
+            'chunks': -(-total_size // chunk_size),
+            'sha256': sha256.lower() if sha256 else None,
+            'created_at': _now()
+        }
+        _write_json(os.path.join(self._session_dir(upload_id), 'session.json'), session)
+        return session
+
+    def chunk_length(self, session, index):
+        return min(session['chunk_size'], session['size'] - index * session['chunk_size'])
+
+    def received(self, upload_id):
+        try:
+            return sorted(int(name) for name in os.listdir(os.path.join(self._session_dir(upload_id), 'chunks'))
+                          if name.isdigit())
+        except OSError:
+            return []
+
+    def status(self, upload_id):
+        """État de la session (morceaux reçus et manquants pour la reprise), None si inconnue"""
+        session = self._read_session(upload_id)
+        if session is None:
+            return None
+        received = set(self.received(upload_id))
+        missing = [index for index in range(session['chunks']) if index not in received]
+        received_bytes = sum(self.chunk_length(session, index) for index in received)
+        return {
+            **session,
+            'received_chunks': len(received),
+            'received_bytes': received_bytes,
+            'missing': missing,
+            'complete': not missing
+        }
+
+    def write_chunk(self, upload_id, index, stream, checksum):
+        """Écrit le morceau index lu depuis stream ; ValueError si sa taille ou sa somme SHA-256 diffère
+
+        Un morceau déjà reçu peut être renvoyé (reprise) : il est réécrit et revérifié.
+        Renvoie None si la session est inconnue.
+        """
+        session = self._read_session(upload_id)
+        if session is None:
+            return None
+        if not 0 <= index < session['chunks']:
+            raise ValueError(f"Morceau hors limites: {index} (0 à {session['chunks'] - 1})")
+        if not checksum:
+            raise ValueError("Somme SHA-256 du morceau manquante (en-tête X-Chunk-SHA256)")
+
+        expected_length = self.chunk_length(session, index)
+        marker = self._marker_path(upload_id, index)
+        if os.path.exists(marker):
+            # Morceau réécrit : il ne compte plus comme reçu tant qu'il n'est pas revérifié
+            os.remove(marker)
+        chunk_hash = hashlib.sha256()
+        length = 0
+        with open(self._data_path(upload_id), 'r+b') as f:
+            f.seek(index * session['chunk_size'])
+            for block in iter(lambda: stream.read(IO_BLOCK_SIZE), b''):
+                length += len(block)
+                if length > expected_length:
+                    raise ValueError(f"Morceau {index} trop long (attendu: {expected_length} octets)")
+                chunk_hash.update(block)
+                f.write(block)
+        if length != expected_length:
+            raise ValueError(f"Morceau {index} incomplet: {length} octets reçus sur {expected_length}")
+        if chunk_hash.hexdigest() != checksum.lower():
+            raise ValueError(f"Somme SHA-256 du morceau {index} invalide")
+
+        with open(marker, 'w') as f:
+            f.write(chunk_hash.hexdigest())
+        self._advance_hashes(upload_id, session)
+        return self.status(upload_id)
+
+    def _read_marker(self, upload_id, index):
+        """Somme SHA-256 enregistrée du morceau (identifie son contenu actuel), None s'il n'est pas reçu"""
+        try:
+            with open(self._marker_path(upload_id, index)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _advance_hashes(self, upload_id, session, validate=False):
+        """Hache les morceaux contigus déjà reçus depuis la dernière position (relecture du cache disque)
+
+        L'état en mémoire retient la somme de chaque morceau haché. Un autre processus peut réécrire
+        un morceau : avec validate (finalisation), si une somme enregistrée sur disque ne correspond
+        plus, le hash repart du début. Chaque morceau relu est revérifié contre sa somme avant d'être intégré.
+        """
+        with self._lock:
+            hashes, consumed = self._hashers.get(upload_id) or (None, [])
+            stale = validate and [self._read_marker(upload_id, i) for i in range(len(consumed))] != consumed
+            if hashes is None or stale:
+                hashes, consumed = {algorithm: hashlib.new(algorithm) for algorithm in HASH_ALGORITHMS}, []
+
+            with open(self._data_path(upload_id), 'rb') as f:
+                while len(consumed) < session['chunks']:
+                    index = len(consumed)
+                    checksum = self._read_marker(upload_id, index)
+                    if checksum is None:
+                        break
+                    f.seek(index * session['chunk_size'])
+                    pending = {algorithm: hash_obj.copy() for algorithm, hash_obj in hashes.items()}
+                    chunk_hash = hashlib.sha256()
+                    remaining = self.chunk_length(session, index)
+                    while remaining:
+                        block = f.read(min(IO_BLOCK_SIZE, remaining))
+                        if not block:
+                            break
+                        chunk_hash.update(block)
+                        for hash_obj in pending.values():
+                            hash_obj.update(block)
+                        remaining -= len(block)
+                    if remaining or chunk_hash.hexdigest() != checksum:
+                        # Morceau en cours de réécriture : repris au prochain envoi ou à la finalisation
+                        break
+                    hashes = pending
+                    consumed.append(checksum)
+            self._hashers[upload_id] = (hashes, consumed)
+            return list(consumed)
+
+    def finalize(self, upload_id, destination):
+        """Déplace le fichier complet vers destination ; renvoie ses hash
+
+        Les hash renvoyés sont ceux des morceaux présents sur disque : chaque morceau haché a été
+        revérifié et l'ensemble correspond aux sommes enregistrées au moment de la finalisation.
+        IncompleteUploadError si des morceaux manquent, ValueError si le SHA-256 annoncé diffère
+        (la session est alors conservée pour renvoyer les morceaux). None si la session est inconnue.
+        """
+        status = self.status(upload_id)
+        if status is None:
+            return None
+        if status['missing']:
+            raise IncompleteUploadError(status['missing'])
+
+        consumed = self._advance_hashes(upload_id, status, validate=True)
+        if len(consumed) < status['chunks']:
+            # Morceau réécrit pendant la finalisation
+            raise IncompleteUploadError(list(range(len(consumed), status['chunks'])))
+        with self._lock:
+            hashes, _ = self._hashers.pop(upload_id)
+        digests = {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in hashes.items()}
+        if status['sha256'] and digests['sha256'] != status['sha256']:
+            raise ValueError("SHA-256 du fichier reçu différent de celui annoncé")
+
+        os.replace(self._data_path(upload_id), destination)
+        # Hash connus : les analyses et métadonnées ne relisent pas le fichier pour les obtenir
+        for algorithm, digest in digests.items():
+            remember_hash(destination, digest, algorithm)
+        self.abort(upload_id)
+        return digests
+
+    def abort(self, upload_id):
+        if not self._valid_id(upload_id) or not os.path.isdir(self._session_dir(upload_id)):
+            return False
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+        return True
+
+    def purge(self):
+        """Suppression des sessions sans activité depuis plus de retention_hours"""
+        if not os.path.isdir(self.directory):
+            return 0
+        limit = time.time() - self.retention_hours * 3600
+        removed = 0
+        for upload_id in os.listdir(self.directory):
+            if not self._valid_id(upload_id):
+                continue
+            try:
+                inactive = os.path.getmtime(self._data_path(upload_id)) < limit
+            except OSError:
+                inactive = True
+            if inactive:
+                removed += self.abort(upload_id)
+        return removed
+
+    @staticmethod
+    def _valid_id(upload_id):
+        return len(upload_id) == 32 and all(c in '0123456789abcdef' for c in upload_id)
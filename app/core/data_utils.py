@@ -0,0 +1,45 @@
+"""
+Utilitaires communs sur les jeux de données
+Hash du fichier analysé (mémorisé) et détection de la colonne temporelle
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+TIME_COLUMN_KEYWORDS = ['date', 'time', 'created', 'modified']
+
+# Hash déjà calculés, indexés par (chemin, taille, date de modification)
+_HASH_CACHE = {}
+
+
+def dataset_hash(filepath, algorithm='sha256'):
+    """Hash du contenu du fichier analysé (mémorisé tant que le fichier ne change pas)"""
+    stat = os.stat(filepath)
+    cache_key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns, algorithm)
+    if cache_key in _HASH_CACHE:
+        return _HASH_CACHE[cache_key]
+
+    hash_obj = hashlib.new(algorithm)
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hash_obj.update(chunk)
+    _HASH_CACHE[cache_key] = hash_obj.hexdigest()
+    return _HASH_CACHE[cache_key]
+
+
+def remember_hash(filepath, digest, algorithm='sha256'):
+    """Enregistre un hash déjà calculé (ex: pendant la réception du fichier)"""
+    stat = os.stat(filepath)
+    _HASH_CACHE[(os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns, algorithm)] = digest
+
+
+def find_time_column(frame):
+    """Première colonne temporelle majoritairement valide"""
+    for col in frame.columns:
+        if any(keyword in str(col).lower() for keyword in TIME_COLUMN_KEYWORDS):
+            dates = pd.to_datetime(frame[col], errors='coerce')
+            if dates.notna().mean() > 0.5:
+                return col
+    return None
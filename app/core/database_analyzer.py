@@ -7,7 +7,7 @@ import pandas as pd
 import numpy as np
 import sqlite3
 import os
-import hashlib
+import codecs
 import plotly.express as px
 import plotly.graph_objs as go
 import plotly
@@ -15,32 +15,89 @@ import json
 from sqlalchemy import create_engine
 import logging
 
+from core.data_utils import dataset_hash, find_time_column
+from analyzers.time_buckets import TimeBucketIndex
+from analyzers.visual_summaries import (MAX_ACTIVITY_POINTS, correlation_summary, downsample_series, histogram,
+                                        lttb, sort_times)
+from analyzers.quantile_sketch import ColumnSketches, KLLSketch, count_outliers, merge_counts
+from analyzers.sections import run_sections
+
+# Encodage des CSV : UTF-8 s'il décode tout le fichier, sinon latin-1 (décode n'importe quel octet)
+CSV_ENCODING = 'utf-8'
+CSV_FALLBACK_ENCODING = 'latin-1'
+CSV_SEPARATORS = [',', ';', '\t', '|']
+
+# Lignes lues pour choisir le séparateur, taille des blocs lors de la vérification de l'encodage
+CSV_SAMPLE_ROWS = 100
+DECODE_BLOCK_SIZE = 1024 * 1024
+
+def _figure_json(fig):
+    """JSON d'une figure sans son thème (plusieurs Ko répétés dans chaque figure ; Plotly.js a ses défauts)"""
+    figure = fig.to_plotly_json()
+    figure['layout'].pop('template', None)
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
 class DatabaseAnalyzer:
-    def __init__(self, filepath):
+    # Sections décrivant le fichier (nom, date de modification) et non son contenu : hors cache de résultats
+    FILE_SECTIONS = ('file_info',)
+    
+    def __init__(self, filepath, use_sketches=False, sketch_k=200):
         self.filepath = filepath
         self.filename = os.path.basename(filepath)
         self.file_extension = self.filename.split('.')[-1].lower()
         self.data = None
         self.logger = logging.getLogger(__name__)
+        # Statistiques approximées par sketches KLL (fusionnables, par morceaux)
+        self.use_sketches = use_sketches
+        self.sketch_k = sketch_k
+        self._csv_candidates = None
         
+    def _decodes(self, encoding):
+        """Vrai si tout le fichier se décode avec cet encodage (lecture par blocs)"""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(self.filepath, 'rb') as f:
+                for block in iter(lambda: f.read(DECODE_BLOCK_SIZE), b''):
+                    decoder.decode(block)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return False
+        return True
+    
+    def csv_candidates(self):
+        """Options de lecture CSV (encodage, séparateur) plausibles, les plus probables d'abord
+        
+        L'encodage est vérifié sur le fichier entier, en une seule passe (un caractère accentué en fin
+        de fichier ne doit pas faire échouer la lecture par morceaux) ; le séparateur doit donner
+        plusieurs colonnes sur un échantillon. Détection partagée par load_data et iter_chunks,
+        faite une fois par instance.
+        """
+        if self._csv_candidates is None:
+            encoding = CSV_ENCODING if self._decodes(CSV_ENCODING) else CSV_FALLBACK_ENCODING
+            self._csv_candidates = []
+            for sep in CSV_SEPARATORS:
+                try:
+                    sample = pd.read_csv(self.filepath, encoding=encoding, sep=sep, nrows=CSV_SAMPLE_ROWS)
+                except Exception:
+                    continue
+                if len(sample.columns) > 1:
+                    self._csv_candidates.append({'encoding': encoding, 'sep': sep})
+            if not self._csv_candidates:
+                # Fichier à une seule colonne
+                self._csv_candidates.append({'encoding': encoding, 'sep': CSV_SEPARATORS[0]})
+        return self._csv_candidates
+    
     def load_data(self):
         """Charge les données selon le type de fichier"""
         try:
             if self.file_extension in ['csv']:
-                # Tentative de détection de l'encodage et du séparateur
-                encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-                separators = [',', ';', '\t', '|']
-                
-                for encoding in encodings:
-                    for sep in separators:
-                        try:
-                            self.data = pd.read_csv(self.filepath, encoding=encoding, sep=sep)
-                            if len(self.data.columns) > 1:  # Si plus d'une colonne, c'est probablement bon
-                                break
-                        except:
-                            continue
-                    if self.data is not None and len(self.data.columns) > 1:
+                # Encodage et séparateur détectés une fois, communs avec la lecture par morceaux
+                for options in self.csv_candidates():
+                    try:
+                        self.data = pd.read_csv(self.filepath, **options)
                         break
+                    except Exception:
+                        continue
                         
             elif self.file_extension in ['xlsx', 'xls']:
                 self.data = pd.read_excel(self.filepath)
@@ -62,20 +119,69 @@ class DatabaseAnalyzer:
             self.logger.error(f"Erreur lors du chargement: {str(e)}")
             raise
     
-    def analyze(self):
-        """Analyse de base des données"""
-        if self.data is None:
-            self.load_data()
+    def iter_chunks(self, chunksize=100000):
+        """Parcourt les données par morceaux sans tout charger en mémoire"""
+        if self.data is not None:
+            for start in range(0, len(self.data), chunksize):
+                yield self.data.iloc[start:start + chunksize]
+            return
+        
+        if self.file_extension in ['csv']:
+            options = self.csv_candidates()[0]
             
-        analysis = {
-            'file_info': self.get_file_info(),
-            'data_summary': self.get_data_summary(),
-            'column_analysis': self.get_column_analysis(),
-            'data_quality': self.assess_data_quality(),
-            'statistics': self.get_statistics()
+            for chunk in pd.read_csv(self.filepath, chunksize=chunksize, **options):
+                yield chunk
+                
+        elif self.file_extension in ['db', 'sqlite', 'sql']:
+            conn = sqlite3.connect(self.filepath)
+            try:
+                tables = pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)
+                if not tables.empty:
+                    table_name = tables['name'].iloc[0]
+                    for chunk in pd.read_sql_query(f"SELECT * FROM {table_name};", conn, chunksize=chunksize):
+                        yield chunk
+            finally:
+                conn.close()
+                
+        else:
+            self.load_data()
+            yield from self.iter_chunks(chunksize)
+    
+    def build_column_sketches(self, chunksize=100000):
+        """Construit les sketches de quantiles des colonnes numériques par morceaux"""
+        return ColumnSketches.from_chunks(self.iter_chunks(chunksize), k=self.sketch_k)
+    
+    def stream_outlier_counts(self, chunksize=100000):
+        """Outliers en deux passes : bornes par sketches puis comptage exact"""
+        sketches = self.build_column_sketches(chunksize)
+        bounds = sketches.outlier_bounds()
+        
+        counts = {}
+        for chunk in self.iter_chunks(chunksize):
+            merge_counts(counts, count_outliers(chunk, bounds))
+        
+        return {
+            col: {'bounds': bounds[col], 'counts': counts.get(col, {})}
+            for col in bounds
         }
+    
+    def analyze(self, sections=None, top_k=None, max_examples=None, progress=None):
+        """Analyse de base des données (ou des seules sections demandées)"""
+        if self.data is None:
+            self.load_data()
         
-        return analysis
+        return run_sections(self.section_steps(), sections, {'top_k': top_k, 'max_examples': max_examples},
+                            progress, len(self.data))
+    
+    def section_steps(self):
+        """Sections de l'analyse de base : (nom, méthode, bornes acceptées)"""
+        return [
+            ('file_info', self.get_file_info, {}),
+            ('data_summary', self.get_data_summary, {}),
+            ('column_analysis', self.get_column_analysis, {'top_k': 'top_k'}),
+            ('data_quality', self.assess_data_quality, {}),
+            ('statistics', self.get_statistics, {})
+        ]
     
     def get_file_info(self):
         """Informations sur le fichier"""
@@ -91,12 +197,8 @@ class DatabaseAnalyzer:
         }
     
     def calculate_hash(self, algorithm='md5'):
-        """Calcule le hash du fichier"""
-        hash_obj = hashlib.new(algorithm)
-        with open(self.filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_obj.update(chunk)
-        return hash_obj.hexdigest()
+        """Calcule le hash du fichier (mémorisé tant que le fichier ne change pas)"""
+        return dataset_hash(self.filepath, algorithm)
     
     def get_data_summary(self):
         """Résumé des données"""
@@ -108,10 +210,16 @@ class DatabaseAnalyzer:
             'data_types': self.data.dtypes.astype(str).to_dict()
         }
     
-    def get_column_analysis(self):
+    def get_column_analysis(self, top_k=5):
         """Analyse détaillée des colonnes"""
         analysis = {}
         
+        # Bornes issues des sketches, comptage exact en une passe matricielle
+        sketch_counts = {}
+        if self.use_sketches:
+            bounds = ColumnSketches(k=self.sketch_k).update(self.data).outlier_bounds()
+            sketch_counts = count_outliers(self.data, bounds)
+        
         for col in self.data.columns:
             col_data = self.data[col]
             analysis[col] = {
@@ -130,14 +238,14 @@ class DatabaseAnalyzer:
                     'max': col_data.max(),
                     'mean': round(col_data.mean(), 2) if not col_data.isnull().all() else None,
                     'std': round(col_data.std(), 2) if not col_data.isnull().all() else None,
-                    'outliers_count': self.detect_outliers(col_data)
+                    'outliers_count': sketch_counts[col]['iqr'] if col in sketch_counts else self.detect_outliers(col_data)
                 })
             elif pd.api.types.is_string_dtype(col_data) or col_data.dtype == 'object':
                 analysis[col].update({
                     'avg_length': round(col_data.astype(str).str.len().mean(), 2),
                     'min_length': col_data.astype(str).str.len().min(),
                     'max_length': col_data.astype(str).str.len().max(),
-                    'most_common': col_data.value_counts().head(5).to_dict()
+                    'most_common': col_data.value_counts().head(top_k).to_dict()
                 })
         
         return analysis
@@ -152,6 +260,12 @@ class DatabaseAnalyzer:
             upper_bound = Q3 + 1.5 * IQR
             outliers = series[(series < lower_bound) | (series > upper_bound)]
             return len(outliers)
+        elif method == 'sketch':
+            # Bornes IQR approximées par un sketch KLL
+            sketch = KLLSketch(k=self.sketch_k).update(series.to_numpy(dtype=np.float64, na_value=np.nan))
+            Q1, Q3 = sketch.quantiles([0.25, 0.75])
+            IQR = Q3 - Q1
+            return int(((series < Q1 - 1.5 * IQR) | (series > Q3 + 1.5 * IQR)).sum())
         return 0
     
     def assess_data_quality(self):
@@ -203,7 +317,11 @@ class DatabaseAnalyzer:
         return {'numeric_summary': {}, 'correlations': {}}
     
     def generate_visualizations(self):
-        """Génération des visualisations"""
+        """Génération des visualisations
+
+        Les figures ne contiennent que des données agrégées (intervalles d'histogramme, matrice
+        de corrélation bornée, séries réduites par LTTB) : leur taille ne dépend pas du nombre de lignes.
+        """
         if self.data is None:
             self.load_data()
         
@@ -230,28 +348,77 @@ class DatabaseAnalyzer:
             )
             visualizations['data_types'] = json.dumps(fig_types, cls=plotly.utils.PlotlyJSONEncoder)
             
-            # Graphique 3: Corrélations pour les colonnes numériques
+            # Graphique 3: Corrélations (colonnes bornées, regroupées par clustering)
             numeric_cols = self.data.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) > 1:
-                corr_matrix = self.data[numeric_cols].corr()
-                fig_corr = px.imshow(
-                    corr_matrix,
-                    title="Matrice de corrélation",
-                    color_continuous_scale='RdBu_r',
-                    aspect="auto"
-                )
+            summary = correlation_summary(self.data[numeric_cols]) if len(numeric_cols) > 1 else None
+            if summary is not None:
+                title = "Matrice de corrélation"
+                if len(summary['columns']) < summary['total_columns']:
+                    title += f" ({len(summary['columns'])} colonnes sur {summary['total_columns']})"
+                if summary['sampled']:
+                    title += " - échantillon"
+                fig_corr = go.Figure(go.Heatmap(
+                    z=np.round(summary['matrix'], 3),
+                    x=[str(col) for col in summary['columns']],
+                    y=[str(col) for col in summary['columns']],
+                    colorscale='RdBu_r',
+                    zmin=-1,
+                    zmax=1
+                ))
+                fig_corr.update_layout(title=title)
                 visualizations['correlations'] = json.dumps(fig_corr, cls=plotly.utils.PlotlyJSONEncoder)
             
-            # Graphique 4: Histogrammes des colonnes numériques (première colonne)
-            if len(numeric_cols) > 0:
-                first_numeric_col = numeric_cols[0]
-                fig_hist = px.histogram(
-                    self.data,
-                    x=first_numeric_col,
-                    title=f"Distribution de {first_numeric_col}",
-                    nbins=30
-                )
-                visualizations['first_numeric_distribution'] = json.dumps(fig_hist, cls=plotly.utils.PlotlyJSONEncoder)
+            # Graphique 4: Histogrammes pré-calculés de chaque colonne numérique
+            histograms = {}
+            for col in numeric_cols:
+                bins = histogram(self.data[col].to_numpy(dtype=np.float64, na_value=np.nan))
+                if bins is None:
+                    continue
+                edges = bins['edges']
+                fig_hist = go.Figure(go.Bar(
+                    x=(edges[:-1] + edges[1:]) / 2,
+                    y=bins['counts'],
+                    width=np.diff(edges),
+                    customdata=np.column_stack([edges[:-1], edges[1:]]),
+                    hovertemplate='[%{customdata[0]:.4g} ; %{customdata[1]:.4g}[ : %{y}<extra></extra>'
+                ))
+                fig_hist.update_layout(title=f"Distribution de {col}", xaxis_title=str(col), yaxis_title='count',
+                                       bargap=0)
+                histograms[str(col)] = _figure_json(fig_hist)
+            if histograms:
+                visualizations['histograms'] = histograms
+                visualizations['first_numeric_distribution'] = next(iter(histograms.values()))
+            
+            # Graphique 5: Séries temporelles réduites par LTTB (activité et colonnes numériques)
+            time_col = find_time_column(self.data)
+            if time_col is not None:
+                times, rows = sort_times(self.data[time_col])
+                buckets = TimeBucketIndex.from_times(times)
+                resolution = buckets.resolutions()[0]
+                counts = buckets.counts(resolution)
+                keep = lttb(np.arange(len(counts)), counts, MAX_ACTIVITY_POINTS)
+                fig_activity = go.Figure(go.Scatter(
+                    x=[buckets.bucket_start(resolution, position).isoformat() for position in keep],
+                    y=counts[keep],
+                    mode='lines'
+                ))
+                fig_activity.update_layout(title=f"Activité par {resolution} ({time_col})", yaxis_title='événements')
+                visualizations['activity'] = json.dumps(fig_activity, cls=plotly.utils.PlotlyJSONEncoder)
+                
+                series = {}
+                for col in numeric_cols:
+                    values = self.data[col].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+                    reduced = downsample_series(times, values)
+                    if reduced['points'] == 0:
+                        continue
+                    fig_series = go.Figure(go.Scattergl(x=reduced['times'], y=reduced['values'], mode='lines'))
+                    title = f"{col} selon {time_col}"
+                    if len(reduced['values']) < reduced['points']:
+                        title += f" ({len(reduced['values'])} points sur {reduced['points']})"
+                    fig_series.update_layout(title=title)
+                    series[str(col)] = _figure_json(fig_series)
+                if series:
+                    visualizations['time_series'] = series
             
         except Exception as e:
             self.logger.error(f"Erreur génération visualisations: {str(e)}")
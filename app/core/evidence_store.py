@@ -0,0 +1,318 @@
+"""
+Stockage des preuves adressé par contenu
+Fichiers indexés par SHA-256 : un envoi identique devient une référence au fichier existant, quota disque avec éviction LRU hors preuves épinglées
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+from core.data_utils import remember_hash
+from core.chunked_upload import HASH_ALGORITHMS, IO_BLOCK_SIZE
+
+# Taille maximale des preuves conservées (hors preuves épinglées, jamais évincées)
+DEFAULT_EVIDENCE_BYTES = 50 * 1024 ** 3
+
+
+class EvidenceStore:
+    """Contenus sous <directory>/<sha[:2]>/<sha>, exposés dans reference_dir sous le nom de chaque envoi
+
+    Chaque nom de fichier envoyé est un lien physique vers le contenu : les routes d'analyse
+    continuent d'utiliser le nom, et le cache de résultats (indexé par SHA-256) sert
+    immédiatement les analyses d'un contenu déjà reçu.
+    """
+
+    def __init__(self, directory, reference_dir, max_bytes=DEFAULT_EVIDENCE_BYTES, on_evict=None):
+        self.directory = directory
+        self.reference_dir = reference_dir
+        self.max_bytes = max_bytes
+        # Appelé avec le SHA-256 de chaque contenu évincé (ex: invalidation du cache de résultats)
+        self.on_evict = on_evict
+        self.logger = logging.getLogger(__name__)
+        self._initialized = False
+
+    def _connect(self):
+        os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=30)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    pinned INTEGER NOT NULL DEFAULT 0,
+                    case_id TEXT
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS refs (
+                    filename TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            connection.execute('CREATE INDEX IF NOT EXISTS blobs_access ON blobs (pinned, last_access)')
+            connection.execute('CREATE INDEX IF NOT EXISTS refs_blob ON refs (sha256)')
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    def blob_path(self, sha256):
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def staging_path(self):
+        """Fichier temporaire sur le même disque que les contenus (déplacement sans copie)"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        os.close(fd)
+        return path
+
+    def write_stream(self, stream):
+        """Écrit un flux dans un fichier temporaire en calculant ses hash ; renvoie (chemin, hash)"""
+        path = self.staging_path()
+        hashes = {algorithm: hashlib.new(algorithm) for algorithm in HASH_ALGORITHMS}
+        try:
+            with open(path, 'wb') as f:
+                for block in iter(lambda: stream.read(IO_BLOCK_SIZE), b''):
+                    for hash_obj in hashes.values():
+                        hash_obj.update(block)
+                    f.write(block)
+        except Exception:
+            os.remove(path)
+            raise
+        return path, {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in hashes.items()}
+
+    def ingest(self, source, filename, digests=None, verified=False):
+        """Enregistre le fichier source (déplacé ou supprimé) sous le nom filename
+
+        Le SHA-256 sert d'adresse : les hash ne sont repris tels quels que si verified est vrai,
+        c'est-à-dire calculés sur les octets mêmes de source (write_stream, finalisation d'un upload
+        par morceaux). Sinon ils sont recalculés et ValueError est levée si un hash annoncé diffère.
+        Contenu déjà présent : le fichier source est supprimé et filename devient une nouvelle
+        référence au contenu existant. Renvoie le SHA-256, la taille, les noms de référence
+        antérieurs et si le contenu était déjà connu.
+        """
+        if not verified or 'sha256' not in (digests or {}):
+            computed = self._digests(source)
+            mismatched = [algorithm for algorithm, digest in (digests or {}).items()
+                          if computed.get(algorithm, digest) != digest]
+            if mismatched:
+                os.remove(source)
+                raise ValueError(f"Hash annoncé(s) différent(s) du contenu reçu: {', '.join(mismatched)}")
+            digests = computed
+        digests = dict(digests)
+        sha256 = digests['sha256']
+        stored = self.add_reference(sha256, filename)
+        if stored is not None:
+            os.remove(source)
+        else:
+            size = os.path.getsize(source)
+            blob = self.blob_path(sha256)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(source, blob)
+            self._link(blob, os.path.join(self.reference_dir, filename))
+            now = time.time()
+            connection = self._connect()
+            try:
+                connection.execute(
+                    'INSERT INTO blobs (sha256, size, created_at, last_access) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access',
+                    (sha256, size, now, now)
+                )
+                connection.execute('INSERT OR REPLACE INTO refs (filename, sha256, created_at) VALUES (?, ?, ?)',
+                                   (filename, sha256, now))
+                connection.commit()
+                self._evict(connection, protect=sha256)
+            finally:
+                connection.close()
+            stored = {'sha256': sha256, 'size': size, 'duplicate': False, 'previous_filenames': []}
+
+        # Hash connus : analyses et métadonnées servies sans relire le fichier
+        for algorithm, digest in digests.items():
+            remember_hash(os.path.join(self.reference_dir, filename), digest, algorithm)
+        return stored
+
+    def add_reference(self, sha256, filename):
+        """Nouveau nom pour un contenu déjà stocké, sans le renvoyer ; None si le contenu est inconnu"""
+        blob = self.blob_path(sha256)
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT size FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()
+            if row is None or not os.path.exists(blob):
+                return None
+            previous = [name for (name,) in connection.execute(
+                'SELECT filename FROM refs WHERE sha256 = ? ORDER BY created_at', (sha256,)
+            )]
+            reference = os.path.join(self.reference_dir, filename)
+            self._link(blob, reference)
+            now = time.time()
+            connection.execute('UPDATE blobs SET last_access = ? WHERE sha256 = ?', (now, sha256))
+            connection.execute('INSERT OR REPLACE INTO refs (filename, sha256, created_at) VALUES (?, ?, ?)',
+                               (filename, sha256, now))
+            connection.commit()
+        finally:
+            connection.close()
+        remember_hash(reference, sha256, 'sha256')
+        return {'sha256': sha256, 'size': row[0], 'duplicate': True, 'previous_filenames': previous}
+
+    @staticmethod
+    def _digests(path):
+        hashes = {algorithm: hashlib.new(algorithm) for algorithm in HASH_ALGORITHMS}
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(IO_BLOCK_SIZE), b''):
+                for hash_obj in hashes.values():
+                    hash_obj.update(block)
+        return {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in hashes.items()}
+
+    @staticmethod
+    def _link(blob, reference):
+        if os.path.lexists(reference):
+            os.remove(reference)
+        try:
+            os.link(blob, reference)
+        except OSError:
+            # Système de fichiers sans liens physiques
+            os.symlink(os.path.abspath(blob), reference)
+
+    def resolve(self, filename):
+        """Contenu référencé par un nom de fichier envoyé, None si inconnu"""
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT b.sha256, b.size, b.pinned, b.case_id FROM refs r JOIN blobs b ON b.sha256 = r.sha256 '
+                'WHERE r.filename = ?', (filename,)
+            ).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        return {'sha256': row[0], 'size': row[1], 'pinned': bool(row[2]), 'case_id': row[3]}
+
+    def touch(self, sha256):
+        """Date d'accès LRU mise à jour (consultation de l'analyse)"""
+        connection = self._connect()
+        try:
+            connection.execute('UPDATE blobs SET last_access = ? WHERE sha256 = ?', (time.time(), sha256))
+            connection.commit()
+        finally:
+            connection.close()
+
+    def pin(self, sha256, case_id=None):
+        """Épingle une preuve (rattachée à un dossier) : elle n'est jamais évincée ; False si inconnue"""
+        return self._set_pin(sha256, 1, case_id)
+
+    def unpin(self, sha256):
+        return self._set_pin(sha256, 0, None)
+
+    def _set_pin(self, sha256, pinned, case_id):
+        connection = self._connect()
+        try:
+            updated = connection.execute('UPDATE blobs SET pinned = ?, case_id = ? WHERE sha256 = ?',
+                                         (pinned, case_id, sha256)).rowcount
+            connection.commit()
+            if not pinned:
+                self._evict(connection)
+        finally:
+            connection.close()
+        return bool(updated)
+
+    def _remove(self, connection, sha256):
+        for (filename,) in connection.execute('SELECT filename FROM refs WHERE sha256 = ?', (sha256,)).fetchall():
+            try:
+                os.remove(os.path.join(self.reference_dir, filename))
+            except OSError:
+                pass
+        try:
+            os.remove(self.blob_path(sha256))
+        except OSError:
+            pass
+        connection.execute('DELETE FROM refs WHERE sha256 = ?', (sha256,))
+        connection.execute('DELETE FROM blobs WHERE sha256 = ?', (sha256,))
+        connection.commit()
+        if self.on_evict is not None:
+            try:
+                self.on_evict(sha256)
+            except Exception as e:
+                self.logger.warning(f"Nettoyage après éviction impossible ({sha256}): {str(e)}")
+
+    def _evict(self, connection, protect=None):
+        """Éviction des preuves non épinglées les moins récemment consultées jusqu'à repasser sous le quota"""
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        candidates = connection.execute(
+            'SELECT sha256, size FROM blobs WHERE pinned = 0 AND sha256 != ? ORDER BY last_access ASC',
+            (protect or '',)
+        ).fetchall()
+        evicted = 0
+        for sha256, size in candidates:
+            if total <= self.max_bytes:
+                break
+            self._remove(connection, sha256)
+            total -= size
+            evicted += 1
+        if total > self.max_bytes:
+            self.logger.warning(f"Quota des preuves dépassé ({total} octets) : preuves épinglées ou en cours")
+        if evicted:
+            self.logger.info(f"Stockage des preuves : {evicted} contenu(s) évincé(s)")
+        return evicted
+
+    def delete(self, sha256):
+        """Suppression explicite d'un contenu et de ses références (même épinglé) ; False si inconnu"""
+        connection = self._connect()
+        try:
+            if connection.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (sha256,)).fetchone() is None:
+                return False
+            self._remove(connection, sha256)
+            return True
+        finally:
+            connection.close()
+
+    def list_evidence(self, limit=100):
+        """Contenus les plus récemment consultés d'abord, avec leurs noms de référence"""
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                'SELECT sha256, size, created_at, last_access, pinned, case_id FROM blobs '
+                'ORDER BY last_access DESC LIMIT ?', (limit,)
+            ).fetchall()
+            evidence = []
+            for sha256, size, created_at, last_access, pinned, case_id in rows:
+                filenames = [name for (name,) in connection.execute(
+                    'SELECT filename FROM refs WHERE sha256 = ? ORDER BY created_at', (sha256,)
+                )]
+                evidence.append({
+                    'sha256': sha256,
+                    'size_bytes': size,
+                    'created_at': created_at,
+                    'last_access': last_access,
+                    'pinned': bool(pinned),
+                    'case_id': case_id,
+                    'filenames': filenames
+                })
+        finally:
+            connection.close()
+        return evidence
+
+    def stats(self):
+        connection = self._connect()
+        try:
+            blobs, size, pinned_size = connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(CASE WHEN pinned THEN size ELSE 0 END), 0) '
+                'FROM blobs'
+            ).fetchone()
+            references = connection.execute('SELECT COUNT(*) FROM refs').fetchone()[0]
+        finally:
+            connection.close()
+        return {
+            'blobs': blobs,
+            'references': references,
+            'size_bytes': size,
+            'pinned_bytes': pinned_size,
+            'max_bytes': self.max_bytes
+        }
@@ -7,11 +7,20 @@ import pandas as pd
 import numpy as np
 import os
 import datetime
-import hashlib
 import re
 import json
 import logging
 from collections import Counter
+from core.data_utils import dataset_hash, find_time_column
+from analyzers.concurrent_access import CONCURRENT_WINDOW_MINUTES, MIN_DISTINCT_VALUES, concurrent_access
+from analyzers.entity_baselines import find_entity_column, find_ip_column
+from analyzers.entity_graph import MAX_ATTRIBUTE_DEGREE, find_attribute_columns, link_accounts
+from analyzers.model_store import ModelStore, model_key
+from analyzers.sections import run_sections
+from analyzers.sessions import SESSION_GAP_MINUTES, SessionTable, find_action_column, find_amount_column
+from analyzers.time_buckets import TimeBucketIndex
+from analyzers.timeline import (build_timeline, describe_events, find_timestamp_columns, page_timeline,
+                                timeline_summary)
 try:
     import magic
     HAS_MAGIC = True
@@ -19,11 +28,18 @@ except ImportError:
     HAS_MAGIC = False
 
 class ForensicAnalyzer:
-    def __init__(self, filepath):
+    # Sections décrivant le fichier (chemin, dates, permissions) et non son contenu : hors cache de résultats
+    FILE_SECTIONS = ('file_metadata',)
+    
+    def __init__(self, filepath, model_dir=None):
         self.filepath = filepath
         self.filename = os.path.basename(filepath)
         self.data = None
         self.logger = logging.getLogger(__name__)
+        # Sessions reconstruites persistées à côté du fichier analysé
+        self.model_store = ModelStore(
+            model_dir or os.path.join(os.path.dirname(os.path.abspath(filepath)), 'models')
+        )
         
     def load_data(self):
         """Charge les données pour l'analyse forensique"""
@@ -61,23 +77,29 @@ class ForensicAnalyzer:
                 self.logger.error(f"Erreur chargement données forensiques: {str(e)}")
                 raise
     
-    def full_analysis(self):
-        """Analyse forensique complète"""
+    def full_analysis(self, sections=None, top_k=None, max_examples=None, progress=None):
+        """Analyse forensique complète (ou des seules sections demandées)"""
         if self.data is None:
             self.load_data()
         
-        analysis = {
-            'file_metadata': self.get_file_metadata(),
-            'data_integrity': self.check_data_integrity(),
-            'suspicious_patterns': self.detect_suspicious_patterns(),
-            'timestamp_analysis': self.analyze_timestamps(),
-            'user_activity': self.analyze_user_activity(),
-            'security_indicators': self.detect_security_indicators(),
-            'data_manipulation': self.detect_data_manipulation(),
-            'forensic_timeline': self.create_forensic_timeline()
-        }
-        
-        return analysis
+        return run_sections(self.section_steps(), sections, {'top_k': top_k, 'max_examples': max_examples},
+                            progress, len(self.data))
+    
+    def section_steps(self):
+        """Sections de l'analyse forensique : (nom, méthode, bornes acceptées)"""
+        return [
+            ('file_metadata', self.get_file_metadata, {}),
+            ('data_integrity', self.check_data_integrity, {}),
+            ('suspicious_patterns', self.detect_suspicious_patterns, {}),
+            ('timestamp_analysis', self.analyze_timestamps, {}),
+            ('user_activity', self.analyze_user_activity, {'top_k': 'top_k'}),
+            ('sessions', self.session_summary, {}),
+            ('security_indicators', self.detect_security_indicators, {}),
+            ('concurrent_access', self.detect_concurrent_access, {'max_examples': 'max_examples'}),
+            ('linked_accounts', self.link_accounts, {'top_k': 'top_k'}),
+            ('data_manipulation', self.detect_data_manipulation, {}),
+            ('forensic_timeline', self.create_forensic_timeline, {'max_examples': 'sample_events'})
+        ]
     
     def get_file_metadata(self):
         """Métadonnées détaillées du fichier"""
@@ -109,12 +131,8 @@ class ForensicAnalyzer:
         return metadata
     
     def _calculate_hash(self, algorithm):
-        """Calcule le hash du fichier"""
-        hash_obj = hashlib.new(algorithm)
-        with open(self.filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_obj.update(chunk)
-        return hash_obj.hexdigest()
+        """Calcule le hash du fichier (mémorisé tant que le fichier ne change pas)"""
+        return dataset_hash(self.filepath, algorithm)
     
     def check_data_integrity(self):
         """Vérification de l'intégrité des données"""
@@ -274,13 +292,18 @@ class ForensicAnalyzer:
                     if old_dates > 0:
                         anomalies.append(f"{old_dates} dates avant 1900")
                     
-                    # Pics d'activité suspects
-                    date_counts = valid_dates.value_counts()
-                    if len(date_counts) > 0:
-                        max_count = date_counts.max()
-                        avg_count = date_counts.mean()
+                    # Pics d'activité suspects (comptages par jour et par minute indexés)
+                    index = TimeBucketIndex.from_times(valid_dates.to_numpy(dtype='datetime64[ns]'))
+                    for resolution, label in [('day', 'le même jour'), ('minute', 'la même minute')]:
+                        if resolution not in index.resolutions():
+                            continue
+                        counts = index.counts(resolution)
+                        active_counts = counts[counts > 0]
+                        max_count = active_counts.max()
+                        avg_count = active_counts.mean()
                         if max_count > avg_count * 10:  # Plus de 10x la moyenne
-                            anomalies.append(f"Pic d'activité suspect: {max_count} entrées le même jour")
+                            peak = index.bucket_start(resolution, np.argmax(counts)).isoformat()
+                            anomalies.append(f"Pic d'activité suspect: {max_count} entrées {label} ({peak})")
                     
                     analysis['anomalies'] = anomalies
                     timestamp_analysis[col] = analysis
@@ -290,7 +313,7 @@ class ForensicAnalyzer:
         
         return timestamp_analysis
     
-    def analyze_user_activity(self):
+    def analyze_user_activity(self, top_k=10):
         """Analyse de l'activité utilisateur"""
         user_analysis = {}
         
@@ -304,17 +327,18 @@ class ForensicAnalyzer:
             user_data = self.data[col].dropna()
             
             if len(user_data) > 0:
+                # Comptage par utilisateur calculé une fois
+                user_counts = user_data.value_counts()
                 analysis = {
-                    'unique_users': user_data.nunique(),
+                    'unique_users': len(user_counts),
                     'total_activities': len(user_data),
-                    'top_users': user_data.value_counts().head(10).to_dict()
+                    'top_users': user_counts.head(top_k).to_dict()
                 }
                 
                 # Détection d'activité suspecte
                 suspicious_activity = []
                 
                 # Utilisateurs avec activité anormalement élevée
-                user_counts = user_data.value_counts()
                 if len(user_counts) > 0:
                     threshold = user_counts.quantile(0.95)
                     high_activity_users = user_counts[user_counts > threshold]
@@ -332,6 +356,89 @@ class ForensicAnalyzer:
         
         return user_analysis
     
+    def session_columns(self, user_column=None, time_column=None):
+        """Colonnes utilisées pour les sessions (détectées sur les données, mémorisées par fichier)
+        
+        Une fois résolues, elles sont relues sans recharger le fichier : une page de sessions déjà
+        persistées ne demande aucun chargement. ValueError si une colonne demandée n'existe pas.
+        """
+        requested = {'user_column': user_column, 'time_column': time_column}
+        key = model_key(dataset_hash(self.filepath), 'session_columns', requested)
+        columns = self.model_store.load(key)
+        if columns is not None:
+            return columns
+        
+        if self.data is None:
+            self.load_data()
+        unknown = [col for col in (user_column, time_column) if col is not None and col not in self.data.columns]
+        if unknown:
+            raise ValueError(f"Colonne(s) inconnue(s): {', '.join(map(str, unknown))}")
+        
+        columns = {
+            'user_column': user_column or find_entity_column(self.data),
+            'time_column': time_column or find_time_column(self.data),
+            'action_column': find_action_column(self.data),
+            'ip_column': find_ip_column(self.data),
+            'amount_column': find_amount_column(self.data)
+        }
+        try:
+            self.model_store.save(key, columns)
+        except Exception as e:
+            self.logger.warning(f"Colonnes des sessions non persistées: {str(e)}")
+        return columns
+    
+    def reconstruct_sessions(self, gap_minutes=SESSION_GAP_MINUTES, user_column=None, time_column=None):
+        """Sessions par utilisateur (tri unique, coupure sur inactivité), réutilisées entre les pages"""
+        columns = self.session_columns(user_column, time_column)
+        if columns['user_column'] is None or columns['time_column'] is None:
+            return None
+        
+        key = model_key(dataset_hash(self.filepath), 'sessions', {**columns, 'gap_minutes': float(gap_minutes)})
+        
+        sessions = self.model_store.load(key)
+        if sessions is None:
+            # Chargement seulement si les sessions ne sont pas encore persistées
+            if self.data is None:
+                self.load_data()
+            sessions = SessionTable.build(self.data, gap_minutes=gap_minutes, **columns)
+            try:
+                self.model_store.save(key, sessions)
+            except Exception as e:
+                self.logger.warning(f"Sessions non persistées: {str(e)}")
+        
+        return sessions
+    
+    def session_summary(self, gap_minutes=SESSION_GAP_MINUTES, user_column=None, time_column=None):
+        """Résumé des sessions reconstruites"""
+        try:
+            sessions = self.reconstruct_sessions(gap_minutes, user_column, time_column)
+            if sessions is None:
+                return {'error': 'Colonnes utilisateur et horodatage requises'}
+            
+            summary = sessions.summary()
+            summary.update({
+                'user_column': sessions.user_column,
+                'time_column': sessions.time_column,
+                'action_column': sessions.action_column,
+                'ip_column': sessions.ip_column,
+                'amount_column': sessions.amount_column
+            })
+            return summary
+        except Exception as e:
+            self.logger.error(f"Erreur reconstruction sessions: {str(e)}")
+            return {'error': str(e)}
+    
+    def get_sessions(self, page=1, per_page=50, gap_minutes=SESSION_GAP_MINUTES, user=None,
+                     sort='start', descending=False, user_column=None, time_column=None):
+        """Page de sessions détaillées (durée, séquence d'actions, IP, montants)"""
+        sessions = self.reconstruct_sessions(gap_minutes, user_column, time_column)
+        if sessions is None:
+            return {'error': 'Colonnes utilisateur et horodatage requises'}
+        
+        result = sessions.page(page, per_page, user=user, sort=sort, descending=descending)
+        result['summary'] = self.session_summary(gap_minutes, user_column, time_column) if page == 1 else None
+        return result
+    
     def detect_security_indicators(self):
         """Détection d'indicateurs de sécurité"""
         security_indicators = []
@@ -374,6 +481,54 @@ class ForensicAnalyzer:
         
         return security_indicators
     
+    def detect_concurrent_access(self, window_minutes=CONCURRENT_WINDOW_MINUTES,
+                                 min_distinct=MIN_DISTINCT_VALUES, max_examples=20):
+        """Même compte vu depuis plusieurs IP (ou même IP pour plusieurs comptes) en quelques minutes"""
+        if self.data is None:
+            self.load_data()
+        
+        user_column = find_entity_column(self.data)
+        ip_column = find_ip_column(self.data)
+        time_column = find_time_column(self.data)
+        if user_column is None or ip_column is None or time_column is None:
+            return {'error': 'Colonnes utilisateur, IP et horodatage requises'}
+        
+        try:
+            return {
+                # Identifiants partagés / prise de contrôle de compte
+                'ips_per_user': concurrent_access(
+                    self.data, user_column, ip_column, time_column,
+                    window_minutes, min_distinct, max_examples
+                ),
+                # IP unique utilisée pour de nombreux comptes (bourrage d'identifiants)
+                'users_per_ip': concurrent_access(
+                    self.data, ip_column, user_column, time_column,
+                    window_minutes, min_distinct, max_examples
+                )
+            }
+        except Exception as e:
+            self.logger.error(f"Erreur détection accès concurrents: {str(e)}")
+            return {'error': str(e)}
+    
+    def link_accounts(self, max_attribute_degree=MAX_ATTRIBUTE_DEGREE, top_k=20):
+        """Groupes de comptes reliés par IP, domaine e-mail ou appareil partagés"""
+        if self.data is None:
+            self.load_data()
+        
+        account_column = find_entity_column(self.data)
+        if account_column is None:
+            return {'error': 'Aucune colonne de compte détectée'}
+        
+        attribute_columns = find_attribute_columns(self.data, account_column, find_ip_column(self.data))
+        if not attribute_columns:
+            return {'error': 'Aucun attribut partagé (IP, e-mail, appareil) détecté'}
+        
+        try:
+            return link_accounts(self.data, account_column, attribute_columns, max_attribute_degree, top_k)
+        except Exception as e:
+            self.logger.error(f"Erreur liaison des comptes: {str(e)}")
+            return {'error': str(e)}
+    
     def detect_data_manipulation(self):
         """Détection de manipulation de données"""
         manipulation_indicators = []
@@ -414,7 +569,7 @@ class ForensicAnalyzer:
             'indicators': manipulation_indicators
         }
     
-    def create_forensic_timeline(self):
+    def create_forensic_timeline(self, sample_events=10):
         """Création d'une timeline forensique"""
         timeline_events = []
         
@@ -438,26 +593,46 @@ class ForensicAnalyzer:
             }
         ])
         
-        # Événements basés sur les données
-        date_columns = [col for col in self.data.columns 
-                       if any(keyword in col.lower() for keyword in ['date', 'time', 'created'])]
-        
-        for col in date_columns[:1]:  # Prendre seulement la première colonne de date
-            try:
-                dates = pd.to_datetime(self.data[col], errors='coerce').dropna()
-                if len(dates) > 0:
-                    # Ajouter quelques événements représentatifs
-                    sample_dates = dates.sample(min(10, len(dates))).sort_values()
-                    for date in sample_dates:
-                        timeline_events.append({
-                            'timestamp': date.isoformat(),
-                            'event': 'data_entry',
-                            'description': f"Entrée de données dans {col}"
-                        })
-            except:
-                continue
+        # Événements basés sur les données : points régulièrement espacés de la timeline
+        # complète (premier et dernier inclus), déterministes d'une exécution à l'autre
+        try:
+            _, timeline = self.load_timeline()
+            total = len(timeline['times'])
+            if total > 0:
+                positions = np.unique(np.linspace(0, total - 1, min(sample_events, total)).astype(np.int64))
+                timeline_events.extend(describe_events(timeline, positions))
+        except Exception as e:
+            self.logger.error(f"Erreur construction timeline: {str(e)}")
         
         # Trier par timestamp
         timeline_events.sort(key=lambda x: x['timestamp'])
         
         return timeline_events
+    
+    def load_timeline(self):
+        """Timeline persistée du jeu de données (relue en mmap), construite au premier appel"""
+        key = model_key(dataset_hash(self.filepath), 'timeline', {'version': 1})
+        timeline = self.model_store.load(key, mmap_mode='r')
+        if timeline is not None:
+            return key, timeline
+        
+        if self.data is None:
+            self.load_data()
+        
+        context_columns = [
+            col for col in [find_entity_column(self.data), find_action_column(self.data)] if col is not None
+        ]
+        timeline = build_timeline(self.data, find_timestamp_columns(self.data), context_columns)
+        try:
+            self.model_store.save(key, timeline)
+        except Exception as e:
+            self.logger.warning(f"Timeline non persistée: {str(e)}")
+        return key, timeline
+    
+    def get_timeline(self, cursor=None, limit=100, since=None, until=None, event_type=None):
+        """Page de la timeline complète, filtrable par période et par type d'événement"""
+        key, timeline = self.load_timeline()
+        page = page_timeline(timeline, key, cursor, limit, since, until, event_type)
+        if cursor is None:
+            page['summary'] = timeline_summary(timeline)
+        return page
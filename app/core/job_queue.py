@@ -0,0 +1,258 @@
+"""
+File de tâches d'analyse en arrière-plan
+Pool de processus local borné ; état, avancement et résultat de chaque tâche dans des fichiers JSON
+"""
+
+import datetime
+import logging
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from core.serialization import dumps, loads
+
+# Nombre de processus d'analyse et de tâches en attente ou en cours au plus
+MAX_WORKERS = 2
+MAX_PENDING_JOBS = 16
+
+# Paramètres transmis à l'analyse complète (sélection de sections et bornes)
+ANALYSIS_OPTIONS = ('sections', 'top_k', 'max_examples')
+
+# Tâches terminées conservées avant purge
+JOB_RETENTION_HOURS = 24
+
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+
+
+def _run_basic(filepath, params):
+    from core.database_analyzer import DatabaseAnalyzer
+    return DatabaseAnalyzer(filepath), 'analyze'
+
+
+def _run_forensic(filepath, params):
+    from core.forensic_analyzer import ForensicAnalyzer
+    return ForensicAnalyzer(filepath, model_dir=params.get('model_dir')), 'full_analysis'
+
+
+def _run_patterns(filepath, params):
+    from analyzers.pattern_detector import PatternDetector
+    return PatternDetector(filepath), 'detect_patterns'
+
+
+def _run_anomalies(filepath, params):
+    from analyzers.anomaly_detector import AnomalyDetector
+    detector = AnomalyDetector(filepath, model_dir=params.get('model_dir'),
+                               hashed_features=bool(params.get('hashed', False)))
+    return detector, 'detect_anomalies'
+
+
+# Type de tâche -> analyseur et méthode d'analyse complète (importés dans le processus de travail)
+JOB_TYPES = {
+    'basic': _run_basic,
+    'forensic': _run_forensic,
+    'patterns': _run_patterns,
+    'anomalies': _run_anomalies
+}
+
+
+class QueueFullError(RuntimeError):
+    """Trop de tâches en attente ou en cours"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+
+def _write_json(path, payload):
+    """Écriture atomique : fichier temporaire puis renommage (lecture concurrente sans état partiel)"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps(payload))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _status_path(directory, job_id):
+    return os.path.join(directory, f"{job_id}.json")
+
+
+def _result_path(directory, job_id):
+    return os.path.join(directory, f"{job_id}.result.json")
+
+
+def _read_status(directory, job_id):
+    try:
+        with open(_status_path(directory, job_id), 'rb') as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _update_status(directory, job_id, **changes):
+    status = _read_status(directory, job_id) or {'job_id': job_id}
+    status.update(changes)
+    _write_json(_status_path(directory, job_id), status)
+    return status
+
+
+def run_job(directory, job_id, job_type, filepath, params):
+    """Exécution d'une tâche dans un processus du pool ; l'avancement est publié à chaque détecteur"""
+    started = time.time()
+    _update_status(directory, job_id, state='running', started_at=_now(), pid=os.getpid())
+
+    def progress(stage, step, steps, rows):
+        _update_status(directory, job_id, progress={
+            'stage': stage,
+            'step': step,
+            'steps': steps,
+            'percent': round(100.0 * step / steps, 1) if steps else None,
+            'rows': rows
+        })
+
+    try:
+        analyzer, method = JOB_TYPES[job_type](filepath, params)
+        options = {name: params[name] for name in ANALYSIS_OPTIONS if params.get(name) is not None}
+        result = getattr(analyzer, method)(progress=progress, **options)
+        _write_json(_result_path(directory, job_id), result)
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Erreur tâche {job_id}: {str(e)}")
+        _update_status(directory, job_id, state='failed', error=str(e), finished_at=_now(),
+                       duration_seconds=round(time.time() - started, 3))
+        return
+
+    status = _read_status(directory, job_id) or {}
+    final = dict(status.get('progress') or {})
+    final.update({'stage': 'done', 'step': final.get('steps'), 'percent': 100.0})
+    _update_status(directory, job_id, state='done', progress=final, finished_at=_now(),
+                   duration_seconds=round(time.time() - started, 3))
+
+
+class JobQueue:
+    """Soumission et suivi des tâches ; l'état étant sur disque, tout processus web peut le consulter"""
+
+    def __init__(self, directory, max_workers=MAX_WORKERS, max_pending=MAX_PENDING_JOBS,
+                 retention_hours=JOB_RETENTION_HOURS):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_hours = retention_hours
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._futures = {}
+
+    def _get_executor(self):
+        # Création paresseuse : aucun processus tant qu'aucune tâche n'est soumise
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def pending_count(self):
+        self._futures = {job_id: f for job_id, f in self._futures.items() if not f.done()}
+        return len(self._futures)
+
+    def submit(self, job_type, filepath, params=None):
+        """Mise en file d'une analyse ; renvoie l'état initial de la tâche"""
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Type de tâche inconnu: {job_type} (attendu: {', '.join(JOB_TYPES)})")
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"Fichier introuvable: {os.path.basename(filepath)}")
+        if self.pending_count() >= self.max_pending:
+            raise QueueFullError(f"File de tâches pleine ({self.max_pending} tâches en attente)")
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.purge()
+
+        job_id = uuid.uuid4().hex
+        status = {
+            'job_id': job_id,
+            'type': job_type,
+            'filename': os.path.basename(filepath),
+            'params': {key: value for key, value in (params or {}).items() if key != 'model_dir'},
+            'state': 'queued',
+            'progress': None,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None
+        }
+        _write_json(_status_path(self.directory, job_id), status)
+
+        try:
+            future = self._get_executor().submit(run_job, self.directory, job_id, job_type, filepath,
+                                                 dict(params or {}))
+        except Exception as e:
+            _update_status(self.directory, job_id, state='failed', error=str(e), finished_at=_now())
+            raise
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        self._futures[job_id] = future
+        return status
+
+    def _on_done(self, job_id, future):
+        """Processus de travail tué (mémoire...) : la tâche est marquée en échec"""
+        error = future.exception() if not future.cancelled() else 'Tâche annulée'
+        if error is None:
+            return
+        status = _read_status(self.directory, job_id)
+        if status is not None and status.get('state') not in ('done', 'failed'):
+            self.logger.error(f"Tâche {job_id} interrompue: {error}")
+            _update_status(self.directory, job_id, state='failed', error=str(error), finished_at=_now())
+
+    def status(self, job_id):
+        """État de la tâche, None si inconnue"""
+        if not self._valid_id(job_id):
+            return None
+        return _read_status(self.directory, job_id)
+
+    def result_path(self, job_id):
+        """Chemin du résultat JSON d'une tâche terminée, None sinon"""
+        if not self._valid_id(job_id):
+            return None
+        path = _result_path(self.directory, job_id)
+        return path if os.path.exists(path) else None
+
+    def list_jobs(self, limit=50):
+        """Tâches les plus récentes d'abord"""
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = []
+        for name in os.listdir(self.directory):
+            job_id = name[:-len('.json')]
+            if name.endswith('.json') and self._valid_id(job_id):
+                status = _read_status(self.directory, job_id)
+                if status is not None:
+                    jobs.append(status)
+        jobs.sort(key=lambda job: job.get('created_at') or '', reverse=True)
+        return jobs[:limit]
+
+    def purge(self):
+        """Suppression des tâches terminées depuis plus de retention_hours"""
+        if not os.path.isdir(self.directory):
+            return 0
+        limit = time.time() - self.retention_hours * 3600
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            job_id = name.split('.', 1)[0]
+            if not self._valid_id(job_id) or os.path.getmtime(path) >= limit:
+                continue
+            status = _read_status(self.directory, job_id)
+            if status is None or status.get('state') in ('done', 'failed'):
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    @staticmethod
+    def _valid_id(job_id):
+        return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
@@ -0,0 +1,218 @@
+"""
+Export de rapport en flux
+JSON ou JSONL (une constatation par ligne), compression gzip / zstd et pièces jointes des lignes signalées
+"""
+
+import io
+import zipfile
+import zlib
+
+import numpy as np
+
+from core.serialization import dumps, loads
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+EXPORT_FORMATS = ('json', 'jsonl')
+EXPORT_COMPRESSIONS = ('none', 'gzip', 'zstd')
+ATTACHMENT_FORMATS = ('none', 'csv', 'parquet')
+
+# Clés de résultat désignant des lignes du fichier analysé
+ROW_KEYS = ('index', 'indices', 'anomalous_indices', 'rows', 'row')
+
+# Sections qui listent des événements sans les signaler (frise chronologique)
+UNFLAGGED_SECTIONS = ('forensic.forensic_timeline',)
+
+# Lignes lues par morceau pour les pièces jointes, niveau de compression gzip
+ATTACHMENT_CHUNK_ROWS = 100000
+COMPRESSION_LEVEL = 6
+
+FILE_EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def check_options(export_format, compression, attachments):
+    """ValueError si une option n'est pas reconnue ou si sa dépendance est absente"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format inconnu: {export_format} (attendu: {', '.join(EXPORT_FORMATS)})")
+    if compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Compression inconnue: {compression} (attendu: {', '.join(EXPORT_COMPRESSIONS)})")
+    if compression == 'zstd' and not HAS_ZSTD:
+        raise ValueError("Compression zstd indisponible (module zstandard non installé)")
+    if attachments not in ATTACHMENT_FORMATS:
+        raise ValueError(f"Pièce jointe inconnue: {attachments} (attendu: {', '.join(ATTACHMENT_FORMATS)})")
+    if attachments == 'parquet' and not HAS_PYARROW:
+        raise ValueError("Pièces jointes Parquet indisponibles (module pyarrow non installé)")
+
+
+def iter_report_json(header, analyses):
+    """Rapport JSON : en-tête puis une clé par analyse, chaque résultat (JSON déjà sérialisé) recopié tel quel
+
+    analyses : itérable de (clé, octets JSON), consommé au fur et à mesure.
+    """
+    yield dumps(header)[:-1]
+    empty = not header
+    for key, raw in analyses:
+        yield (b'' if empty else b',') + dumps(key) + b':' + raw
+        empty = False
+    yield b'}'
+
+
+def iter_findings(analyzer, results):
+    """Constatations d'un analyseur : un élément par entrée de liste ou par clé de chaque section"""
+    for section, result in results.items():
+        if isinstance(result, list):
+            for item in result:
+                yield {'analyzer': analyzer, 'section': section, 'finding': item}
+        elif isinstance(result, dict) and result and 'error' not in result:
+            for key, item in result.items():
+                yield {'analyzer': analyzer, 'section': section, 'key': key, 'finding': item}
+        else:
+            yield {'analyzer': analyzer, 'section': section, 'finding': result}
+
+
+def iter_report_jsonl(header, analyses):
+    """Rapport JSONL : une ligne d'en-tête puis une ligne par constatation"""
+    yield dumps({'type': 'report', **header}) + b'\n'
+    for analyzer, raw in analyses:
+        for finding in iter_findings(analyzer, loads(raw)):
+            yield dumps({'type': 'finding', **finding}) + b'\n'
+
+
+def _row_labels(key, value):
+    """Positions de lignes d'une valeur ('index' / 'row' : une ligne, sinon liste ; 'rows' entier = un total)"""
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, int) and not isinstance(item, bool)]
+    if key in ('index', 'row') and isinstance(value, int) and not isinstance(value, bool):
+        return [value]
+    return []
+
+
+def collect_flagged_rows(analyzer, results, flagged=None):
+    """Lignes citées par les constatations (index, indices, rows...) -> détecteurs qui les signalent"""
+    flagged = {} if flagged is None else flagged
+    pending = [(f"{analyzer}.{section}", result) for section, result in results.items()
+               if f"{analyzer}.{section}" not in UNFLAGGED_SECTIONS]
+    while pending:
+        label, value = pending.pop()
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key in ROW_KEYS:
+                    for row in _row_labels(key, item):
+                        flagged.setdefault(row, set()).add(label)
+                elif isinstance(item, (dict, list)):
+                    pending.append((label, item))
+        elif isinstance(value, list):
+            pending.extend((label, item) for item in value if isinstance(item, (dict, list)))
+    return flagged
+
+
+def iter_flagged_chunks(chunks, flagged):
+    """Lignes signalées de chaque morceau, avec leur position et les détecteurs concernés
+
+    Les positions sont comptées sur l'ensemble du fichier (index par défaut des analyses).
+    Le premier morceau est toujours émis, éventuellement vide, pour fixer les colonnes.
+    """
+    rows = np.array(sorted(flagged), dtype=np.int64)
+    offset = 0
+    for chunk in chunks:
+        start, stop = np.searchsorted(rows, [offset, offset + len(chunk)])
+        if stop > start or offset == 0:
+            positions = rows[start:stop]
+            selected = chunk.iloc[positions - offset].copy()
+            selected.insert(0, 'flagged_by', [', '.join(sorted(flagged[int(p)])) for p in positions])
+            selected.insert(0, 'row', positions)
+            yield selected
+        offset += len(chunk)
+
+
+class _StreamSink(io.RawIOBase):
+    """Destination en écriture seule : les octets écrits sont récupérés par drain()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_csv(frames):
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+def iter_parquet(frames):
+    """Parquet écrit groupe de lignes par groupe de lignes (schéma du premier morceau)"""
+    sink = _StreamSink()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame.astype({col: 'string' for col in frame.columns[frame.dtypes == object]}),
+                                     preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def compress(chunks, compression):
+    """Compression en flux des morceaux d'octets"""
+    if compression == 'none':
+        yield from chunks
+        return
+    if compression == 'gzip':
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    else:
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_zip(entries):
+    """Archive ZIP produite en flux (descripteurs de données, aucun retour arrière)
+
+    entries : itérable de (nom, itérable d'octets), déjà compressés si besoin.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, chunks in entries:
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
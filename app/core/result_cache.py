@@ -0,0 +1,281 @@
+"""
+Cache persistant des résultats d'analyse
+Index SQLite et résultats JSON compressés sur disque, quota avec éviction LRU
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import types
+
+from core.data_utils import dataset_hash
+from core.serialization import dumps, loads
+
+# Taille maximale des résultats conservés (octets compressés)
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# Niveau gzip : compromis vitesse / taille pour des JSON très redondants
+COMPRESSION_LEVEL = 6
+
+# Version du code par module analyseur, calculée une fois par processus
+_VERSION_CACHE = {}
+
+
+def _project_module(name):
+    """Module du projet (core.* ou analyzers.*) déjà chargé, None sinon"""
+    if not name:
+        return None
+    module = sys.modules.get(name)
+    if module is None or not getattr(module, '__file__', None):
+        return None
+    if name.split('.', 1)[0] not in ('core', 'analyzers'):
+        return None
+    return module
+
+
+def code_version(module):
+    """Hash du source du module et des modules du projet qu'il importe (récursivement)
+
+    Toute modification du code d'un analyseur ou d'un de ses modules d'appui change la version,
+    ce qui invalide les résultats mis en cache sans numéro de version à maintenir.
+    """
+    if module.__name__ in _VERSION_CACHE:
+        return _VERSION_CACHE[module.__name__]
+
+    seen = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in seen:
+            continue
+        seen[current.__name__] = current.__file__
+        for value in vars(current).values():
+            name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+            dependency = _project_module(name)
+            if dependency is not None and dependency.__name__ not in seen:
+                pending.append(dependency)
+
+    hash_obj = hashlib.sha256()
+    for name in sorted(seen):
+        with open(seen[name], 'rb') as f:
+            hash_obj.update(name.encode('utf-8'))
+            hash_obj.update(f.read())
+    _VERSION_CACHE[module.__name__] = hash_obj.hexdigest()[:16]
+    return _VERSION_CACHE[module.__name__]
+
+
+def cache_key(data_hash, analyzer, version, params):
+    params_json = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{data_hash}|{analyzer}|{version}|{params_json}".encode('utf-8')).hexdigest()
+
+
+def _with_sections(sections, raw):
+    """JSON d'un objet (octets) précédé des sections données, sans le redécoder"""
+    if not sections:
+        return raw
+    head = dumps(sections)
+    return head if raw == b'{}' else head[:-1] + b',' + raw[1:]
+
+
+class ResultCache:
+    """Résultats indexés par (SHA-256 du fichier, analyseur, version du code, paramètres)"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._initialized = False
+
+    def _connect(self):
+        os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=30)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    data_hash TEXT NOT NULL,
+                    analyzer TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            connection.execute('CREATE INDEX IF NOT EXISTS results_access ON results (last_access)')
+            connection.execute('CREATE INDEX IF NOT EXISTS results_data ON results (data_hash, analyzer)')
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    def blob_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get_compressed(self, data_hash, analyzer, version, params=None):
+        """JSON compressé (gzip) du résultat, None si absent ; met à jour la date d'accès LRU"""
+        key = cache_key(data_hash, analyzer, version, params)
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT size FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self.blob_path(key), 'rb') as f:
+                    blob = f.read()
+            except OSError:
+                # Fichier supprimé hors du cache : l'entrée est retirée
+                connection.execute('DELETE FROM results WHERE key = ?', (key,))
+                connection.commit()
+                return None
+            connection.execute('UPDATE results SET last_access = ?, hits = hits + 1 WHERE key = ?',
+                               (time.time(), key))
+            connection.commit()
+            return blob
+        finally:
+            connection.close()
+
+    def get_json(self, data_hash, analyzer, version, params=None):
+        """JSON (octets) du résultat, None si absent"""
+        blob = self.get_compressed(data_hash, analyzer, version, params)
+        return gzip.decompress(blob) if blob is not None else None
+
+    def get(self, data_hash, analyzer, version, params=None):
+        raw = self.get_json(data_hash, analyzer, version, params)
+        return loads(raw) if raw is not None else None
+
+    def put(self, data_hash, analyzer, version, params, result):
+        """Mise en cache du résultat ; renvoie son JSON (octets)"""
+        raw = dumps(result)
+        blob = gzip.compress(raw, compresslevel=COMPRESSION_LEVEL)
+        if len(blob) > self.max_bytes:
+            return raw
+
+        key = cache_key(data_hash, analyzer, version, params)
+        path = self.blob_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        now = time.time()
+        connection = self._connect()
+        try:
+            # Résultats du même analyseur produits par une version antérieure du code : périmés
+            stale = connection.execute(
+                'SELECT key FROM results WHERE data_hash = ? AND analyzer = ? AND version != ?',
+                (data_hash, analyzer, version)
+            ).fetchall()
+            self._remove(connection, [row[0] for row in stale])
+
+            connection.execute(
+                'INSERT OR REPLACE INTO results (key, data_hash, analyzer, version, params, size, raw_size, '
+                'created_at, last_access, hits) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)',
+                (key, data_hash, analyzer, version, json.dumps(params or {}, sort_keys=True, default=str),
+                 len(blob), len(raw), now, now)
+            )
+            connection.commit()
+            self._evict(connection)
+        finally:
+            connection.close()
+        return raw
+
+    def cached_json(self, filepath, analyzer, version, params, compute, live=None):
+        """JSON du résultat depuis le cache, sinon calculé par compute() puis mis en cache
+
+        Les résultats en erreur ({'error': ...}) ne sont pas conservés. live : (section, méthode)
+        propres au fichier et non à son contenu (nom, chemin, dates) ; ces sections ne sont jamais
+        mises en cache et sont recalculées à chaque appel, placées en tête du résultat.
+        """
+        live = dict(live or ())
+        data_hash = dataset_hash(filepath)
+        raw = self.get_json(data_hash, analyzer, version, params)
+        if raw is not None:
+            return _with_sections({section: method() for section, method in live.items()}, raw)
+        result = compute()
+        if isinstance(result, dict) and 'error' in result:
+            return dumps(result)
+        if not live:
+            return self.put(data_hash, analyzer, version, params, result)
+        raw = self.put(data_hash, analyzer, version, params,
+                       {section: value for section, value in result.items() if section not in live})
+        return _with_sections({section: result[section] for section in live if section in result}, raw)
+
+    def _remove(self, connection, keys):
+        for key in keys:
+            try:
+                os.remove(self.blob_path(key))
+            except OSError:
+                pass
+        connection.executemany('DELETE FROM results WHERE key = ?', [(key,) for key in keys])
+        connection.commit()
+
+    def _evict(self, connection):
+        """Éviction des entrées les moins récemment lues jusqu'à repasser sous le quota"""
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = []
+        for key, size in connection.execute('SELECT key, size FROM results ORDER BY last_access ASC'):
+            if total <= self.max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+        self._remove(connection, evicted)
+        self.logger.info(f"Cache de résultats : {len(evicted)} entrée(s) évincée(s)")
+        return len(evicted)
+
+    def invalidate(self, data_hash=None, analyzer=None):
+        """Suppression des résultats d'un fichier et/ou d'un analyseur (tout le cache par défaut)"""
+        query, args = 'SELECT key FROM results WHERE 1 = 1', []
+        if data_hash is not None:
+            query += ' AND data_hash = ?'
+            args.append(data_hash)
+        if analyzer is not None:
+            query += ' AND analyzer = ?'
+            args.append(analyzer)
+        connection = self._connect()
+        try:
+            keys = [row[0] for row in connection.execute(query, args).fetchall()]
+            self._remove(connection, keys)
+            return len(keys)
+        finally:
+            connection.close()
+
+    def stats(self):
+        connection = self._connect()
+        try:
+            entries, size, raw_size, hits = connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0), COALESCE(SUM(hits), 0) '
+                'FROM results'
+            ).fetchone()
+            by_analyzer = {
+                analyzer: {'entries': count, 'size_bytes': total}
+                for analyzer, count, total in connection.execute(
+                    'SELECT analyzer, COUNT(*), SUM(size) FROM results GROUP BY analyzer'
+                )
+            }
+        finally:
+            connection.close()
+        return {
+            'entries': entries,
+            'size_bytes': size,
+            'uncompressed_bytes': raw_size,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'analyzers': by_analyzer
+        }
@@ -0,0 +1,154 @@
+"""
+Sérialisation JSON des résultats d'analyse
+Types NumPy / pandas convertis nativement et par blocs, NaN et infinis toujours émis en null
+"""
+
+import datetime
+import decimal
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+if HAS_ORJSON:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    ORJSON_PRETTY_OPTIONS = ORJSON_OPTIONS | orjson.OPT_INDENT_2
+
+# Profondeur jusqu'à laquelle iter_dumps découpe dictionnaires et listes en morceaux
+STREAM_DEPTH = 2
+
+
+def _convert_scalar(value):
+    """Scalaire NumPy / pandas / Python vers un type JSON natif"""
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, np.generic):
+        if isinstance(value, (np.datetime64, np.timedelta64)):
+            return _convert_scalar(pd.Timestamp(value) if isinstance(value, np.datetime64) else pd.Timedelta(value))
+        return _convert_scalar(value.item())
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (pd.Timedelta, datetime.timedelta)):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return _convert_scalar(float(value))
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def _convert_key(key):
+    key = _convert_scalar(key)
+    return key if isinstance(key, str) else json.dumps(key)
+
+
+def _convert_array(array):
+    """Tableau entier converti en un bloc : tolist() puis nettoyage des non-finis"""
+    if array.dtype.kind in 'iub':
+        return array.tolist()
+    if array.dtype.kind == 'f':
+        if np.isfinite(array).all():
+            return array.tolist()
+        cleaned = array.astype(object)
+        cleaned[~np.isfinite(array)] = None
+        return cleaned.tolist()
+    if array.dtype.kind in 'mM':
+        if array.ndim != 1:
+            return [_convert_array(row) for row in array]
+        index = pd.DatetimeIndex(array) if array.dtype.kind == 'M' else pd.TimedeltaIndex(array)
+        return [_convert_scalar(value) for value in index]
+    return to_builtin(array.tolist())
+
+
+def to_builtin(value):
+    """Conversion récursive vers dict / list / scalaires JSON natifs"""
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, str) else _convert_key(key): to_builtin(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_builtin(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _convert_array(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return _convert_array(value.to_numpy())
+    if isinstance(value, pd.DataFrame):
+        return {str(col): _convert_array(value[col].to_numpy()) for col in value.columns}
+    return _convert_scalar(value)
+
+
+def _json_default(value):
+    """Objets non gérés nativement par l'encodeur (NumPy, Timestamp, Timedelta, tableaux objet...)"""
+    # Cas les plus fréquents d'abord : entiers NumPy et tableaux
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.ndarray):
+        return _convert_array(value)
+    converted = to_builtin(value)
+    if converted is value:
+        raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+    return converted
+
+
+def dumps(value, pretty=False):
+    """JSON compact (ou indenté) en octets UTF-8"""
+    if HAS_ORJSON:
+        options = ORJSON_PRETTY_OPTIONS if pretty else ORJSON_OPTIONS
+        try:
+            return orjson.dumps(value, default=_json_default, option=options)
+        except (TypeError, orjson.JSONEncodeError):
+            # Clés non standard (entiers NumPy, Timestamp...) : conversion complète préalable
+            return orjson.dumps(to_builtin(value), option=options)
+    options = {
+        'ensure_ascii': False,
+        'allow_nan': False,
+        'indent': 2 if pretty else None,
+        'separators': (',', ': ') if pretty else (',', ':')
+    }
+    try:
+        # Encodeur C avec conversion des seuls objets non natifs
+        return json.dumps(value, default=_json_default, **options).encode('utf-8')
+    except (TypeError, ValueError):
+        # Flottant non fini ou clé non standard rencontrés : conversion complète préalable
+        return json.dumps(to_builtin(value), **options).encode('utf-8')
+
+
+def loads(data):
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def iter_dumps(value, depth=STREAM_DEPTH):
+    """JSON compact produit morceau par morceau (une entrée de dictionnaire ou de liste à la fois)
+
+    Seul un élément de profondeur depth est sérialisé en mémoire à un instant donné.
+    """
+    if depth > 0 and isinstance(value, dict):
+        yield b'{'
+        for position, (key, item) in enumerate(value.items()):
+            key = key if isinstance(key, str) else _convert_key(key)
+            yield (b',' if position else b'') + dumps(key) + b':'
+            yield from iter_dumps(item, depth - 1)
+        yield b'}'
+    elif depth > 0 and isinstance(value, (list, tuple)):
+        yield b'['
+        for position, item in enumerate(value):
+            if position:
+                yield b','
+            yield from iter_dumps(item, depth - 1)
+        yield b']'
+    else:
+        yield dumps(value)
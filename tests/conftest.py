@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Même résolution des imports que app.py (core.*, analyzers.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
@@ -0,0 +1,16 @@
+import numpy as np
+
+from analyzers.benford import benford_test, extract_digits
+
+
+def test_single_digit_values_have_no_second_digit():
+    values = np.array([5, 7.5, 10, 57, -34, 0.5])
+    assert extract_digits(values, 'second_digit').tolist() == [-1, -1, 0, 7, 4, -1]
+    assert extract_digits(values, 'first_two_digits').tolist() == [-1, -1, 10, 57, 34, -1]
+
+
+def test_benford_integers_conform():
+    rng = np.random.default_rng(0)
+    values = np.floor(10 ** rng.uniform(0, 5, 20000)).astype(np.int64)
+    for test in ('first_digit', 'second_digit', 'first_two_digits'):
+        assert benford_test(values, test)['conformity'] == 'close_conformity'
@@ -0,0 +1,57 @@
+import numpy as np
+
+from analyzers.change_points import _best_split, binary_segmentation, cusum, kolmogorov_sf
+
+
+def _sse(segment):
+    return float(((segment - segment.mean()) ** 2).sum())
+
+
+def _greedy_segmentation(values, penalty, min_size, max_changes):
+    """Segmentation binaire naïve : coupures essayées une à une, SSE recalculée directement"""
+    segments, changes = [(0, len(values))], []
+    while len(changes) < max_changes:
+        best = None
+        for start, end in segments:
+            for split in range(start + min_size, end - min_size + 1):
+                gain = _sse(values[start:end]) - _sse(values[start:split]) - _sse(values[split:end])
+                if best is None or gain > best[0] + 1e-9:
+                    best = (gain, split, start, end)
+        if best is None or best[0] <= penalty:
+            break
+        gain, split, start, end = best
+        changes.append(split)
+        segments.remove((start, end))
+        segments += [(start, split), (split, end)]
+    return sorted(changes)
+
+
+def test_best_split_matches_direct_sse():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=120) + np.r_[np.zeros(70), np.full(50, 2.0)]
+    cumulative = np.r_[0.0, np.cumsum(values)]
+    split, gain = _best_split(cumulative, 10, 110, 5)
+    gains = {s: _sse(values[10:110]) - _sse(values[10:s]) - _sse(values[s:110]) for s in range(15, 106)}
+    assert split == max(gains, key=gains.get)
+    assert np.isclose(gain, gains[split])
+
+
+def test_binary_segmentation_matches_greedy_loop():
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        means = np.repeat(rng.normal(scale=3, size=4), rng.integers(20, 60, 4))
+        values = means + rng.normal(size=len(means))
+        changes, penalty = binary_segmentation(values, min_size=5, max_changes=6, sigma=1.0)
+        assert [split for split, _, _, _ in changes] == _greedy_segmentation(values, penalty, 5, 6)
+
+
+def test_cusum_and_kolmogorov_reference():
+    rng = np.random.default_rng(2)
+    values = np.r_[rng.normal(size=80), rng.normal(1.5, 1, size=40)]
+    result = cusum(values, sigma=1.0)
+    partial = [abs(sum(values[:k]) - k * values.mean()) for k in range(1, len(values))]
+    assert result['position'] == int(np.argmax(partial)) + 1
+    assert np.isclose(result['statistic'], max(partial) / np.sqrt(len(values)))
+
+    # Valeurs tabulées de la loi de Kolmogorov
+    assert np.allclose(kolmogorov_sf([0.5, 1.0, 1.358, 2.0]), [0.9639, 0.2700, 0.0500, 0.00067], atol=5e-4)
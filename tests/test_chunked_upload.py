@@ -0,0 +1,48 @@
+import hashlib
+import io
+import os
+
+from core.chunked_upload import MIN_CHUNK_SIZE, ChunkedUploads
+
+
+def _put(uploads, upload_id, index, data):
+    return uploads.write_chunk(upload_id, index, io.BytesIO(data), hashlib.sha256(data).hexdigest())
+
+
+def test_chunk_rewritten_by_another_process(tmp_path):
+    """Morceau corrigé reçu par un autre processus : les hash de la finalisation suivent le disque"""
+    first, second = ChunkedUploads(str(tmp_path / 'sessions')), ChunkedUploads(str(tmp_path / 'sessions'))
+    good = [os.urandom(MIN_CHUNK_SIZE), os.urandom(MIN_CHUNK_SIZE)]
+    bad = os.urandom(MIN_CHUNK_SIZE)
+    session = first.create('evidence.csv', 2 * MIN_CHUNK_SIZE, chunk_size=MIN_CHUNK_SIZE)
+
+    _put(first, session['upload_id'], 0, bad)
+    _put(first, session['upload_id'], 1, good[1])
+    _put(second, session['upload_id'], 0, good[0])
+
+    destination = str(tmp_path / 'evidence.csv')
+    digests = first.finalize(session['upload_id'], destination)
+    with open(destination, 'rb') as f:
+        content = f.read()
+    assert content == good[0] + good[1]
+    assert digests['sha256'] == hashlib.sha256(content).hexdigest()
+    assert digests['md5'] == hashlib.md5(content).hexdigest()
+
+
+def test_out_of_order_and_resume(tmp_path):
+    uploads = ChunkedUploads(str(tmp_path / 'sessions'))
+    data = os.urandom(3 * MIN_CHUNK_SIZE + 10)
+    session = uploads.create('evidence.csv', len(data), chunk_size=MIN_CHUNK_SIZE,
+                             sha256=hashlib.sha256(data).hexdigest())
+    chunks = [data[i:i + MIN_CHUNK_SIZE] for i in range(0, len(data), MIN_CHUNK_SIZE)]
+
+    for index in (3, 1):
+        _put(uploads, session['upload_id'], index, chunks[index])
+    assert uploads.status(session['upload_id'])['missing'] == [0, 2]
+
+    # Reprise par une nouvelle instance (serveur redémarré)
+    resumed = ChunkedUploads(str(tmp_path / 'sessions'))
+    for index in resumed.status(session['upload_id'])['missing']:
+        _put(resumed, session['upload_id'], index, chunks[index])
+    digests = resumed.finalize(session['upload_id'], str(tmp_path / 'evidence.csv'))
+    assert digests['sha256'] == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,20 @@
+import numpy as np
+
+from analyzers.concurrent_access import sliding_distinct
+
+
+def test_sliding_distinct_matches_brute_force():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 5, 400)
+    values = rng.integers(0, 6, 400)
+    # Instants entiers avec égalités fréquentes
+    times = rng.integers(0, 200, 400)
+    order = np.lexsort((times, keys))
+    keys, values, times = keys[order], values[order], times[order]
+
+    for window in (1, 7, 30):
+        starts, distinct = sliding_distinct(keys, values, times, window)
+        for i in range(len(keys)):
+            in_window = [j for j in range(i + 1) if keys[j] == keys[i] and times[j] > times[i] - window]
+            assert starts[i] == in_window[0]
+            assert distinct[i] == len({values[j] for j in in_window})
@@ -0,0 +1,16 @@
+from core.database_analyzer import DatabaseAnalyzer
+
+
+def test_late_non_utf8_character_in_chunks(tmp_path):
+    path = tmp_path / 'users.csv'
+    rows = [f"user{i};{i * 1.5}" for i in range(300)] + ["Hélène;12.5"]
+    path.write_bytes(("name;amount\n" + "\n".join(rows) + "\n").encode('cp1252'))
+
+    chunks = list(DatabaseAnalyzer(str(path)).iter_chunks(chunksize=100))
+    assert sum(len(chunk) for chunk in chunks) == 301
+    assert chunks[-1]['name'].iloc[-1] == 'Hélène'
+
+    analyzer = DatabaseAnalyzer(str(path))
+    analyzer.load_data()
+    assert analyzer.data['name'].iloc[300] == 'Hélène'
+    assert 'amount' in DatabaseAnalyzer(str(path)).stream_outlier_counts(chunksize=100)
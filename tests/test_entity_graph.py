@@ -0,0 +1,29 @@
+import numpy as np
+
+from analyzers.entity_graph import connected_components
+
+
+def test_connected_components_match_graph_search():
+    rng = np.random.default_rng(0)
+    for n_nodes, n_edges in ((50, 20), (300, 250), (300, 600)):
+        sources = rng.integers(0, n_nodes, n_edges)
+        targets = rng.integers(0, n_nodes, n_edges)
+        roots = connected_components(n_nodes, sources, targets)
+
+        neighbours = [[] for _ in range(n_nodes)]
+        for a, b in zip(sources, targets):
+            neighbours[a].append(b)
+            neighbours[b].append(a)
+        # Parcours en profondeur : chaque composante est représentée par son plus petit nœud
+        expected = np.full(n_nodes, -1)
+        for node in range(n_nodes):
+            if expected[node] >= 0:
+                continue
+            stack = [node]
+            expected[node] = node
+            while stack:
+                for neighbour in neighbours[stack.pop()]:
+                    if expected[neighbour] < 0:
+                        expected[neighbour] = node
+                        stack.append(neighbour)
+        assert np.array_equal(roots, expected)
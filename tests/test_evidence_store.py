@@ -0,0 +1,28 @@
+import hashlib
+import os
+
+import pytest
+
+from core.evidence_store import EvidenceStore
+
+
+def _store(tmp_path):
+    reference_dir = tmp_path / 'uploads'
+    reference_dir.mkdir()
+    return EvidenceStore(str(tmp_path / 'evidence'), str(reference_dir))
+
+
+def test_ingest_recomputes_unverified_digests(tmp_path):
+    store = _store(tmp_path)
+    source = store.staging_path()
+    with open(source, 'wb') as f:
+        f.write(b'a,b\n1,2\n')
+
+    with pytest.raises(ValueError):
+        store.ingest(source, 'data.csv', {'sha256': '0' * 64})
+    assert not os.path.exists(source)
+
+    with open(source, 'wb') as f:
+        f.write(b'a,b\n1,2\n')
+    stored = store.ingest(source, 'data.csv')
+    assert stored['sha256'] == hashlib.sha256(b'a,b\n1,2\n').hexdigest()
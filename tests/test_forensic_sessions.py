@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from core.forensic_analyzer import ForensicAnalyzer
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / 'logs.csv'
+    pd.DataFrame({
+        'user': ['alice', 'alice', 'bob', 'bob'],
+        'account': ['a1', 'a1', 'a2', 'a3'],
+        'timestamp': ['2024-01-01 08:00', '2024-01-01 08:10', '2024-01-01 09:00', '2024-01-01 12:00'],
+        'action': ['login', 'read', 'login', 'logout']
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_persisted_sessions_skip_loading(log_file, tmp_path):
+    models = str(tmp_path / 'models')
+    first = ForensicAnalyzer(str(log_file), model_dir=models).get_sessions(user_column='account')
+    assert first['summary']['user_column'] == 'account'
+
+    analyzer = ForensicAnalyzer(str(log_file), model_dir=models)
+    analyzer.load_data = lambda: pytest.fail("sessions persistées : chargement inutile")
+    second = analyzer.get_sessions(user_column='account')
+    assert second['summary'] == first['summary']
+
+
+def test_unknown_session_column(log_file, tmp_path):
+    analyzer = ForensicAnalyzer(str(log_file), model_dir=str(tmp_path / 'models'))
+    with pytest.raises(ValueError):
+        analyzer.get_sessions(user_column='missing')
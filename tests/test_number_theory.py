@@ -0,0 +1,46 @@
+import numpy as np
+
+from analyzers.number_theory import integral_values, is_power_of_two, is_prime
+
+
+def _is_prime_reference(value):
+    """Miller-Rabin en entiers Python, bases déterministes pour tout int64"""
+    if value < 2:
+        return False
+    for prime in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if value % prime == 0:
+            return value == prime
+    d, s = value - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for base in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        x = pow(base, d, value)
+        if x in (1, value - 1):
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, value)
+            if x == value - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def test_is_prime_matches_reference():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.integers(-10, 5000, 2000),
+        rng.integers(1 << 22, 1 << 32, 2000),
+        rng.integers(10 ** 12, 10 ** 12 + 10 ** 6, 2000),
+        rng.integers(1 << 62, (1 << 63) - 1, 2000),
+        # Pseudo-premiers forts pour les bases 2 à 23, premiers de Mersenne, plus grand premier int64
+        [3825123056546413051, 3215031751, (1 << 61) - 1, (1 << 31) - 1, 9223372036854775783]
+    ]).astype(np.int64)
+    expected = np.array([_is_prime_reference(int(value)) for value in values])
+    assert np.array_equal(is_prime(values), expected)
+
+
+def test_power_of_two_and_integral_values():
+    values = integral_values([1.0, 2.5, np.nan, np.inf, -4, 64, 0, 1 << 40])
+    assert values.tolist() == [1, -4, 64, 0, 1 << 40]
+    assert is_power_of_two(values).tolist() == [True, False, True, False, True]
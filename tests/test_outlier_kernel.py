@@ -0,0 +1,53 @@
+import numpy as np
+
+from analyzers import outlier_kernel
+from analyzers.outlier_kernel import matrix_outliers
+
+
+def _column_reference(x, top_k):
+    """IQR, z-score et z-score modifié d'une colonne, en boucle simple"""
+    valid = ~np.isnan(x)
+    q1, median, q3 = np.quantile(x[valid], [0.25, 0.5, 0.75])
+    lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    spread = upper - lower if upper > lower else 1.0
+    mean, std = x[valid].mean(), x[valid].std(ddof=1)
+    mad = np.median(np.abs(x[valid] - median))
+    # MAD nulle : écart absolu moyen
+    scale = mad / 0.6745 if mad > 0 else 1.253314 * np.mean(np.abs(x[valid] - median))
+
+    scores = {'iqr': {}, 'zscore': {}, 'modified_zscore': {}}
+    for row, value in enumerate(x):
+        if np.isnan(value):
+            continue
+        if value < lower or value > upper:
+            scores['iqr'][row] = max(lower - value, value - upper) / spread
+        if std > 0 and abs(value - mean) / std > 3:
+            scores['zscore'][row] = abs(value - mean) / std
+        if scale > 0 and abs(value - median) / scale > 3.5:
+            scores['modified_zscore'][row] = abs(value - median) / scale
+
+    return {
+        method: (len(found), sorted(found, key=lambda row: (-found[row], row))[:top_k])
+        for method, found in scores.items()
+    }
+
+
+def test_matrix_outliers_match_column_loop(monkeypatch):
+    # Petits blocs : le top-k est fusionné d'un bloc à l'autre
+    monkeypatch.setattr(outlier_kernel, 'BLOCK_CELLS', 64)
+    rng = np.random.default_rng(0)
+    matrix = np.column_stack([
+        rng.normal(size=500),
+        rng.standard_t(2, size=500),
+        rng.exponential(size=500),
+        np.r_[np.full(495, 5.0), rng.normal(20, 1, size=5)]
+    ])
+    matrix[rng.integers(0, 500, 30), 1] = np.nan
+
+    result = matrix_outliers(matrix, top_k=5)
+    for col in range(matrix.shape[1]):
+        reference = _column_reference(matrix[:, col], 5)
+        for m, method in enumerate(outlier_kernel.METHODS):
+            count, top_rows = reference[method]
+            assert result['counts'][m, col] == count
+            assert result['rows'][m, :len(top_rows), col].tolist() == top_rows
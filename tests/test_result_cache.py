@@ -0,0 +1,25 @@
+import shutil
+
+from core.result_cache import ResultCache
+from core.serialization import loads
+
+
+def test_file_sections_not_shared_between_copies(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    first = tmp_path / 'a.csv'
+    first.write_text('x,y\n1,2\n')
+    second = tmp_path / 'b.csv'
+    shutil.copy(first, second)
+
+    def file_info(path):
+        return [('file_info', lambda: {'filename': path.name})]
+
+    computed = cache.cached_json(str(first), 'basic', 'v1', {},
+                                 lambda: {'file_info': {'filename': 'a.csv'}, 'rows': 1}, file_info(first))
+    assert loads(computed) == {'file_info': {'filename': 'a.csv'}, 'rows': 1}
+
+    def recompute():
+        raise AssertionError("même contenu : résultat attendu depuis le cache")
+
+    cached = cache.cached_json(str(second), 'basic', 'v1', {}, recompute, file_info(second))
+    assert loads(cached) == {'file_info': {'filename': 'b.csv'}, 'rows': 1}
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from analyzers.time_buckets import TimeBucketIndex, _clamp_scan, kleinberg_bursts
+
+
+def _kleinberg_viterbi(counts, scale=2.0, gamma=1.0):
+    """Viterbi à deux états en boucle, coûts relatifs identiques au noyau"""
+    n = len(counts)
+    delta = counts.mean() * (scale - 1) - counts * np.log(scale)
+    entry = gamma * np.log(n)
+    cost0, cost1 = 0.0, np.inf
+    back = np.zeros((n, 2), dtype=np.int8)
+    for t in range(n):
+        back[t, 0] = 1 if cost1 < cost0 else 0
+        back[t, 1] = 1 if cost1 < cost0 + entry else 0
+        cost0, cost1 = min(cost0, cost1), min(cost0 + entry, cost1) + delta[t]
+    states = np.zeros(n, dtype=np.int8)
+    states[-1] = 1 if cost1 < cost0 else 0
+    for t in range(n - 1, 0, -1):
+        states[t - 1] = back[t, states[t]]
+    return states
+
+
+def test_clamp_scan_matches_sequential_composition():
+    rng = np.random.default_rng(0)
+    shift = rng.normal(size=200)
+    low = rng.normal(size=200) - 1
+    high = low + rng.uniform(0, 2, size=200)
+    scan_shift, scan_low, scan_high = _clamp_scan(shift, low, high)
+    for x in rng.normal(scale=5, size=20):
+        value = x
+        for i in range(200):
+            value = min(max(value + shift[i], low[i]), high[i])
+            assert np.isclose(np.clip(x + scan_shift[i], scan_low[i], scan_high[i]), value)
+
+
+def test_kleinberg_matches_viterbi():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        rates = np.where(rng.random(300) < 0.1, 20.0, 4.0)
+        counts = rng.poisson(rates).astype(np.int64)
+        assert np.array_equal(kleinberg_bursts(counts), _kleinberg_viterbi(counts))
+
+
+def test_bucket_counts_match_pandas():
+    rng = np.random.default_rng(2)
+    times = pd.Timestamp('2024-03-01 13:27') + pd.to_timedelta(rng.integers(0, 3 * 86400, 5000), unit='s')
+    index = TimeBucketIndex.from_times(times.to_numpy())
+    origin = pd.Timestamp(index.origin)
+    for resolution, freq in (('minute', 'min'), ('hour', 'h'), ('day', 'D')):
+        counts = index.counts(resolution)
+        expected = pd.Series(1, index=times).resample(freq).sum()
+        offset = int((expected.index[0] - origin) / pd.Timedelta(1, freq))
+        assert np.array_equal(counts[offset:offset + len(expected)], expected.to_numpy())
+        assert counts.sum() == len(times)
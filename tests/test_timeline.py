@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from analyzers.model_store import model_key
+from analyzers.timeline import build_timeline, page_timeline
+
+
+def test_type_filter_matches_event_kind():
+    frame = pd.DataFrame({
+        'login_time': ['2024-01-01', '2024-01-03'],
+        'created_at': ['2024-01-02', '2024-01-04'],
+        'inserted_at': ['2024-01-05', None]
+    })
+    timeline = build_timeline(frame, list(frame.columns))
+
+    page = page_timeline(timeline, 'key', event_type='record_created')
+    assert [event['column'] for event in page['events']] == ['created_at', 'created_at', 'inserted_at']
+    assert {event['event'] for event in page['events']} == {'record_created'}
+
+    with pytest.raises(ValueError):
+        page_timeline(timeline, 'key', event_type='created_at')
+
+
+def test_cursor_rejected_on_another_dataset():
+    frame = pd.DataFrame({'created_at': pd.date_range('2024-01-01', periods=5, freq='h').astype(str)})
+    timeline = build_timeline(frame, ['created_at'])
+    first = model_key('a' * 64, 'timeline', {'version': 1})
+    second = model_key('b' * 64, 'timeline', {'version': 1})
+
+    page = page_timeline(timeline, first, limit=2)
+    assert page_timeline(timeline, first, page['next_cursor'], limit=2)['count'] == 2
+    with pytest.raises(ValueError):
+        page_timeline(timeline, second, page['next_cursor'], limit=2)